@@ -0,0 +1,115 @@
+"""Compact binary ballot files that open through mmap.
+
+Layout, all little-endian:
+
+    magic      4 bytes   b'IRVB'
+    version    uint16
+    itemsize   uint16    1 for uint8 ranks, 2 for uint16 ranks
+    ballots    uint64    number of rows in the rank matrix
+    width      uint32    ranks per ballot
+    weighted   uint32    1 if a per-row int64 count array follows
+    names      uint32    byte length of the candidate table
+    candidate table      UTF-8 JSON list of names
+    padding              up to the next ALIGNMENT boundary
+    rank matrix          ballots x width cells, row-major
+    padding              up to the next ALIGNMENT boundary
+    counts               ballots x int64 (only when weighted)
+
+Opening a file maps the rank matrix and counts straight from the page cache,
+so reopening costs only the header parse and any number of processes can share
+the same pages.
+"""
+
+import json
+import struct
+import sys
+
+import numpy as np
+
+import result_cache
+from tabulation import blank_value, overvote_value, rank_dtype
+
+
+MAGIC = b'IRVB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQIII')
+ALIGNMENT = 64
+DTYPES = {1: np.uint8, 2: np.uint16}
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class BallotFile:
+    """A ballot file mapped into memory."""
+
+    def __init__(self, path, candidates, ranks, weights):
+        self.path = path
+        self.candidates = candidates
+        self.ranks = ranks
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.ranks)
+
+    def tabulate(self, method='piles', processes=1):
+        # Recounting the same file is answered from the result cache
+        return result_cache.tabulate(self.ranks, self.candidates, self.weights, method, processes)
+
+
+def write_ballot_file(path, ranks, candidates, weights=None):
+    """Write a rank matrix (and optional per-row counts) to path."""
+    dtype = rank_dtype(len(candidates))
+    ranks = np.asarray(ranks)
+    if ranks.dtype != dtype:
+        # Re-encode blanks and overvotes for the narrower or wider cell type
+        converted = ranks.astype(dtype)
+        converted[ranks >= len(candidates)] = blank_value(dtype)
+        converted[ranks == overvote_value(ranks.dtype)] = overvote_value(dtype)
+        ranks = converted
+    names = json.dumps(list(candidates)).encode('utf-8')
+    header = HEADER.pack(MAGIC, VERSION, np.dtype(dtype).itemsize, ranks.shape[0],
+                         ranks.shape[1] if ranks.ndim == 2 else 0, weights is not None, len(names))
+
+    with open(path, 'wb') as file:
+        file.write(header + names)
+        file.write(bytes(_aligned(file.tell()) - file.tell()))
+        file.write(np.ascontiguousarray(ranks).tobytes())
+        if weights is not None:
+            file.write(bytes(_aligned(file.tell()) - file.tell()))
+            file.write(np.ascontiguousarray(weights, dtype='<i8').tobytes())
+
+
+def open_ballot_file(path):
+    """Map a ballot file read-only without copying the ballot data."""
+    with open(path, 'rb') as file:
+        magic, version, itemsize, ballots, width, weighted, name_bytes = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} ballot file")
+        candidates = json.loads(file.read(name_bytes).decode('utf-8'))
+
+    dtype = DTYPES[itemsize]
+    offset = _aligned(HEADER.size + name_bytes)
+    if ballots and width:
+        ranks = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(ballots, width))
+    else:
+        ranks = np.zeros((ballots, width), dtype=dtype)
+    weights = None
+    if weighted:
+        offset = _aligned(offset + ballots * width * itemsize)
+        weights = np.memmap(path, dtype='<i8', mode='r', offset=offset, shape=(ballots,)) if ballots else np.zeros(0, np.int64)
+    return BallotFile(path, candidates, ranks, weights)
+
+
+if __name__ == '__main__':
+    # python ballotfile.py convert cvr.csv election.irvb
+    # python ballotfile.py count election.irvb
+    if sys.argv[1] == 'convert':
+        from ingest import load_ballots
+        ranks, counts, names, stats = load_ballots(sys.argv[2])
+        write_ballot_file(sys.argv[3], ranks, names, counts)
+        print(f"Wrote {stats.ballots} ballots ({len(ranks)} distinct) to {sys.argv[3]}")
+    elif sys.argv[1] == 'count':
+        winner, round_details = open_ballot_file(sys.argv[2]).tabulate()
+        print(f"The winner is: {winner} after {len(round_details)} rounds")
@@ -0,0 +1,264 @@
+"""Benchmarks for ballot generation, tabulation and headless rendering.
+
+    python bench.py                          # full sweep, results to bench_results.json
+    python bench.py --quick                  # small sizes only
+    python bench.py --only tabulate render   # pick benchmark groups
+    python bench.py --compare old.json       # report speedups against a saved run
+
+Each group sweeps voters (1e2 to 1e7) and candidates (4 to 50) and stops
+growing a sweep once one size exceeds the time budget. The draw functions are
+timed under SDL's dummy video driver. Results are written as JSON so two runs
+can be compared.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+import bootstrap
+import electorate
+import irv
+import result_cache
+import tabulation
+
+
+VOTER_SWEEP = [10 ** exponent for exponent in range(2, 8)]
+CANDIDATE_SWEEP = [4, 8, 20, 50]
+QUICK_VOTER_SWEEP = [100, 1_000, 10_000]
+QUICK_CANDIDATE_SWEEP = [4, 8]
+# Pure-Python paths are not swept past this many voters
+PYTHON_VOTER_LIMIT = 100_000
+# A sweep stops growing once one size takes longer than this many seconds
+TIME_BUDGET = 5.0
+RENDER_FRAMES = 200
+
+
+def measure(function, repeat=3):
+    """Run function repeat times, returning (median, best) seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), min(timings)
+
+
+def candidate_names(num_candidates):
+    return [f"C{i}" for i in range(num_candidates)]
+
+
+def sweep(name, voters, candidates, run, setup=None, repeat=3):
+    """Time run(num_voters, num_candidates, data) over the grid, largest sizes last.
+
+    setup(num_voters, num_candidates), if given, builds data outside the timing.
+    """
+    results = []
+    for num_candidates in candidates:
+        for num_voters in voters:
+            data = setup(num_voters, num_candidates) if setup else None
+            median, best = measure(lambda: run(num_voters, num_candidates, data), repeat)
+            del data
+            results.append({'benchmark': name, 'params': {'voters': num_voters, 'candidates': num_candidates},
+                            'seconds': median, 'best': best})
+            print(f"  {name:<28} voters={num_voters:<10} candidates={num_candidates:<3} {median * 1000:10.2f} ms",
+                  flush=True)
+            if median > TIME_BUDGET:
+                break
+    return results
+
+
+def bench_generate(voters, candidates):
+    results = []
+    for model in electorate.MODELS:
+        results += sweep(f'generate[{model}]', voters, candidates,
+                         lambda n, c, _: electorate.generate(c, n, model, seed=1))
+    results += sweep('generate_voter_preferences', [n for n in voters if n <= PYTHON_VOTER_LIMIT], candidates,
+                     lambda n, c, _: irv.generate_voter_preferences(candidate_names(c), n, seed=1))
+    return results
+
+
+def uncached(run):
+    """Wrap run to empty the result cache first, so repeats time the count and not a cache hit."""
+    def run_uncached(num_voters, num_candidates, data):
+        result_cache.default_cache.clear()
+        return run(num_voters, num_candidates, data)
+    return run_uncached
+
+
+def bench_tabulate(voters, candidates):
+    # Memory only, so entries left on disk by earlier runs are never hit either
+    result_cache.configure()
+    results = []
+    for method in tabulation.COUNTERS:
+        results += sweep(f'tabulate[{method}]', voters, candidates,
+                         lambda n, c, ranks: tabulation.tabulate(ranks, candidate_names(c), method=method),
+                         setup=lambda n, c: electorate.generate(c, n, seed=1))
+    results += sweep('simulate_voting_rounds', voters, candidates,
+                     uncached(lambda n, c, _: irv.simulate_voting_rounds(n, candidate_names(c), seed=1)))
+    results += sweep('count_votes', [1], candidates,
+                     uncached(lambda n, c, rankings: irv.count_votes(rankings, candidate_names(c))),
+                     setup=lambda n, c: {name: i + 1 for i, name in enumerate(candidate_names(c))})
+    return results
+
+
+def bench_redistribute(voters, candidates):
+    voters = [n for n in voters if n <= PYTHON_VOTER_LIMIT]
+
+    def setup(num_voters, num_candidates):
+        return irv.generate_voter_preferences(candidate_names(num_candidates), num_voters, seed=1)
+
+    return (sweep('redistribute_votes[list]', voters, candidates,
+                  lambda n, c, preferences: irv.redistribute_votes(preferences, 'C0'), setup)
+            + sweep('redistribute_votes[weighted]', voters, candidates,
+                    lambda n, c, weighted: irv.redistribute_votes(weighted, 'C0'),
+                    lambda n, c: irv.compress_preferences(setup(n, c))))
+
+
+def bench_bootstrap(voters, candidates):
+    # Mallows rankings are nearly all distinct from 8 candidates up, which is
+    # the case where resampling ranking by ranking would be slowest
+    def setup(num_voters, num_candidates):
+        return electorate.random_electorate(num_candidates, num_voters, 1, 'mallows', phi=0.9)
+
+    return sweep('robustness[mallows]', voters, candidates,
+                 lambda n, c, data: bootstrap.robustness(data[0], candidate_names(c), data[1], seed=1),
+                 setup, repeat=1)
+
+
+def bench_render(voters, candidates):
+    import game
+
+    game.init_display()
+    results = []
+    for num_candidates in candidates:
+        names = candidate_names(num_candidates)
+        winner, round_results = irv.simulate_voting_rounds(1_000, names, seed=1)
+
+        def scroll_frame():
+            # Scroll a step, wrapping around at the bottom, and redraw the results
+            height = game.results_content_size(round_results, game.results_zoom)[1]
+            game.scroll_results(game.SCROLL_STEP // 2, game.SCROLL_STEP)
+            if game.results_scroll_y + game.RESULTS_VIEW_HEIGHT >= height:
+                game.scroll_results(-game.results_scroll_x, -game.results_scroll_y)
+            game.draw_results_screen(winner, round_results, {1: names[0]})
+
+        def zoom_frame():
+            # Step through every zoom level and back, redrawing each time
+            level = game.ZOOM_LEVELS.index(game.results_zoom)
+            game.zoom_results(1 if level < len(game.ZOOM_LEVELS) - 1 else 1 - len(game.ZOOM_LEVELS))
+            game.draw_results_screen(winner, round_results, {1: names[0]})
+
+        frames = {
+            'draw_menu_screen': game.draw_menu_screen,
+            'draw_tutorial_screen': game.draw_tutorial_screen,
+            'draw_voting_screen': game.draw_voting_screen,
+            'draw_results_view': lambda: game.draw_results_view(round_results),
+            'draw_results_screen': lambda: game.draw_results_screen(winner, round_results, {1: names[0]}),
+            'scroll_results': scroll_frame,
+            'zoom_results': zoom_frame,
+        }
+        for name, draw in frames.items():
+            draw()  # Warm the font and text caches
+            median, best = measure(draw, RENDER_FRAMES)
+            results.append({'benchmark': f'render[{name}]', 'params': {'candidates': num_candidates},
+                            'seconds': median, 'best': best})
+            print(f"  render[{name}]{'':<6} candidates={num_candidates:<3} {median * 1000:10.3f} ms/frame", flush=True)
+    results.append({'benchmark': 'render[text_cache]', 'params': {}, 'stats': dict(game.text_cache_stats)})
+    results.append({'benchmark': 'render[round_tiles]', 'params': {}, 'stats': dict(game.round_tile_stats)})
+    return results
+
+
+GROUPS = {
+    'generate': bench_generate,
+    'tabulate': bench_tabulate,
+    'redistribute': bench_redistribute,
+    'bootstrap': bench_bootstrap,
+    'render': bench_render,
+}
+
+
+def scaling_exponents(results):
+    """Log-log slope of time against voters for each benchmark and candidate count."""
+    curves = {}
+    for result in results:
+        params = result.get('params', {})
+        if 'voters' in params and result.get('seconds'):
+            curves.setdefault((result['benchmark'], params['candidates']), []).append(
+                (params['voters'], result['seconds']))
+    exponents = {}
+    for (benchmark, num_candidates), points in curves.items():
+        points = [(v, s) for v, s in points if v >= 1_000]
+        if len(points) >= 2:
+            x = np.log([v for v, _ in points])
+            y = np.log([s for _, s in points])
+            exponents[f'{benchmark} candidates={num_candidates}'] = float(np.polyfit(x, y, 1)[0])
+    return exponents
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    def key(result):
+        return result['benchmark'], json.dumps(result.get('params', {}), sort_keys=True)
+
+    before = {key(result): result for result in baseline['results'] if 'seconds' in result}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        old = before.get(key(result))
+        if old and 'seconds' in result:
+            speedup = old['seconds'] / result['seconds'] if result['seconds'] else math.inf
+            print(f"  {result['benchmark']:<32} {key(result)[1]:<36} {old['seconds'] * 1000:10.2f} -> "
+                  f"{result['seconds'] * 1000:10.2f} ms  ({speedup:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='small sizes only')
+    parser.add_argument('--only', nargs='+', choices=sorted(GROUPS), default=sorted(GROUPS))
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    voters = QUICK_VOTER_SWEEP if args.quick else VOTER_SWEEP
+    candidates = QUICK_CANDIDATE_SWEEP if args.quick else CANDIDATE_SWEEP
+    results = []
+    for group in args.only:
+        print(f"{group}:")
+        results += GROUPS[group](voters, candidates)
+
+    exponents = scaling_exponents(results)
+    if exponents:
+        print("\nScaling with voters (time ~ voters^k):")
+        for name, exponent in sorted(exponents.items()):
+            print(f"  {name:<52} k={exponent:.2f}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'quick': args.quick,
+        'results': results,
+        'scaling': exponents,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=1)
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
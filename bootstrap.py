@@ -0,0 +1,215 @@
+"""Bootstrap robustness of an IRV result.
+
+How close was a count? Resample the electorate many times with replacement
+and see how often each candidate still wins and how often the elimination
+order survives.
+
+Resamples are never drawn ballot by ballot or ranking by ranking. Which
+candidate a ranking counts for depends only on who has been eliminated, so
+the count walks the tree of elimination histories: resamples that have
+dropped the same candidates share one ballot state, and a branch moves only
+the rankings on the candidate it eliminates. Rankings that have counted for
+the same candidates in every round so far form a cell, and each resample
+only holds its number of ballots per cell. When a cell's rankings move on, a
+resample's ballots in it are split over the new cells by a multinomial draw,
+which is exactly how a multinomial resample of every ranking would split
+them. Work grows with the distinct histories rather than resamples times
+rankings: 1,000 resamples of a 12-candidate Mallows electorate with 1M
+distinct rankings take about 3s. A count so close that nearly every resample
+eliminates in its own order shares nothing, and each resample then costs
+about one count of the ballots (3 minutes for the same size under impartial
+culture).
+
+Decisions follow tabulation.round_decision: a majority of the continuing
+votes wins, otherwise the first candidate with the fewest votes is
+eliminated.
+
+    summary = robustness(ranks, candidates, counts, resamples=1000, seed=1)
+    summary.win_probability   # {name: share of resamples won}
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tabulation import PileCounter, compress_ballots
+
+
+DEFAULT_RESAMPLES = 1000
+
+
+def _cells(keys, size):
+    # (distinct keys, index of each key among them) for small non-negative keys
+    present = np.flatnonzero(np.bincount(keys, minlength=size))
+    lookup = np.zeros(size, dtype=np.intp)
+    lookup[present] = np.arange(len(present))
+    return present, lookup.take(keys)
+
+
+def _count_histories(ranks, num_candidates, held, split):
+    # Count len(held) elections over the distinct rankings ranks together.
+    # held is each election's ballot total as a (resamples, 1) column;
+    # split(members, held, parents, rows, cells) returns, for the elections
+    # members, their ballots in each new cell, where the rankings rows go to
+    # new cells cells, carved out of the held cells parents
+    num_resamples = len(held)
+    counter = PileCounter(ranks, num_candidates)
+    winners = np.full(num_resamples, -1, dtype=np.intp)
+    elimination_rounds = np.zeros((num_resamples, num_candidates), dtype=np.int16)
+    exhausted = num_candidates + 1
+    # Every ranking starts in cell 0 and moves to a cell per first choice
+    everyone = np.arange(num_resamples)
+    keys, cell = _cells(counter.choice, exhausted)
+    held = split(everyone, held, np.zeros(len(keys), dtype=np.intp), np.arange(len(ranks)), cell)
+
+    def descend(members, held, cell_choice, number):
+        # held[i, k]: ballots of election members[i] in cell k, which counts
+        # for cell_choice[k]
+        counts = (held @ np.eye(exhausted, dtype=np.int64)[cell_choice])[:, :num_candidates]
+        live = counter.active[:num_candidates]
+        if not live.any():
+            return
+        majority = live & (counts * 2 > (counts * live).sum(axis=1, keepdims=True))
+        won = majority.any(axis=1)
+        winners[members[won]] = majority[won].argmax(axis=1)
+        lowest = np.where(live, counts, np.iinfo(np.int64).max).argmin(axis=1)
+        for candidate in np.unique(lowest[~won]).tolist():
+            branch = ~won & (lowest == candidate)
+            elimination_rounds[members[branch], candidate] = number
+            # Only the candidate's pile moves; keep what undoing that needs
+            pile = counter.piles[candidate]
+            moved = np.sort(np.concatenate(pile)) if pile else np.zeros(0, dtype=np.intp)
+            pointer, old_cells = counter.pointer[moved], cell[moved]
+            sizes, totals = [len(other) for other in counter.piles], counter.totals.copy()
+            counter.eliminate([candidate])
+            # One new cell per (old cell, next choice) pair of the moved rankings
+            keys, cells = _cells(old_cells * exhausted + counter.choice[moved], len(cell_choice) * exhausted)
+            cell[moved] = len(cell_choice) + cells
+            branch_held = held[branch]
+            branch_held = np.concatenate([branch_held, split(members[branch], branch_held, keys // exhausted,
+                                                             moved, cells)], axis=1)
+            branch_held[:, np.flatnonzero(cell_choice == candidate)] = 0
+            descend(members[branch], branch_held, np.concatenate([cell_choice, keys % exhausted]), number + 1)
+            # Undo the elimination for the next branch
+            counter.active[candidate] = True
+            counter.pointer[moved] = pointer
+            counter.choice[moved] = candidate
+            for other, size in zip(counter.piles, sizes):
+                del other[size:]
+            counter.piles[candidate] = pile
+            counter.totals = totals
+            cell[moved] = old_cells
+
+    descend(everyone, held, keys, 1)
+    return winners, elimination_rounds
+
+
+def batched_irv(ranks, num_candidates, weights):
+    """Count every row of weights (elections x distinct rankings) over ranks at once.
+
+    Returns (winners, elimination_rounds): each row's winner id, or -1 if
+    every candidate was eliminated, and per row and candidate the round it
+    was eliminated after, or 0 if it never was.
+    """
+    weights = np.asarray(weights, dtype=np.int64)
+
+    def take(members, held, parents, rows, cells):
+        # Each row's ballots in the new cells, straight from its weights
+        order = np.argsort(cells, kind='stable')
+        starts = np.searchsorted(cells[order], np.arange(len(parents)))
+        return np.add.reduceat(weights[np.ix_(members, rows[order])], starts, axis=1)
+
+    return _count_histories(ranks, num_candidates, weights.sum(axis=1, keepdims=True), take)
+
+
+def resampled_irv(ranks, num_candidates, counts, resamples, rng):
+    """Count resamples bootstrap resamples of the ballots counts[i] x ranks[i].
+
+    Returns (winners, elimination_rounds) like batched_irv, with the same
+    distribution as counting multinomial resamples of counts one by one.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+
+    def draw(members, held, parents, rows, cells):
+        # Split each parent cell's ballots by the share of them in each new cell
+        masses = np.bincount(cells, weights=counts[rows], minlength=len(parents))
+        drawn = np.zeros((len(members), len(parents)), dtype=np.int64)
+        for parent in np.unique(parents).tolist():
+            new = np.flatnonzero(parents == parent)
+            drawn[:, new] = rng.multinomial(held[:, parent], masses[new] / masses[new].sum())
+        return drawn
+
+    return _count_histories(ranks, num_candidates, np.full((resamples, 1), counts.sum(), dtype=np.int64), draw)
+
+
+class Robustness:
+    """Win and elimination-order statistics over bootstrap resamples."""
+
+    def __init__(self, candidates, observed, winners, elimination_rounds):
+        self.candidates = list(candidates)
+        self.resamples = len(winners)
+        observed_winner, observed_rounds = observed
+        self.observed_winner = None if observed_winner < 0 else self.candidates[observed_winner]
+        self.observed_rounds = observed_rounds
+        wins = np.bincount(winners[winners >= 0], minlength=len(self.candidates))
+        self.win_probability = {name: float(wins[c] / self.resamples) for c, name in enumerate(self.candidates)}
+        self.no_winner = float((winners < 0).mean())
+        # Resamples in which the candidate goes out after the same round as in the
+        # real count, or, for its winner, is never eliminated
+        same = elimination_rounds == observed_rounds
+        self.same_round = {name: float(same[:, c].mean()) for c, name in enumerate(self.candidates)}
+        self.order_stability = float(same.all(axis=1).mean())
+        # How often each candidate was eliminated after each round, round 0 meaning never
+        self.elimination_rounds = {name: np.bincount(elimination_rounds[:, c], minlength=len(self.candidates) + 1)
+                                   for c, name in enumerate(self.candidates)}
+
+    def as_dict(self):
+        return {
+            'resamples': self.resamples,
+            'observed_winner': self.observed_winner,
+            'win_probability': self.win_probability,
+            'no_winner': self.no_winner,
+            'same_round': self.same_round,
+            'order_stability': self.order_stability,
+            'elimination_rounds': {name: counts.tolist() for name, counts in self.elimination_rounds.items()},
+        }
+
+
+def robustness(ranks, candidates, weights=None, resamples=DEFAULT_RESAMPLES, seed=None):
+    """Bootstrap a count of ranks resamples times, returning a Robustness summary."""
+    if resamples < 1:
+        raise ValueError("resamples must be at least 1")
+    ranks, counts = compress_ballots(ranks, weights)
+    # A what-if can leave a ranking nobody casts, which has nothing to resample
+    ranks, counts = ranks[counts > 0], counts[counts > 0]
+    num_candidates = len(candidates)
+    winner, rounds = batched_irv(ranks, num_candidates, counts[None])
+    winners, elimination_rounds = resampled_irv(ranks, num_candidates, counts, resamples,
+                                                np.random.default_rng(seed))
+    return Robustness(candidates, (winner[0], rounds[0]), winners, elimination_rounds)
+
+
+if __name__ == '__main__':
+    from electorate import MODELS, random_electorate
+
+    parser = argparse.ArgumentParser(description='Bootstrap how robust a simulated IRV result is.')
+    parser.add_argument('--voters', type=int, default=1_000_000)
+    parser.add_argument('--candidates', nargs='+', default=['Alice', 'Bob', 'Charlie', 'Diana', 'Eve'])
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument('--model', choices=sorted(MODELS), default='impartial')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    # Resampling gets its own stream so it does not replay the electorate's
+    voters, resampling = np.random.SeedSequence(args.seed).spawn(2)
+    ranks, counts = random_electorate(len(args.candidates), args.voters, voters, args.model)
+    started = time.perf_counter()
+    summary = robustness(ranks, args.candidates, counts, args.resamples, resampling)
+    print(f"{args.resamples} resamples of {args.voters:,} ballots ({len(ranks):,} distinct) "
+          f"in {time.perf_counter() - started:.2f}s")
+    print(f"Observed winner {summary.observed_winner}; elimination order held in "
+          f"{summary.order_stability:.1%} of resamples")
+    for name in args.candidates:
+        print(f"  {name}: wins {summary.win_probability[name]:.1%}, "
+              f"finishes as in the real count {summary.same_round[name]:.1%}")
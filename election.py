@@ -0,0 +1,266 @@
+"""Checkpointed elections for cheap what-if recounts.
+
+An Election keeps its ballots together with every round's count vector and
+the order candidates were eliminated in. A what-if (with_ballot or
+with_ballots) describes its change as a handful of signed ballot rows, so the
+stored rounds can be patched instead of recounted: which candidate a ballot
+counts for in round r depends only on the candidates eliminated before round
+r, so each stored count vector is corrected by the changed rows alone.
+
+Rounds are replayed that way while they lead to the same decision. At the
+first round whose decision changes, a counter is rebuilt over the amended
+ballots with the shared earlier eliminations applied in one batch, and the
+count carries on from there. A what-if that does not change the outcome never
+touches the full ballot matrix. The opening count is kept in the result cache,
+so recreating an election over the same ballots skips it.
+
+ballot_outcomes applies the same idea to every ranking one ballot could
+carry at once: all variants are patched into each stored round together.
+Variants that eliminate a different candidate are grouped by that choice, and
+each group is settled the same way on a single recount of that branch.
+"""
+
+import itertools
+
+import numpy as np
+
+import result_cache
+from tabulation import COUNTERS, RoundResult, ballot_matrix, blank_value, round_decision, run_rounds
+
+
+class Election:
+    """One counted election whose rounds are kept for what-if recounts.
+
+    Counts one elimination per round with the 'first' tie-break, since the
+    replay relies on round r following exactly r eliminations.
+    """
+
+    def __init__(self, ranks, candidates, weights=None, method='piles', processes=1, cache=True):
+        self.ranks = ranks
+        self.candidates = list(candidates)
+        self.weights = weights
+        self.method = method
+        self.processes = processes
+        # Signed ballot rows added on top of ranks by what-ifs
+        self.delta_ranks = np.zeros((0, ranks.shape[1]), dtype=ranks.dtype)
+        self.delta_weights = np.zeros(0, dtype=np.int64)
+        # Rows of ranks whose ballot a what-if replaced, mapped to the new row
+        self.replaced = {}
+        self.rounds = []
+        self.eliminated = []
+        self.winner = None
+        self.replayed_rounds = 0
+        if not cache:
+            self._count_from([])
+            return
+        store = result_cache.default_cache
+        key = store.key('election', ranks, self.candidates, weights)
+        stored = store.get(key)
+        if stored is None:
+            self._count_from([])
+            store.put(key, {'rounds': [counts.tolist() for counts in self.rounds],
+                            'eliminated': self.eliminated, 'winner': self.winner})
+        else:
+            self.rounds = [np.array(counts, dtype=np.int64) for counts in stored['rounds']]
+            self.eliminated = list(stored['eliminated'])
+            self.winner = stored['winner']
+
+    @property
+    def num_candidates(self):
+        return len(self.candidates)
+
+    @property
+    def winner_name(self):
+        return None if self.winner is None else self.candidates[self.winner]
+
+    @property
+    def round_details(self):
+        """Per-round vote counts as RoundResult dicts, like tabulate returns."""
+        details = []
+        for number, counts in enumerate(self.rounds):
+            gone = set(self.eliminated[:number])
+            dropped = [self.candidates[c] for c in self.eliminated[number:number + 1]]
+            details.append(RoundResult({name: int(counts[c]) for c, name in enumerate(self.candidates) if c not in gone},
+                                       dropped))
+        return details
+
+    def result(self):
+        """(winner name, round_details), the same shape tabulate returns."""
+        return self.winner_name, self.round_details
+
+    def ballot(self, index):
+        """Current rank row of ballot row index, after any replacement."""
+        return self.replaced.get(index, self.ranks[index])
+
+    def ballots(self):
+        """(ranks, weights) of every ballot counted, with the what-ifs applied."""
+        return self._amended()
+
+    def ranking_row(self, ranking):
+        """Rank row for a ranking given as candidate names."""
+        return ballot_matrix([list(ranking)], self.candidates)[0]
+
+    def with_ballot(self, index, ranking):
+        """What-if: one voter of ballot row index ranks ranking (candidate names) instead."""
+        old = self.ballot(index)
+        new = self.ranking_row(ranking)
+        what_if = self.with_ballots([old, new], [-1, 1])
+        what_if.replaced[index] = new
+        return what_if
+
+    def with_ballots(self, rows, weights):
+        """What-if: add rank rows with signed weights (negative removes ballots)."""
+        rows = _stack(rows, self.ranks.dtype)
+        weights = np.asarray(weights, dtype=np.int64)
+        what_if = Election.__new__(Election)
+        what_if.__dict__.update(self.__dict__)
+        what_if.replaced = dict(self.replaced)
+        width = max(rows.shape[1], self.delta_ranks.shape[1])
+        what_if.delta_ranks = np.concatenate([_pad(self.delta_ranks, width), _pad(rows, width)])
+        what_if.delta_weights = np.concatenate([self.delta_weights, weights])
+        what_if._replay(self, rows, weights)
+        return what_if
+
+    def ballot_outcomes(self, index, truncations=True):
+        """Winner for every ranking ballot row index could carry.
+
+        Returns {ranking as a tuple of names: winner name}, covering every
+        ordering of the candidates and, with truncations, every shorter
+        ranking including the blank ballot.
+        """
+        num_candidates = self.num_candidates
+        lengths = range(num_candidates + 1) if truncations else [num_candidates]
+        rankings = [ranking for length in lengths
+                    for ranking in itertools.permutations(range(num_candidates), length)]
+        rows = _pad(_stack(rankings, self.ranks.dtype), num_candidates)
+        winners = np.full(len(rankings), -1, dtype=np.intp)
+        # Count everyone else once, then add each variant as the one extra ballot
+        others = self.with_ballots([self.ballot(index)], [-1])
+        others._settle(rows, np.arange(len(rankings)), 0, winners)
+        return {tuple(self.candidates[c] for c in ranking): None if winner < 0 else self.candidates[winner]
+                for ranking, winner in zip(rankings, winners.tolist())}
+
+    def _settle(self, rows, variants, start, winners):
+        # Decide, from round start on, the winner with each of rows[variants]
+        # added as one more ballot. Variants follow this count's path while
+        # they make the same decisions; those that eliminate someone else are
+        # grouped by that elimination and settled on a recounted branch.
+        num_candidates = self.num_candidates
+        active = np.ones(blank_value(rows.dtype) + 1, dtype=bool)
+        active[num_candidates:] = False
+        for number in range(start, len(self.rounds)):
+            active[self.eliminated[:number]] = False
+            live = np.flatnonzero(active[:num_candidates])
+            variant_counts = np.repeat(self.rounds[number][None, live], len(variants), axis=0)
+            choice = np.searchsorted(live, _choices(rows[variants], active, num_candidates))
+            counted = choice < len(live)
+            variant_counts[np.flatnonzero(counted), choice[counted]] += 1
+            # Same rule as round_decision, for all variants at once
+            majority = variant_counts * 2 > variant_counts.sum(axis=1, keepdims=True)
+            has_winner = majority.any(axis=1)
+            winner = live[majority.argmax(axis=1)]
+            lowest = live[variant_counts.argmin(axis=1)]
+            if number < len(self.eliminated):
+                same = ~has_winner & (lowest == self.eliminated[number])
+            else:
+                same = has_winner & (winner == self.winner)
+            settled = ~same & has_winner
+            winners[variants[settled]] = winner[settled]
+            branching = ~same & ~has_winner
+            for candidate in np.unique(lowest[branching]).tolist():
+                branch = self._branch(self.eliminated[:number] + [candidate])
+                branch._settle(rows, variants[branching & (lowest == candidate)], number + 1, winners)
+            variants = variants[same]
+            if not variants.size:
+                return
+        winners[variants] = -1 if self.winner is None else self.winner
+
+    def _branch(self, eliminated):
+        # The same ballots counted with eliminated forced as the opening eliminations
+        branch = Election.__new__(Election)
+        branch.__dict__.update(self.__dict__)
+        branch.rounds = self.rounds[:len(eliminated)]
+        branch._count_from(eliminated)
+        return branch
+
+    def _replay(self, base, rows, weights):
+        # Patch base's stored rounds with the changed rows until a decision changes
+        self.rounds, self.eliminated, self.winner = [], [], None
+        active = np.ones(blank_value(rows.dtype) + 1, dtype=bool)
+        active[self.num_candidates:] = False
+        for number, base_counts in enumerate(base.rounds):
+            gone = base.eliminated[:number]
+            active[gone] = False
+            counts = base_counts + np.bincount(_choices(rows, active, self.num_candidates), weights=weights,
+                                               minlength=self.num_candidates + 1).astype(np.int64)
+            self.rounds.append(counts)
+            winner, lowest = round_decision(counts, [c for c in range(self.num_candidates) if c not in gone])
+            if winner is not None:
+                self.winner = winner
+            else:
+                self.eliminated.append(lowest)
+            self.replayed_rounds = number + 1
+            if winner is not None and winner == base.winner and number == len(base.rounds) - 1:
+                return
+            if winner is None and number < len(base.eliminated) and lowest == base.eliminated[number]:
+                continue
+            break
+        if self.winner is None and len(self.eliminated) < self.num_candidates:
+            # Diverged: count the rest from the amended ballots
+            self._count_from(self.eliminated)
+
+    def _count_from(self, eliminated):
+        # Build a counter over every ballot, drop eliminated at once and run the remaining rounds
+        ranks, weights = self._amended()
+        eliminated = list(eliminated)
+        checkpoints = []
+        if self.processes == 1:
+            counter = COUNTERS[self.method](ranks, self.num_candidates, weights)
+            if eliminated:
+                counter.eliminate(eliminated)
+            winner, _ = run_rounds(counter, self.candidates, eliminated, checkpoints)
+        else:
+            from sharded import ShardedCounter
+            with ShardedCounter(ranks, self.num_candidates, weights, self.processes, self.method) as counter:
+                if eliminated:
+                    counter.eliminate(eliminated)
+                winner, _ = run_rounds(counter, self.candidates, eliminated, checkpoints)
+        self.rounds = self.rounds + checkpoints
+        self.eliminated = eliminated
+        self.winner = None if winner is None else self.candidates.index(winner)
+
+    def _amended(self):
+        # The stored ballots with every what-if row appended
+        if not len(self.delta_weights):
+            return self.ranks, self.weights
+        width = max(self.ranks.shape[1], self.delta_ranks.shape[1])
+        ranks = np.concatenate([_pad(self.ranks, width), _pad(self.delta_ranks, width)])
+        weights = np.ones(len(self.ranks), dtype=np.int64) if self.weights is None else self.weights
+        return ranks, np.concatenate([weights, self.delta_weights])
+
+
+def _stack(rows, dtype):
+    # Rank rows of differing lengths as one blank-padded matrix
+    rows = [np.asarray(row, dtype=dtype) for row in rows]
+    matrix = np.full((len(rows), max((len(row) for row in rows), default=0)), blank_value(dtype), dtype=dtype)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def _pad(ranks, width):
+    if ranks.shape[1] == width:
+        return ranks
+    padded = np.full((len(ranks), width), blank_value(ranks.dtype), dtype=ranks.dtype)
+    padded[:, :ranks.shape[1]] = ranks
+    return padded
+
+
+def _choices(rows, active, num_candidates):
+    # Candidate each row counts for under the active lookup table, or num_candidates if exhausted
+    if not rows.shape[1]:
+        return np.full(len(rows), num_candidates, dtype=np.intp)
+    usable = active.take(rows)
+    position = usable.argmax(axis=1)
+    picked = np.arange(len(rows)), position
+    return np.where(usable[picked], rows[picked], num_candidates)
@@ -0,0 +1,186 @@
+"""Random electorates for simulated elections.
+
+Every model draws a whole rank matrix at once from a seedable NumPy generator:
+one row per voter, one column per rank, cells holding candidate indices and
+blank ranks marked the same way as in tabulation.
+
+    impartial   every full ranking equally likely
+    mallows     rankings concentrated around a reference ranking
+    spatial     voters and candidates on a 1-D ideology line, ranked by distance
+    truncated   any of the above with each ballot cut off at a random length
+"""
+
+import functools
+import itertools
+import math
+
+import numpy as np
+
+from tabulation import blank_value, compress_ballots, packs_into_key, rank_dtype
+
+
+# Past this many candidates the list of every possible ordering gets too big
+MAX_ENUMERATED_CANDIDATES = 8
+# Voters whose insertions are decoded at once, few enough to stay in cache
+INSERTION_CHUNK = 1 << 14
+
+
+@functools.lru_cache(maxsize=None)
+def _orderings(num_candidates):
+    # Every ordering of the candidates, one per row; shared, so read-only
+    orderings = np.array(list(itertools.permutations(range(num_candidates))),
+                         dtype=rank_dtype(num_candidates)).reshape(-1, num_candidates)
+    orderings.flags.writeable = False
+    return orderings
+
+
+def _random_insertions(num_voters, reference, phi, rng):
+    # Rankings built by inserting reference[0], reference[1], ... in turn, each
+    # d places from the end of the ranking so far with probability
+    # proportional to phi ** d
+    num_candidates = len(reference)
+    ranks = np.empty((num_voters, num_candidates), dtype=reference.dtype)
+    steps = np.arange(num_candidates)
+    last = steps.astype(reference.dtype)[:, None]
+    if phi != 1:
+        tail = (1 - float(phi) ** (steps + 1)).astype(np.float32)[:, None]
+        with np.errstate(divide='ignore'):
+            inverse_log = np.float32(1 / np.log(phi))
+    for start in range(0, num_voters, INSERTION_CHUNK):
+        count = min(INSERTION_CHUNK, num_voters - start)
+        # Every insertion of the chunk drawn at once, row i for reference[i],
+        # through the inverse CDF of the distance from the end
+        draws = rng.random((num_candidates, count), dtype=np.float32)
+        if phi == 1:
+            distance = draws * (steps + 1).astype(np.float32)[:, None]
+        else:
+            distance = np.log(1 - draws * tail) * inverse_log
+        np.minimum(distance, last, out=distance)
+        positions = last - distance.astype(reference.dtype)
+        # Each insertion shifts the candidates at or after it one place right,
+        # which leaves every row of positions at its candidate's final place
+        for i in range(1, num_candidates):
+            placed = positions[:i]
+            placed += placed >= positions[i]
+        cells = ranks[start:start + count].reshape(-1)
+        rows = np.arange(0, count * num_candidates, num_candidates)
+        for i in range(num_candidates):
+            cells[rows + positions[i]] = reference[i]
+    return ranks
+
+
+def impartial_culture(num_candidates, num_voters, rng):
+    """Uniformly random full rankings."""
+    if num_candidates <= MAX_ENUMERATED_CANDIDATES:
+        # Picking a row of the ordering table is much cheaper than sorting
+        orderings = _orderings(num_candidates)
+        return orderings[rng.integers(0, len(orderings), num_voters)]
+    # Inserting every candidate at a uniformly random place gives a uniformly
+    # random ordering, and is cheaper than argsorting rows of random keys
+    return _random_insertions(num_voters, np.arange(num_candidates, dtype=rank_dtype(num_candidates)), 1.0, rng)
+
+
+@functools.lru_cache(maxsize=None)
+def _insertion_orderings(num_candidates):
+    # Ranking produced by every insertion vector, indexed in mixed radix
+    # (the i-th digit is where reference candidate i was inserted)
+    table = []
+    for digits in itertools.product(*(range(i + 1) for i in range(num_candidates))):
+        ranking = []
+        for candidate, position in enumerate(digits):
+            ranking.insert(position, candidate)
+        table.append(ranking)
+    table = np.array(table, dtype=rank_dtype(num_candidates)).reshape(-1, num_candidates)
+    table.flags.writeable = False
+    return table
+
+
+def mallows(num_candidates, num_voters, rng, phi=0.5, reference=None):
+    """Rankings around reference, each swap away from it weighted by phi.
+
+    Uses the repeated insertion model: the i-th reference candidate is
+    inserted at position j of the partial ranking with probability
+    proportional to phi ** (i - j). Past MAX_ENUMERATED_CANDIDATES every
+    ballot cell takes one random draw, so 10M ballots of 20 candidates take
+    a second or two rather than well under one.
+    """
+    dtype = rank_dtype(num_candidates)
+    reference = np.arange(num_candidates, dtype=dtype) if reference is None else np.asarray(reference, dtype=dtype)
+    if num_candidates <= MAX_ENUMERATED_CANDIDATES:
+        # Few enough candidates to tabulate every insertion vector, so each
+        # voter is a single draw from their joint distribution
+        insertion = [phi ** np.arange(i, -1, -1, dtype=float) for i in range(num_candidates)]
+        insertion = [weights / weights.sum() for weights in insertion]
+        probabilities = np.ones(1)
+        for weights in insertion:
+            probabilities = np.outer(probabilities, weights).reshape(-1)
+        index = np.searchsorted(np.cumsum(probabilities), rng.random(num_voters, dtype=np.float32))
+        index = np.minimum(index, len(probabilities) - 1)
+        return reference[_insertion_orderings(num_candidates)][index]
+
+    return _random_insertions(num_voters, reference, phi, rng)
+
+
+def spatial(num_candidates, num_voters, rng, candidate_positions=None, spread=1.0):
+    """Voters rank candidates by distance on a single ideology axis."""
+    if candidate_positions is None:
+        candidate_positions = rng.normal(0.0, spread, num_candidates)
+    candidate_positions = np.asarray(candidate_positions, dtype=float)
+    # On a line the ranking only changes where a voter crosses the midpoint of
+    # two candidates, so rank one point per interval and look voters up
+    midpoints = np.unique((candidate_positions[:, None] + candidate_positions) / 2)
+    representatives = np.concatenate([midpoints[:1] - 1, (midpoints[:-1] + midpoints[1:]) / 2, midpoints[-1:] + 1])
+    table = np.abs(representatives[:, None] - candidate_positions).argsort(axis=1, kind='stable')
+    voters = rng.normal(0.0, spread, num_voters)
+    return table.astype(rank_dtype(num_candidates))[np.searchsorted(midpoints, voters)]
+
+
+def truncated(num_candidates, num_voters, rng, base='impartial', min_length=1, **params):
+    """Ballots from the base model cut off after a uniformly random number of ranks."""
+    ranks = MODELS[base](num_candidates, num_voters, rng, **params)
+    lengths = rng.integers(min_length, num_candidates + 1, num_voters)
+    ranks[np.arange(num_candidates) >= lengths[:, None]] = blank_value(ranks.dtype)
+    return ranks
+
+
+MODELS = {
+    'impartial': impartial_culture,
+    'mallows': mallows,
+    'spatial': spatial,
+    'truncated': truncated,
+}
+
+
+def generate(num_candidates, num_voters, model='impartial', seed=None, **params):
+    """Draw a rank matrix of num_voters ballots from the named model."""
+    return MODELS[model](num_candidates, num_voters, np.random.default_rng(seed), **params)
+
+
+def impartial_culture_counts(num_candidates, num_voters, seed=None):
+    """Draw uniformly random full rankings as (distinct rankings, voter counts).
+
+    Only the number of voters casting each of the C! orderings is drawn, so the
+    cost does not depend on num_voters.
+    """
+    rng = np.random.default_rng(seed)
+    orderings = _orderings(num_candidates)
+    counts = rng.multinomial(num_voters, np.full(len(orderings), 1 / len(orderings)))
+    cast = counts > 0
+    return orderings[cast], counts[cast]
+
+
+def random_electorate(num_candidates, num_voters, seed=None, model='impartial', **params):
+    """Draw an electorate from the named model as (rankings, voter counts).
+
+    Identical rankings are merged only where that can pay off: when there are
+    fewer possible orderings than voters, or rows are short enough to sort as
+    integer keys. Otherwise nearly every row is distinct, so the rows are
+    returned as drawn with counts of None, one voter each.
+    """
+    if (model == 'impartial' and num_candidates <= MAX_ENUMERATED_CANDIDATES
+            and math.factorial(num_candidates) < num_voters):
+        return impartial_culture_counts(num_candidates, num_voters, seed)
+    ranks = generate(num_candidates, num_voters, model, seed, **params)
+    if math.factorial(num_candidates) < num_voters or packs_into_key(ranks):
+        return compress_ballots(ranks)
+    return ranks, None
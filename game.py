@@ -1,17 +1,33 @@
 import pygame
 import sys
-import random
 import itertools
+import json
+import random
+import time
+
+from collections import OrderedDict
 
 from typing import Optional, List, Dict
 
+import bootstrap
+import irv
+import metrics
+import pairwise
+from irv import (get_vote_counts, get_winner, eliminate_candidate, redistribute_votes,
+                 compress_preferences, generate_voter_preferences, simulate_voting_rounds)
 
-# Initialize Pygame
-pygame.init()
 
 # Constants
 NUM_VOTERS = 100
 
+# The last counted election, kept so what-if recounts can reuse its voters
+election = None
+# Head-to-head results of the electorate behind the results on screen
+head_to_head = None
+# Seed of the simulated voters for the current candidates; replaying with the
+# same candidates faces the same voters, so identical ballots hit the result cache
+electorate_seed = random.randrange(2 ** 32)
+
 # Global variables with type annotations
 winner: Optional[str] = None
 round_results: List[Dict[str, int]] = []
@@ -41,10 +57,9 @@ quiz_questions = [
     }
 ]
 
-# Set up the display
+# Set up the display; the window itself is only opened by init_display()
 screen_width, screen_height = 1200, 800
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption('Voter Education Game for RCV')
+screen = None
 
 # Constants to adjust the size of the bars and spacing
 BAR_WIDTH = 20  # Width of each bar
@@ -59,6 +74,27 @@ TEXT_HEIGHT = 30
 NAME_FONT_SIZE = 22  
 VOTE_COUNT_FONT_SIZE = 20
 
+# Retained results view: the results it was built from, the composed footer,
+# and whether it is what the display currently shows
+main_menu_button_rect = pygame.Rect(screen_width - 170, screen_height - 60, 150, 40)
+results_footer = None
+results_key = None
+results_visible = False
+results_button_hovered = None
+
+# The rounds scroll inside a viewport above the footer. Each round is drawn
+# as horizontal tiles that are only built once they scroll into view.
+RESULTS_VIEW_HEIGHT = screen_height - TEXT_HEIGHT - PADDING_BOTTOM - 20
+RESULTS_TILE_WIDTH = 512
+ROUND_TILE_CACHE_SIZE = 64
+ZOOM_LEVELS = (0.5, 0.75, 1.0, 1.5, 2.0)
+SCROLL_STEP = 60
+SCROLLBAR_WIDTH = 6
+results_scroll_x, results_scroll_y = 0, 0
+results_zoom = 1.0
+round_tiles = OrderedDict()
+round_tile_stats = {'built': 0, 'hits': 0, 'evictions': 0}
+
 
 # Define button for submitting vote
 submit_button_rect = pygame.Rect(screen_width - 160, screen_height - 70, 150, 50)
@@ -103,6 +139,14 @@ def reset_voting():
     # Reset candidate rankings for a new voting round
     global candidate_rankings
     candidate_rankings = {candidate: None for candidate in candidates}
+    forget_election()
+
+def forget_election():
+    # The counted election goes with the results it produced, so later
+    # what-ifs never recount one that is no longer on screen
+    global election, head_to_head
+    election = None
+    head_to_head = None
         
 def draw_button(button_rect, button_text, position, button_color, text_color):
     pygame.draw.rect(screen, button_color, button_rect)  # Button background
@@ -148,7 +192,7 @@ def run_what_if_analysis(initial_votes):
     if response.lower() == 'yes':
         new_rankings = input("Enter your new rankings (e.g., Diana, Alice, Bob, Charlie): ")
         sorted_candidate_names = new_rankings.split(', ')
-        winner, new_round_results = simulate_voting_rounds(NUM_VOTERS, sorted_candidate_names)
+        winner, new_round_results = what_if_count(sorted_candidate_names)
         draw_results_screen(winner, new_round_results, {i+1: name for i, name in enumerate(sorted_candidate_names)})
         
 def prompt_what_if_analysis():
@@ -156,15 +200,28 @@ def prompt_what_if_analysis():
     new_rankings = input()
     if new_rankings:
         sorted_candidate_names = new_rankings.split(', ')
-        global candidate_rankings
-        candidate_rankings = {name: i+1 for i, name in enumerate(sorted_candidate_names)}
-        winner, new_round_results = simulate_voting_rounds(NUM_VOTERS, sorted_candidate_names)
-        global round_results
-        round_results = new_round_results
+        unknown = [name for name in sorted_candidate_names if name not in candidates]
+        if unknown:
+            print(f"Unknown candidates: {', '.join(unknown)}")
+            return
+        global candidate_rankings, winner, round_results
+        candidate_rankings = {candidate: None for candidate in candidates}
+        candidate_rankings.update({name: i+1 for i, name in enumerate(sorted_candidate_names)})
+        winner, round_results = what_if_count(sorted_candidate_names)
         draw_results_screen(winner, round_results, candidate_rankings)
         pygame.display.flip()  # Ensure this call is here to update the screen
 
 
+def what_if_count(ranking):
+    # Recount the stored election with only the player's ballot changed, so the
+    # other voters stay the same and unchanged rounds are not counted again
+    global election, head_to_head
+    counted = shown_election()
+    election = counted.with_ballot(len(counted.ranks) - 1, ranking)
+    head_to_head = election_head_to_head()
+    return election.result()
+
+
 def handle_voting_simulation(candidate_names):
     winner, new_round_results = simulate_voting_rounds(NUM_VOTERS, candidate_names)
     global round_results
@@ -177,10 +234,12 @@ def handle_voting_simulation(candidate_names):
 
 def start_new_round():
     new_candidates = ['Eve', 'Frank', 'Gina', 'Harry']  # New set of candidates as example
-    global candidates, candidate_positions, candidate_rankings
+    global candidates, candidate_positions, candidate_rankings, electorate_seed
     candidates = new_candidates
     candidate_positions = {candidate: (100, i * 100 + 50) for i, candidate in enumerate(new_candidates)}
     candidate_rankings = {candidate: None for candidate in new_candidates}
+    electorate_seed = random.randrange(2 ** 32)  # New candidates face new voters
+    forget_election()
     global game_state
     game_state = VOTING  # Switch back to the voting screen with new candidates
     print("New round started with different candidates. Please rank them.")
@@ -209,46 +268,120 @@ def draw_bar_graph(vote_counts, x_offset, y_offset, screen, bar_width, bar_spaci
     draw_text(str(votes), (bar_x + bar_width / 2, bar_y - TEXT_SPACING), WHITE, font_size=25)
 
 def draw_text_centered(surface, text, center_x, y, color, font_size):
-    font = pygame.font.Font(None, font_size)
-    text_surface = font.render(text, True, color)
+    text_surface = render_text(text, color, font_size)
     text_rect = text_surface.get_rect(center=(center_x, y))
     surface.blit(text_surface, text_rect)
 
 
-def draw_results_screen(winner, round_results, user_rankings):
-    global screen  # Ensure 'screen' is the pygame display surface
-    global font  # Make sure to use the global font variable
-
-    screen.fill(BLACK)  # Clear the screen
-
-    y_offset = PADDING_TOP  # Start below the top padding
-    
-    for round_num, round_votes in enumerate(round_results, start=1):
-        # Left-align the round results text
-        round_text = f"Round {round_num} Results"
-        draw_text(round_text, (PADDING_LEFT, y_offset), LIGHT_BLUE, font_size=30)
-
-        # Determine the bar graph center position
-        num_bars = len(round_votes)
-        bar_graph_center_x = (screen_width // 2) - ((BAR_WIDTH + BAR_SPACING) * num_bars // 2)
-
-        # Draw bars, names, and vote counts
-        for i, (candidate, votes) in enumerate(sorted(round_votes.items(), key=lambda item: item[1], reverse=True)):
-            bar_x = bar_graph_center_x + i * (BAR_WIDTH + BAR_SPACING)
-            bar_height = (votes / max(round_votes.values())) * MAX_BAR_HEIGHT
-            bar_y = y_offset + TEXT_HEIGHT + (MAX_BAR_HEIGHT - bar_height)
-
-            # Draw the bar
-            pygame.draw.rect(screen, LIGHT_BLUE, (bar_x, bar_y, BAR_WIDTH, bar_height))
-
-            # Draw candidate name centered under the bar with a smaller font size
-            draw_text(candidate, (bar_x + (BAR_WIDTH - font.size(candidate)[0]) // 2, bar_y + bar_height + TEXT_SPACING), WHITE, font_size=NAME_FONT_SIZE)
-
-            # Draw vote count above the bar with a smaller font size
-            draw_text(str(votes), (bar_x + (BAR_WIDTH - font.size(str(votes))[0]) // 2, bar_y - font.size(str(votes))[1] - TEXT_SPACING), WHITE, font_size=VOTE_COUNT_FONT_SIZE)
-
-        # Update y_offset for the next block of content
-        y_offset += MAX_BAR_HEIGHT + TEXT_HEIGHT * 2 + TEXT_SPACING * 3
+def round_block_height(zoom):
+    # Height of one round's title, bars and labels
+    return int((MAX_BAR_HEIGHT + TEXT_HEIGHT * 2 + TEXT_SPACING * 3) * zoom)
+
+
+def results_content_size(round_results, zoom):
+    # Size of the whole results layout, of which the viewport shows a part
+    num_bars = max((len(round_votes) for round_votes in round_results), default=0)
+    width = max(screen_width, int(2 * PADDING_LEFT + num_bars * (BAR_WIDTH + BAR_SPACING) * zoom))
+    return width, PADDING_TOP + len(round_results) * round_block_height(zoom)
+
+
+def build_round_tile(round_num, round_votes, zoom, tile, content_width):
+    # Draw the part of one round's block that falls in horizontal tile number tile
+    surface = pygame.Surface((RESULTS_TILE_WIDTH, round_block_height(zoom)))
+    surface.fill(BLACK)
+    left = tile * RESULTS_TILE_WIDTH
+
+    # Left-align the round results text
+    draw_text(f"Round {round_num} Results", (PADDING_LEFT - left, 0), LIGHT_BLUE,
+              font_size=max(8, round(30 * zoom)), surface=surface)
+
+    # Determine the bar graph position, centred in the content
+    num_bars = len(round_votes)
+    slot = (BAR_WIDTH + BAR_SPACING) * zoom
+    bar_width = BAR_WIDTH * zoom
+    max_bar_height = MAX_BAR_HEIGHT * zoom
+    graph_left = content_width // 2 - slot * num_bars / 2
+    most_votes = max(round_votes.values(), default=0) or 1
+
+    # Only bars whose slot, widened for names that overhang it, meets this tile
+    overhang = 100 * zoom
+    first = max(0, int((left - graph_left - overhang) // slot))
+    last = min(num_bars, int((left + RESULTS_TILE_WIDTH - graph_left + overhang) // slot) + 1)
+    ordered = sorted(round_votes.items(), key=lambda item: item[1], reverse=True)
+    for i in range(first, last):
+        candidate, votes = ordered[i]
+        bar_x = graph_left + i * slot - left
+        bar_height = (votes / most_votes) * max_bar_height
+        # Bars hang below the title row and the vote counts above them
+        bar_y = (TEXT_HEIGHT + TEXT_SPACING + VOTE_COUNT_FONT_SIZE) * zoom + (max_bar_height - bar_height)
+        pygame.draw.rect(surface, LIGHT_BLUE, (bar_x, bar_y, bar_width, bar_height))
+
+        # Candidate name centered under the bar, vote count above it
+        name_surface = render_text(candidate, WHITE, max(8, round(NAME_FONT_SIZE * zoom)))
+        surface.blit(name_surface, (bar_x + (bar_width - name_surface.get_width()) // 2,
+                                    bar_y + bar_height + TEXT_SPACING * zoom))
+        votes_surface = render_text(str(votes), WHITE, max(8, round(VOTE_COUNT_FONT_SIZE * zoom)))
+        surface.blit(votes_surface, (bar_x + (bar_width - votes_surface.get_width()) // 2,
+                                     bar_y - votes_surface.get_height() - TEXT_SPACING * zoom))
+    round_tile_stats['built'] += 1
+    return surface
+
+
+def get_round_tile(round_results, index, zoom, tile, content_width):
+    key = (index, zoom, tile)
+    surface = round_tiles.get(key)
+    if surface is not None:
+        round_tile_stats['hits'] += 1
+        round_tiles.move_to_end(key)
+        return surface
+    surface = round_tiles[key] = build_round_tile(index + 1, round_results[index], zoom, tile, content_width)
+    if len(round_tiles) > ROUND_TILE_CACHE_SIZE:
+        # Drop the tile that has been out of view the longest
+        round_tiles.popitem(last=False)
+        round_tile_stats['evictions'] += 1
+    return surface
+
+
+def draw_results_view(round_results):
+    # Blit the round tiles that intersect the viewport, building any that are missing
+    global results_scroll_x, results_scroll_y
+    content_width, content_height = results_content_size(round_results, results_zoom)
+    results_scroll_x = max(0, min(results_scroll_x, content_width - screen_width))
+    results_scroll_y = max(0, min(results_scroll_y, content_height - RESULTS_VIEW_HEIGHT))
+
+    view = pygame.Rect(0, 0, screen_width, RESULTS_VIEW_HEIGHT)
+    screen.set_clip(view)
+    screen.fill(BLACK)
+    block = round_block_height(results_zoom)
+    first_round = max(0, (results_scroll_y - PADDING_TOP) // block)
+    last_round = min(len(round_results), (results_scroll_y + RESULTS_VIEW_HEIGHT - PADDING_TOP) // block + 1)
+    first_tile = results_scroll_x // RESULTS_TILE_WIDTH
+    last_tile = min((results_scroll_x + screen_width - 1) // RESULTS_TILE_WIDTH,
+                    (content_width - 1) // RESULTS_TILE_WIDTH)
+    for index in range(first_round, last_round):
+        y = PADDING_TOP + index * block - results_scroll_y
+        for tile in range(first_tile, last_tile + 1):
+            screen.blit(get_round_tile(round_results, index, results_zoom, tile, content_width),
+                        (tile * RESULTS_TILE_WIDTH - results_scroll_x, y))
+
+    # Scrollbars show where the viewport sits when the results do not fit
+    if content_height > RESULTS_VIEW_HEIGHT:
+        thumb = RESULTS_VIEW_HEIGHT * RESULTS_VIEW_HEIGHT // content_height
+        top = results_scroll_y * (RESULTS_VIEW_HEIGHT - thumb) // max(1, content_height - RESULTS_VIEW_HEIGHT)
+        pygame.draw.rect(screen, DARK_GREY, (screen_width - SCROLLBAR_WIDTH, 0, SCROLLBAR_WIDTH, RESULTS_VIEW_HEIGHT))
+        pygame.draw.rect(screen, LIGHT_GREY, (screen_width - SCROLLBAR_WIDTH, top, SCROLLBAR_WIDTH, thumb))
+    if content_width > screen_width:
+        thumb = screen_width * screen_width // content_width
+        left = results_scroll_x * (screen_width - thumb) // max(1, content_width - screen_width)
+        pygame.draw.rect(screen, DARK_GREY, (0, RESULTS_VIEW_HEIGHT - SCROLLBAR_WIDTH, screen_width, SCROLLBAR_WIDTH))
+        pygame.draw.rect(screen, LIGHT_GREY, (left, RESULTS_VIEW_HEIGHT - SCROLLBAR_WIDTH, thumb, SCROLLBAR_WIDTH))
+    screen.set_clip(None)
+
+
+def compose_results_footer(winner, user_rankings):
+    # The winner line below the viewport only changes with the results
+    surface = pygame.Surface((screen_width, screen_height - RESULTS_VIEW_HEIGHT))
+    surface.fill(BLACK)
 
     # Find the winner's rank in the user's rankings
     winner_rank = next((rank for rank, name in user_rankings.items() if name == winner), None)
@@ -260,21 +393,78 @@ def draw_results_screen(winner, round_results, user_rankings):
         winner_text = f"The winner is: {winner} - They were not in your ranking."
 
     # Draw the winner text at the bottom of the screen
-    y_offset = screen_height - TEXT_HEIGHT - PADDING_BOTTOM
-    draw_text(winner_text, (PADDING_LEFT, y_offset), GREEN, font_size=30)
+    y_offset = screen_height - TEXT_HEIGHT - PADDING_BOTTOM - RESULTS_VIEW_HEIGHT
+    draw_text(winner_text, (PADDING_LEFT, y_offset), GREEN, font_size=30, surface=surface)
+
+    # Say whether the same voters would also pick the winner head to head
+    if head_to_head is not None:
+        draw_text(describe_head_to_head(head_to_head, winner), (PADDING_LEFT, y_offset + TEXT_HEIGHT), LIGHT_GREY,
+                  font_size=22, surface=surface)
+    return surface
 
-    # Ensure the 'Main Menu' button is in the bottom right
-    main_menu_button_rect = pygame.Rect(screen_width - 170, screen_height - 60, 150, 40)
-    draw_button(main_menu_button_rect, 'Main Menu', (main_menu_button_rect.x + 10, main_menu_button_rect.y + 5), LIGHT_BLUE, WHITE)
 
+def describe_head_to_head(result, winner):
+    if result.condorcet_winner == winner:
+        return f"{winner} is also the Condorcet winner: they beat every rival head to head."
+    if result.condorcet_winner is not None:
+        return f"{result.condorcet_winner} beats every rival head to head, but IRV elected {winner}."
+    if result.has_cycle:
+        return f"No Condorcet winner: {', '.join(result.smith_set)} beat each other in a cycle."
+    return f"No Condorcet winner: {', '.join(result.smith_set)} are tied head to head."
 
-    pygame.display.flip()  # Update the display
 
+def scroll_results(dx, dy):
+    # Move the viewport; draw_results_view keeps it inside the results
+    global results_scroll_x, results_scroll_y, results_visible
+    results_scroll_x += dx
+    results_scroll_y += dy
+    results_visible = False
 
 
+def zoom_results(steps):
+    # Step through ZOOM_LEVELS, keeping the top left of the view in place
+    global results_zoom, results_scroll_x, results_scroll_y, results_visible
+    level = ZOOM_LEVELS.index(results_zoom)
+    new_zoom = ZOOM_LEVELS[max(0, min(len(ZOOM_LEVELS) - 1, level + steps))]
+    results_scroll_x = int(results_scroll_x * new_zoom / results_zoom)
+    results_scroll_y = int(results_scroll_y * new_zoom / results_zoom)
+    results_zoom = new_zoom
+    results_visible = False
 
-# Set up the clock for managing frame rate
-clock = pygame.time.Clock()
+
+def draw_main_menu_button(hovered):
+    button_color = DARK_BLUE if hovered else LIGHT_BLUE
+    draw_button(main_menu_button_rect, 'Main Menu', (main_menu_button_rect.x + 10, main_menu_button_rect.y + 5), button_color, WHITE)
+
+
+def draw_results_screen(winner, round_results, user_rankings):
+    global results_footer, results_key, results_visible, results_button_hovered, results_scroll_x, results_scroll_y
+    # Tiles and the footer are reused until the results themselves change
+    key = (winner, [dict(round_votes) for round_votes in round_results], dict(user_rankings))
+    hovered = main_menu_button_rect.collidepoint(pygame.mouse.get_pos())
+    if key != results_key:
+        round_tiles.clear()
+        results_footer = compose_results_footer(winner, user_rankings)
+        results_scroll_x = results_scroll_y = 0
+        results_key = key
+        results_visible = False
+    if not results_visible:
+        draw_results_view(round_results)
+        screen.blit(results_footer, (0, RESULTS_VIEW_HEIGHT))
+        draw_main_menu_button(hovered)
+        pygame.display.flip()  # Update the display
+        results_visible = True
+    elif hovered != results_button_hovered:
+        # Only the button changed, so only its rectangle is pushed to the display
+        draw_main_menu_button(hovered)
+        pygame.display.update(main_menu_button_rect)
+    results_button_hovered = hovered
+
+
+
+
+# Clock for managing frame rate, created by init_display()
+clock = None
 
 # Define game states
 MENU = 0
@@ -288,6 +478,18 @@ TUTORIAL_COUNTING = 7
 TUTORIAL_RESULT = 8
 RE_VOTING = 9
 QUIZ = 10
+STRATEGY = 11
+ROBUSTNESS = 12
+
+# Rankings listed on the strategy screen before it summarises the rest
+STRATEGY_LIST_LENGTH = 10
+
+# Resampled electorates counted for the robustness screen
+ROBUSTNESS_RESAMPLES = 1000
+
+# Timer event that ends the quiz answer feedback
+QUIZ_FEEDBACK_EVENT = pygame.USEREVENT + 1
+QUIZ_FEEDBACK_MS = 2000
 
 # Add an initial state for the educational content
 initial_state = MENU
@@ -328,54 +530,56 @@ candidate_rankings = {candidate: None for candidate in candidates}  # None means
 # Initialize a dictionary to store votes. Each key represents a candidate's name, and the value is their vote count.
 votes = {candidate: 0 for candidate in candidates}
 
-def generate_voter_preferences(candidates, num_voters):
-    # Generate random voter preferences for each voter
-    preferences = []
-    for _ in range(num_voters):
-        # Generate a random preference list for each voter
-        preference = random.sample(candidates, len(candidates))
-        preferences.append(preference)
-    return preferences
-
-
-def simulate_voting_rounds(num_voters, candidates):
-    # This function simulates the voting process
-    preferences = generate_voter_preferences(candidates, num_voters)
-    active_candidates = candidates[:]
-    round_details = []
-
-    while True:
-        vote_counts = get_vote_counts(preferences, active_candidates)
-        round_details.append(vote_counts)
-        winner = get_winner(vote_counts)
-        
-        if winner:
-            return winner, round_details
-
-        eliminated = eliminate_candidate(vote_counts)
-        if not eliminated:
-            # In a rare case, there might be a perfect tie and no candidate to eliminate
-            return None, round_details
-
-        active_candidates.remove(eliminated)
-        preferences = redistribute_votes(preferences, eliminated)
-
-def redistribute_votes(preferences, eliminated_candidate):
-    # Remove the eliminated candidate from all voter preferences
-    new_preferences = []
-    for pref in preferences:
-        new_pref = [c for c in pref if c != eliminated_candidate]
-        new_preferences.append(tuple(new_pref))
-    return new_preferences
-
-# Font setup
-font = pygame.font.Font(None, 48)
-
-
-def draw_text(text, position, color, font_size=36):
-    font = pygame.font.Font(None, font_size)
-    text_surface = font.render(text, True, color)
-    screen.blit(text_surface, position)
+# Font setup, filled in by init_display()
+font = None
+MENU_FONT_SIZE = 48
+
+# Fonts by size, and rendered text surfaces by (text, size, color) kept in
+# least-recently-used order
+TEXT_CACHE_SIZE = 512
+font_cache = {}
+text_cache = OrderedDict()
+text_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def init_display():
+    # Start pygame and open the window; only the game UI needs this
+    global screen, font, clock
+    if screen is not None:
+        return
+    pygame.init()
+    screen = pygame.display.set_mode((screen_width, screen_height))
+    pygame.display.set_caption('Voter Education Game for RCV')
+    font = get_font(MENU_FONT_SIZE)
+    clock = pygame.time.Clock()
+
+
+def get_font(font_size):
+    # Loading a font is expensive, so each size is only loaded once
+    cached_font = font_cache.get(font_size)
+    if cached_font is None:
+        cached_font = font_cache[font_size] = pygame.font.Font(None, font_size)
+    return cached_font
+
+
+def render_text(text, color, font_size):
+    key = (text, font_size, tuple(color))
+    text_surface = text_cache.get(key)
+    if text_surface is not None:
+        text_cache_stats['hits'] += 1
+        text_cache.move_to_end(key)
+        return text_surface
+    text_cache_stats['misses'] += 1
+    text_surface = text_cache[key] = get_font(font_size).render(text, True, color)
+    if len(text_cache) > TEXT_CACHE_SIZE:
+        # Drop the least recently drawn text
+        text_cache.popitem(last=False)
+        text_cache_stats['evictions'] += 1
+    return text_surface
+
+
+def draw_text(text, position, color, font_size=36, surface=None):
+    (surface or screen).blit(render_text(text, color, font_size), position)
 
 def handle_submit_button(mouse_x, mouse_y):
     global round_results, game_state, winner, user_rankings
@@ -385,14 +589,10 @@ def handle_submit_button(mouse_x, mouse_y):
             sorted_candidate_names = [candidate for candidate, rank in sorted_candidates_by_rank]
             user_rankings = {rank: candidate for candidate, rank in sorted_candidates_by_rank}
 
-            # Pass the sorted candidate names to simulate_voting_rounds
-            winner, new_round_results = simulate_voting_rounds(NUM_VOTERS, sorted_candidate_names)
-
-            # Initialize round_results as an empty list if it is None
-            if round_results is None:
-                round_results = []
-
-            round_results.extend(new_round_results)  # Append the results
+            # Count the player's ballot with the seeded electorate and keep the
+            # election, so what-ifs, the explorer and the robustness screen all
+            # work on the count shown here
+            winner, round_results = count_votes()
 
             if winner:
                 game_state = RESULTS  # Change the state to show the results
@@ -410,7 +610,7 @@ def draw_menu_screen():
     
     # Game Title
     game_title = "VoteQuest: The RCV Adventure"
-    title_surface = font.render(game_title, True, LIGHT_BLUE)
+    title_surface = render_text(game_title, LIGHT_BLUE, MENU_FONT_SIZE)
     # Center the title surface
     title_rect = title_surface.get_rect(center=(screen_width // 2, 100))
     screen.blit(title_surface, title_rect)
@@ -419,15 +619,84 @@ def draw_menu_screen():
     menu_options = ["[S] Start Game", "[T] Tutorial", "[Q] Quiz", "[X] Quit"]
     y_offset = 250  # You can adjust this value as needed
     for option in menu_options:
-        option_surface = font.render(option, True, WHITE)
+        option_surface = render_text(option, WHITE, MENU_FONT_SIZE)
         option_rect = option_surface.get_rect(center=(screen_width // 2, y_offset))
         screen.blit(option_surface, option_rect)
         y_offset += 60  # Adjust the spacing as needed
 
     pygame.display.flip()
 
+def explore_ballot_strategies():
+    # Winner for every ranking the player could have cast, other voters unchanged
+    counted = shown_election()
+    outcomes = counted.ballot_outcomes(len(counted.ranks) - 1)
+    print(f"Your ballot: {len(outcomes)} possible rankings, {len(set(outcomes.values()))} different winners:")
+    for ranking, outcome in outcomes.items():
+        print(f"  {', '.join(ranking) or '(blank ballot)'}: {outcome}")
+    return outcomes
+
+
+def draw_strategy_screen(outcomes):
+    screen.fill(DARK_GREY)
+    draw_text(f"Every way you could have voted ({len(outcomes)} rankings)", (50, 30), LIGHT_BLUE, font_size=36)
+
+    # How many of the possible rankings lead to each winner
+    wins = {}
+    for outcome in outcomes.values():
+        wins[outcome] = wins.get(outcome, 0) + 1
+    y_offset = 80
+    for outcome, count in sorted(wins.items(), key=lambda item: item[1], reverse=True):
+        label = outcome if outcome is not None else "No winner"
+        draw_text(f"{label}: {count} rankings", (70, y_offset), WHITE, font_size=28)
+        y_offset += 30
+
+    # The rankings that would have changed the result
+    changing = [(ranking, outcome) for ranking, outcome in outcomes.items() if outcome != winner]
+    y_offset += 20
+    if not changing:
+        draw_text(f"No ranking you could cast changes the winner from {winner}.", (50, y_offset), GREEN, font_size=28)
+    else:
+        draw_text(f"{len(changing)} rankings change the winner from {winner}:", (50, y_offset), GREEN, font_size=28)
+        for ranking, outcome in itertools.islice(changing, STRATEGY_LIST_LENGTH):
+            y_offset += 28
+            draw_text(f"{' > '.join(ranking) or '(blank ballot)'}  ->  {outcome}", (70, y_offset), WHITE, font_size=24)
+        if len(changing) > STRATEGY_LIST_LENGTH:
+            y_offset += 28
+            draw_text(f"... and {len(changing) - STRATEGY_LIST_LENGTH} more (listed in the console)", (70, y_offset), WHITE, font_size=24)
+
+    draw_text("Press [B] to go back to the results, [M] for Menu", (50, screen_height - 60), GREEN, font_size=28)
+
+
+def analyze_robustness():
+    # Recount the election on screen on resampled electorates to see how close it was
+    counted = shown_election()
+    ranks, weights = counted.ballots()
+    summary = bootstrap.robustness(ranks, counted.candidates, weights, ROBUSTNESS_RESAMPLES, seed=electorate_seed)
+    print(json.dumps(summary.as_dict(), indent=2))
+    return summary
+
+
+def draw_robustness_screen(summary):
+    screen.fill(DARK_GREY)
+    draw_text(f"How close was it? ({summary.resamples} resampled electorates)", (50, 30), LIGHT_BLUE, font_size=36)
+
+    y_offset = 80
+    for name in sorted(summary.candidates, key=lambda name: summary.win_probability[name], reverse=True):
+        draw_text(f"{name}: wins {summary.win_probability[name]:.1%}, "
+                  f"finishes as in this count {summary.same_round[name]:.1%}", (70, y_offset), WHITE, font_size=28)
+        y_offset += 30
+    if summary.no_winner:
+        draw_text(f"No winner: {summary.no_winner:.1%}", (70, y_offset), WHITE, font_size=28)
+        y_offset += 30
+
+    y_offset += 20
+    draw_text(f"{summary.observed_winner} won this count; the whole elimination order held in "
+              f"{summary.order_stability:.1%} of resamples.", (50, y_offset), GREEN, font_size=28)
+    draw_text("Press [B] to go back to the results, [M] for Menu", (50, screen_height - 60), GREEN, font_size=28)
+
+
 def draw_name_under_bar(candidate, bar_x, bar_y, bar_width, bar_height):
-    name_text = font.render(candidate, True, WHITE)
+    name_text = render_text(candidate, WHITE, MENU_FONT_SIZE)
     # Calculate the center position for the name based on the bar's position and width
     name_text_rect = name_text.get_rect(center=(bar_x + bar_width // 2, bar_y + bar_height + TEXT_SPACING))
     screen.blit(name_text, name_text_rect)
@@ -464,19 +733,69 @@ def draw_re_voting_screen(remaining_candidates):
 
 
 def run_game():
-    global game_state, tutorial_step, winner, round_results, user_rankings
+    global game_state, tutorial_step, winner, round_results, user_rankings, results_visible
+    init_display()
+    metrics.enable_from_environment()
     # Mouse position used for candidate selection
     mouse_x, mouse_y = 0, 0
     round_results = None
     quiz_questions_index = 0
+    quiz_feedback = None  # (text, color) while an answer's feedback is showing
+    strategy_outcomes = {}
+    robustness_summary = None
+    options_positions = []
+    needs_redraw = True
 
     while True:
-        # Handle events
-        for event in pygame.event.get():
+        if needs_redraw:
+            frame_started = time.perf_counter() if metrics.recorder is not None else None
+            # Drawing the screen based on the state
+            if game_state == MENU:
+                draw_menu_screen()
+            elif game_state in [TUTORIAL_INTRO, TUTORIAL_VOTING, TUTORIAL_COUNTING, TUTORIAL_RESULT]:
+                draw_tutorial_screen()
+            elif game_state == VOTING:
+                draw_voting_screen()
+            elif game_state == QUIZ:
+                options_positions = display_quiz_question(quiz_questions[quiz_questions_index])
+                if quiz_feedback:
+                    feedback_text, feedback_color = quiz_feedback
+                    draw_text(feedback_text, (screen_width // 2 - 100, screen_height - 100), feedback_color, font_size=24)
+            elif game_state == RESULTS:
+                # Ensure that count_votes is called only once when entering the RESULTS state
+                if round_results is None:
+                    winner, round_results = count_votes()
+                draw_results_screen(winner, round_results, user_rankings)
+            elif game_state == STRATEGY:
+                draw_strategy_screen(strategy_outcomes)
+            elif game_state == ROBUSTNESS:
+                draw_robustness_screen(robustness_summary)
+
+            # Update display; the results view pushes its own updates
+            if game_state != RESULTS:
+                results_visible = False
+                pygame.display.flip()
+            needs_redraw = False
+            if frame_started is not None and metrics.recorder is not None:
+                metrics.recorder.add_frame(time.perf_counter() - frame_started)
+            clock.tick(60)  # Cap bursts of input at 60 redraws a second
+
+        # Sleep until there is input or a timer fires, then handle everything queued
+        events = [pygame.event.wait()] + pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
 
+            if event.type == pygame.MOUSEMOTION:
+                # Motion only matters for the results button hover
+                if game_state == RESULTS and round_results is not None:
+                    draw_results_screen(winner, round_results, user_rankings)
+                continue
+            if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                results_visible = False
+            needs_redraw = True
+
             if game_state == MENU:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_s:  # Start Game
@@ -485,6 +804,7 @@ def run_game():
                         tutorial_step = 0  # Reset tutorial step to the beginning
                         game_state = TUTORIAL_INTRO
                     elif event.key == pygame.K_q:  # Quiz
+                        quiz_questions_index = 0
                         game_state = QUIZ
                     elif event.key == pygame.K_x:  # Quit Game
                         pygame.quit()
@@ -504,8 +824,6 @@ def run_game():
             elif game_state == RESULTS:
                 if round_results is None:
                     winner, round_results = count_votes()
-                draw_results_screen(winner, round_results, user_rankings)
-                pygame.display.flip()
 
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_m:  # Return to menu
@@ -513,44 +831,77 @@ def run_game():
                         winner = None
                         round_results = []
                         user_rankings = {}
+                        forget_election()
                     elif event.key == pygame.K_w:  # Trigger "what if" analysis
                         prompt_what_if_analysis()
+                    elif event.key == pygame.K_e:  # Explore every ranking the player could have cast
+                        strategy_outcomes = explore_ballot_strategies()
+                        game_state = STRATEGY
+                    elif event.key == pygame.K_o:  # Odds of each candidate winning on resampled electorates
+                        robustness_summary = analyze_robustness()
+                        game_state = ROBUSTNESS
+                    # Scroll and zoom the rounds
+                    elif event.key == pygame.K_UP:
+                        scroll_results(0, -SCROLL_STEP)
+                    elif event.key == pygame.K_DOWN:
+                        scroll_results(0, SCROLL_STEP)
+                    elif event.key == pygame.K_LEFT:
+                        scroll_results(-SCROLL_STEP, 0)
+                    elif event.key == pygame.K_RIGHT:
+                        scroll_results(SCROLL_STEP, 0)
+                    elif event.key == pygame.K_PAGEUP:
+                        scroll_results(0, -RESULTS_VIEW_HEIGHT)
+                    elif event.key == pygame.K_PAGEDOWN:
+                        scroll_results(0, RESULTS_VIEW_HEIGHT)
+                    elif event.key == pygame.K_HOME:
+                        scroll_results(-results_scroll_x, -results_scroll_y)
+                    elif event.key == pygame.K_END:
+                        scroll_results(0, results_content_size(round_results, results_zoom)[1])
+                    elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                        zoom_results(1)
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        zoom_results(-1)
                     elif event.key == pygame.K_r:  # Restart with the same candidates
                         reset_voting()
                         game_state = VOTING
                     elif event.key == pygame.K_n:  # New round with different candidates
                         start_new_round()
+                elif event.type == pygame.MOUSEWHEEL:
+                    if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                        zoom_results(event.y)
+                    else:
+                        scroll_results(event.x * SCROLL_STEP, -event.y * SCROLL_STEP)
             
+            elif game_state in (STRATEGY, ROBUSTNESS):
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_b:  # Back to the results
+                        game_state = RESULTS
+                    elif event.key == pygame.K_m:  # Return to menu
+                        game_state = MENU
+                        winner = None
+                        round_results = []
+                        user_rankings = {}
+                        forget_election()
+
             elif game_state == QUIZ:
-                if quiz_questions_index < len(quiz_questions):
-                    options_positions = display_quiz_question(quiz_questions[quiz_questions_index])
-                    waiting_for_answer = True
-                    while waiting_for_answer:
-                        for event in pygame.event.get():
-                            if event.type == pygame.QUIT:
-                                pygame.quit()
-                                sys.exit()
-                            elif event.type == pygame.MOUSEBUTTONDOWN:
-                                mouse_x, mouse_y = event.pos
-                                for rect, option in options_positions:
-                                    if rect.collidepoint(mouse_x, mouse_y):
-                                        if option == quiz_questions[quiz_questions_index]['answer']:
-                                            feedback_text = "Correct!"
-                                            feedback_color = GREEN
-                                        else:
-                                            feedback_text = f"Incorrect! Correct answer: {quiz_questions[quiz_questions_index]['answer']}"
-                                            feedback_color = RED
-                                        draw_text(feedback_text, (screen_width // 2 - 100, screen_height - 100), feedback_color, font_size=24)
-                                        pygame.display.flip()
-                                        pygame.time.wait(2000)  # Wait two seconds to show feedback
-                                        waiting_for_answer = False
-                                        quiz_questions_index += 1
-                                        if quiz_questions_index >= len(quiz_questions):
-                                            quiz_questions_index = 0
-                                            game_state = MENU
-                                        break
-                else:
-                    game_state = MENU
+                if event.type == QUIZ_FEEDBACK_EVENT:
+                    # Feedback has been shown long enough, move to the next question
+                    quiz_feedback = None
+                    quiz_questions_index += 1
+                    if quiz_questions_index >= len(quiz_questions):
+                        quiz_questions_index = 0
+                        game_state = MENU
+                elif event.type == pygame.MOUSEBUTTONDOWN and quiz_feedback is None:
+                    mouse_x, mouse_y = event.pos
+                    for rect, option in options_positions:
+                        if rect.collidepoint(mouse_x, mouse_y):
+                            if option == quiz_questions[quiz_questions_index]['answer']:
+                                quiz_feedback = ("Correct!", GREEN)
+                            else:
+                                quiz_feedback = (f"Incorrect! Correct answer: {quiz_questions[quiz_questions_index]['answer']}", RED)
+                            # Show the feedback for two seconds without blocking the loop
+                            pygame.time.set_timer(QUIZ_FEEDBACK_EVENT, QUIZ_FEEDBACK_MS, loops=1)
+                            break
 
 
 
@@ -560,12 +911,9 @@ def run_game():
                     # Check if the submit button is clicked
                     if check_button_click(mouse_x, mouse_y, submit_button_rect):
                         handle_submit_button(mouse_x, mouse_y)
-                        if winner:
-                            draw_results_screen(winner, round_results, user_rankings)
                     else:
                         # If the click is not on the submit button, then handle the voting
                         handle_voting(mouse_x, mouse_y)
-                    draw_voting_screen()  # Redraw the voting screen after any click
 
 
             elif game_state == RESULTS and event.type == pygame.KEYDOWN:
@@ -573,6 +921,7 @@ def run_game():
                     game_state = MENU
                     winner = None
                     round_results = []
+                    forget_election()
                 elif event.key == pygame.K_r:  # Restart voting with same candidates
                     reset_voting()
                     round_results = []
@@ -597,23 +946,6 @@ def run_game():
                         winner, new_round_results = count_votes()
                         round_results.extend(new_round_results)  # Append new round results to existing
                         game_state = RESULTS
-
-        # Drawing the screen based on the state
-        if game_state == MENU:
-            draw_menu_screen()
-        elif game_state in [TUTORIAL_INTRO, TUTORIAL_VOTING, TUTORIAL_COUNTING, TUTORIAL_RESULT]:
-            draw_tutorial_screen()
-        elif game_state == VOTING:
-            draw_voting_screen()
-        elif game_state == RESULTS:
-            # Ensure that count_votes is called only once when entering the RESULTS state
-            if round_results is None:
-                winner, round_results = count_votes()
-            draw_results_screen(winner, round_results, user_rankings)
-
-        # Update display
-        pygame.display.flip()
-        clock.tick(60)
         
 def display_quiz_question(question):
     screen.fill(WHITE)
@@ -661,25 +993,6 @@ def rank_candidate(candidate):
                 candidate_rankings[other_candidate] = rank - 1
         candidate_rankings[candidate] = None
 
-def get_vote_counts(vote_rankings, active_candidates):
-    counts = {candidate: 0 for candidate in active_candidates}
-    for ranking in vote_rankings:  # Changed from vote_rankings.values() to vote_rankings
-        if ranking:
-            first_choice = ranking[0]
-            if first_choice in active_candidates:
-                counts[first_choice] += 1
-    return counts
-
-
-def get_winner(vote_counts):
-    total_votes = sum(vote_counts.values())
-    for candidate, count in vote_counts.items():
-        if count > total_votes / 2:
-            return candidate  # This candidate is the winner
-    return None  # No winner if nobody has more than half the votes
-
-
-
 def count_irv_votes(vote_rankings):
     round_details = []
     while True:
@@ -698,54 +1011,28 @@ def count_irv_votes(vote_rankings):
     
 
     
-# Eliminate the candidate with the fewest votes
-def eliminate_candidate(counts):
-    # Find the candidate with the least votes
-    lowest_votes = min(counts.values())
-    for candidate, count in counts.items():
-        if count == lowest_votes:
-            return candidate
-    
-    # The main counting loop
-    while True:
-        counts = get_vote_counts(temp_rankings)
-        winner = get_winner(counts)
-        if winner:
-            return winner
-        else:
-            # Eliminate the lowest candidate and remove them from the rankings
-            to_eliminate = eliminate_candidate(counts)
-            for ranking in temp_rankings.values():
-                if to_eliminate in ranking:
-                    ranking.remove(to_eliminate)
-
-def count_votes():
-    global game_state, tutorial_step, round_results
-    vote_preferences = {
-        candidate: [cand for cand, rank in sorted(candidate_rankings.items(), key=lambda item: item[1]) if rank]
-        for candidate in candidates
-    }
-    round_results = []
-    active_candidates = candidates.copy()
-    
-    while len(active_candidates) > 1:
-        round_votes = get_vote_counts(vote_preferences, active_candidates)
-        round_results.append(round_votes.copy())  # Track results for each round
-        
-        # Check for a winner or redistribute votes
-        total_votes = sum(round_votes.values())
-        for candidate, votes in round_votes.items():
-            if votes > total_votes / 2:
-                return candidate, round_results  # Winner found
-        
-        # No winner, eliminate last place candidate and redistribute votes
-        eliminated_candidates = eliminate_candidate(round_votes)
-        active_candidates = [cand for cand in active_candidates if cand not in eliminated_candidates]
-        for preference_list in vote_preferences.values():
-            preference_list[:] = [cand for cand in preference_list if cand in active_candidates]  # In-place modification of the list
-    
-    # If all candidates are eliminated and no winner is found
-    return None, round_results
+def count_votes(processes=1):
+    global game_state, tutorial_step, election, head_to_head
+    # The player's ballot is cast alongside a simulated electorate
+    ranking = [cand for cand, rank in sorted(candidate_rankings.items(), key=lambda item: item[1] or 0) if rank]
+    election = irv.simulate_election(NUM_VOTERS, candidates, [ranking], processes, seed=electorate_seed)
+    head_to_head = election_head_to_head()
+    return election.result()
+
+
+def shown_election():
+    # The election behind the results on screen. One is stored whenever results
+    # are shown; if not, it is counted from the player's ballot without
+    # touching the displayed rounds.
+    if election is None:
+        count_votes()
+    return election
+
+
+def election_head_to_head():
+    # Pairwise results of the stored election's voters, what-ifs included
+    ranks, weights = election.ballots()
+    return pairwise.pairwise(ranks, election.candidates, weights)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+"""Streaming ingest of cast-vote-record (CVR) exports.
+
+Ballots are read a chunk at a time and turned straight into rank matrices,
+with candidate names interned to integer ids on the way. Each chunk is
+compressed to its distinct rankings before it is kept, so memory is bounded by
+the chunk size plus the number of distinct rankings, never by the number of
+ballots in the file.
+
+CSV files have a header row; the columns whose name starts with "rank" hold
+the candidate marked at each rank (every column is used if none do). JSONL
+files hold one ballot per line, either a list of names or an object with a
+"ranking" list.
+
+Cells reading "overvote" are kept as overvote marks. Passing rules runs each
+chunk through normalize before it is compressed, so the result holds only
+countable rankings and stats.rule_counts says what each rule changed.
+"""
+
+import argparse
+import csv
+import json
+import time
+
+import numpy as np
+
+from normalize import JURISDICTIONS, empty_tally, normalize_chunk
+from tabulation import blank_value, compress_ballots, overvote_value, rank_dtype, tabulate
+
+
+DEFAULT_CHUNK_SIZE = 100_000
+# Chunks are read as uint16 until the final candidate count is known
+CHUNK_DTYPE = np.uint16
+# Cell contents that mean the voter left the rank empty
+BLANK_MARKS = {'', 'undervote', 'skipped'}
+# Cell contents that mean the voter marked more than one candidate at a rank
+OVERVOTE_MARKS = {'overvote'}
+# Distinct rankings held before the kept chunks are merged again
+MERGE_THRESHOLD = 1_000_000
+
+
+class CandidateTable:
+    """Interns candidate names to integer ids in order of first appearance."""
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name):
+        candidate_id = self.ids.get(name)
+        if candidate_id is None:
+            candidate_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return candidate_id
+
+    def __len__(self):
+        return len(self.names)
+
+
+class IngestStats:
+    """Ballot count and timing for one ingest run."""
+
+    def __init__(self):
+        self.ballots = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        # Ballots changed by each normalization rule, when rules were applied
+        self.rule_counts = None
+
+    @property
+    def rate(self):
+        """Ballots ingested per second."""
+        return self.ballots / self.seconds if self.seconds else 0.0
+
+
+def read_csv_rankings(path, rank_columns=None):
+    """Yield each CSV ballot as its list of rank cells."""
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        if rank_columns is None:
+            rank_columns = [i for i, name in enumerate(header) if name.strip().lower().startswith('rank')]
+            rank_columns = rank_columns or list(range(len(header)))
+        for row in reader:
+            yield [row[i].strip() if i < len(row) else '' for i in rank_columns]
+
+
+def read_jsonl_rankings(path):
+    """Yield each JSONL ballot as its list of rank cells."""
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                ballot = json.loads(line)
+                if isinstance(ballot, dict):
+                    ballot = ballot['ranking']
+                yield ['' if cell is None else str(cell).strip() for cell in ballot]
+
+
+def read_rankings(path):
+    """Pick the reader for a CVR file from its extension."""
+    if str(path).endswith(('.jsonl', '.ndjson')):
+        return read_jsonl_rankings(path)
+    return read_csv_rankings(path)
+
+
+def iter_ballot_chunks(rankings, table, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """Group ranking rows into uint16 rank matrices of at most chunk_size ballots."""
+    blank = blank_value(CHUNK_DTYPE)
+    marks = dict.fromkeys(BLANK_MARKS, blank)
+    marks.update(dict.fromkeys(OVERVOTE_MARKS, overvote_value(CHUNK_DTYPE)))
+    chunk = []
+    for ranking in rankings:
+        chunk.append([marks[cell] if cell in marks else table.intern(cell) for cell in ranking])
+        if len(chunk) == chunk_size:
+            yield _chunk_matrix(chunk, blank, stats)
+            chunk = []
+    if chunk:
+        yield _chunk_matrix(chunk, blank, stats)
+
+
+def _chunk_matrix(chunk, blank, stats):
+    width = max(len(row) for row in chunk)
+    ranks = np.full((len(chunk), width), blank, dtype=CHUNK_DTYPE)
+    for i, row in enumerate(chunk):
+        ranks[i, :len(row)] = row
+    if stats is not None:
+        stats.ballots += len(chunk)
+        stats.seconds = time.perf_counter() - stats.started
+    return ranks
+
+
+def _stack(parts, weights):
+    # Pad every part to the widest ballot seen and merge equal rankings
+    width = max(part.shape[1] for part in parts)
+    padded = [np.pad(part, ((0, 0), (0, width - part.shape[1])), constant_values=blank_value(part.dtype))
+              for part in parts]
+    return compress_ballots(np.concatenate(padded), np.concatenate(weights))
+
+
+def load_ballots(path, candidates=(), chunk_size=DEFAULT_CHUNK_SIZE, progress=None, rules=None, write_ins=()):
+    """Stream a CVR file into (distinct rankings, counts, candidate names, stats).
+
+    progress, if given, is called with the running IngestStats after each chunk.
+    rules (a normalize.Rules or the name of one) normalizes every ballot, with
+    write_ins naming the write-in candidates; excluded write-ins are left out
+    of the returned names.
+    """
+    rules = JURISDICTIONS[rules] if isinstance(rules, str) else rules
+    table = CandidateTable(candidates)
+    stats = IngestStats()
+    if rules is not None:
+        stats.rule_counts = empty_tally()
+    parts, weights, held = [], [], 0
+    for ranks in iter_ballot_chunks(read_rankings(path), table, chunk_size, stats):
+        if rules is not None:
+            write_in_ids = [table.ids[name] for name in write_ins if name in table.ids]
+            ranks = normalize_chunk(ranks, len(table), None, rules, write_in_ids, stats.rule_counts)
+        distinct, counts = compress_ballots(ranks)
+        parts.append(distinct)
+        weights.append(counts)
+        held += len(distinct)
+        if held > MERGE_THRESHOLD:
+            distinct, counts = _stack(parts, weights)
+            parts, weights, held = [distinct], [counts], len(distinct)
+        if progress is not None:
+            progress(stats)
+
+    names = table.names
+    if rules is not None and rules.write_ins == 'exclude':
+        names = [name for name in names if name not in write_ins]
+    if not parts:
+        return np.zeros((0, 0), dtype=rank_dtype(len(names))), np.zeros(0, dtype=np.int64), names, stats
+    ranks, counts = _stack(parts, weights)
+
+    # Narrow to the smallest dtype now that the candidate count is final,
+    # renumbering the candidates that are kept
+    dtype = rank_dtype(len(names))
+    relabel = np.full(blank_value(CHUNK_DTYPE) + 1, blank_value(dtype), dtype=dtype)
+    relabel[[table.ids[name] for name in names]] = np.arange(len(names))
+    relabel[overvote_value(CHUNK_DTYPE)] = overvote_value(dtype)
+    narrow = relabel[ranks]
+    stats.seconds = time.perf_counter() - stats.started
+    return narrow, counts, names, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest a cast-vote-record file and count it.')
+    parser.add_argument('path')
+    parser.add_argument('--rules', choices=sorted(JURISDICTIONS), help='normalize ballots under these rules')
+    parser.add_argument('--write-in', action='append', default=[], help='candidate name that is a write-in')
+    args = parser.parse_args()
+    ranks, counts, names, stats = load_ballots(args.path, rules=args.rules, write_ins=args.write_in)
+    print(f"Ingested {stats.ballots} ballots ({len(ranks)} distinct) in {stats.seconds:.2f}s, "
+          f"{stats.rate:,.0f} ballots/sec")
+    if stats.rule_counts is not None:
+        print(', '.join(f"{rule} {count}" for rule, count in stats.rule_counts.items()))
+    winner, round_details = tabulate(ranks, names, counts)
+    print(f"The winner is: {winner} after {len(round_details)} rounds")
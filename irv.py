@@ -0,0 +1,133 @@
+"""Instant Runoff Voting counting logic, without any display code.
+
+This module imports nothing heavy at load time so workers, tests and
+services can use it without starting pygame. The NumPy-based engine modules
+are only imported by the functions that need them. The counting functions are
+wrapped with metrics.timed, which does nothing until metrics are enabled.
+"""
+
+from collections import Counter
+
+from metrics import timed
+
+
+@timed
+def get_vote_counts(vote_rankings, active_candidates):
+    counts = {candidate: 0 for candidate in active_candidates}
+    # A dict maps each distinct ranking to the number of ballots cast with it
+    if isinstance(vote_rankings, dict):
+        weighted_rankings = vote_rankings.items()
+    else:
+        weighted_rankings = ((ranking, 1) for ranking in vote_rankings)
+    for ranking, weight in weighted_rankings:
+        if ranking:
+            first_choice = ranking[0]
+            if first_choice in active_candidates:
+                counts[first_choice] += weight
+    return counts
+
+
+def get_winner(vote_counts):
+    total_votes = sum(vote_counts.values())
+    for candidate, count in vote_counts.items():
+        if count > total_votes / 2:
+            return candidate  # This candidate is the winner
+    return None  # No winner if nobody has more than half the votes
+
+
+# Eliminate the candidate with the fewest votes
+@timed
+def eliminate_candidate(counts):
+    # Find the candidate with the least votes
+    lowest_votes = min(counts.values())
+    for candidate, count in counts.items():
+        if count == lowest_votes:
+            return candidate
+
+
+@timed
+def redistribute_votes(preferences, eliminated_candidate):
+    # Remove the eliminated candidate from all voter preferences
+    if isinstance(preferences, dict):
+        # Weighted ballots: rankings that become identical are merged
+        new_weighted = Counter()
+        for pref, weight in preferences.items():
+            new_weighted[tuple(c for c in pref if c != eliminated_candidate)] += weight
+        return new_weighted
+    new_preferences = []
+    for pref in preferences:
+        new_pref = [c for c in pref if c != eliminated_candidate]
+        new_preferences.append(tuple(new_pref))
+    return new_preferences
+
+
+def compress_preferences(preferences):
+    # Map each distinct ranking to the number of voters who cast it
+    return Counter(tuple(pref) for pref in preferences)
+
+
+def generate_voter_preferences(candidates, num_voters, model='impartial', seed=None):
+    import electorate
+
+    # Draw every voter's ranking at once from a seedable electorate model
+    ranks = electorate.generate(len(candidates), num_voters, model, seed)
+    return [[candidates[c] for c in row if c < len(candidates)] for row in ranks.tolist()]
+
+
+def simulation_streams(seed):
+    import numpy as np
+
+    # Separate child streams of one seed for the simulated electorate and for
+    # drawing lots, so tie-break draws never replay the electorate's numbers
+    return np.random.SeedSequence(seed).spawn(2)
+
+
+@timed
+def simulate_voting_rounds(num_voters, candidates, processes=1, model='impartial', seed=None, batch=False,
+                           tie_break='first'):
+    import electorate
+    import result_cache
+
+    # This function simulates the voting process on rankings weighted by how
+    # many voters cast each one, or one row per voter when they are all distinct
+    voters, lots = simulation_streams(seed)
+    ranks, weights = electorate.random_electorate(len(candidates), num_voters, voters, model)
+    return result_cache.tabulate(ranks, candidates, weights, processes=processes, batch=batch, tie_break=tie_break,
+                                 seed=lots)
+
+
+@timed
+def simulate_election(num_voters, candidates, ballots=(), processes=1, model='impartial', seed=None):
+    import numpy as np
+
+    import electorate
+    from election import Election
+    from tabulation import ballot_matrix, blank_value
+
+    # A random electorate plus the given rankings (candidate names), counted
+    # and checkpointed so what-ifs can reuse it. The given ballots are the
+    # last rows, in order, each cast by one voter. The simulated voters are the
+    # ones simulate_voting_rounds draws with the same seed.
+    voters, _ = simulation_streams(seed)
+    ranks, weights = electorate.random_electorate(len(candidates), num_voters, voters, model)
+    if ballots:
+        given = ballot_matrix([list(ranking) for ranking in ballots], candidates)
+        extra = np.full((len(ballots), len(candidates)), blank_value(ranks.dtype), dtype=ranks.dtype)
+        extra[:, :given.shape[1]] = given
+        if weights is None:
+            weights = np.ones(len(ranks), dtype=np.int64)
+        ranks = np.concatenate([ranks, extra])
+        weights = np.concatenate([weights, np.ones(len(ballots), dtype=np.int64)])
+    return Election(ranks, candidates, weights, processes=processes)
+
+
+@timed
+def count_votes(candidate_rankings, candidates, processes=1):
+    import result_cache
+    import tabulation
+
+    # Every simulated ballot in this count carries the player's ranking
+    ranking = [cand for cand, rank in sorted(candidate_rankings.items(), key=lambda item: item[1] or 0) if rank]
+    vote_preferences = [ranking for candidate in candidates]
+    ranks = tabulation.ballot_matrix(vote_preferences, candidates)
+    return result_cache.tabulate(ranks, candidates, processes=processes)
@@ -0,0 +1,151 @@
+"""Live tabulation of an election whose ballots arrive in batches.
+
+A LiveTabulation keeps every round's count vector and the elimination order,
+like an Election. Appending a batch runs a counter over the batch alone,
+eliminating in the stored order, and adds its counts into each stored round.
+That touches only the new ballots. While every round still leads to the same
+decision nothing else is needed. At the first round whose decision changes,
+the ballots seen so far are counted again from that round on, with the shared
+earlier eliminations applied at once. That recount is the only time older
+ballots are touched, and it also merges the stored batches into one.
+
+Like Election, it counts one elimination per round with the 'first'
+tie-break, since patching relies on round r following exactly r
+eliminations.
+
+    live = LiveTabulation(candidates)
+    for batch in batches:
+        winner, round_details = live.append(batch)
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from tabulation import COUNTERS, RoundResult, ballot_matrix, blank_value, compress_ballots, rank_dtype, round_decision
+from tabulation import run_rounds
+
+
+class LiveTabulation:
+    """A count kept current as batches of ballots are appended."""
+
+    def __init__(self, candidates, method='piles'):
+        self.candidates = list(candidates)
+        self.method = method
+        self.dtype = rank_dtype(len(self.candidates))
+        # Compressed (ranks, weights) batches, merged again on every recount
+        self.batches = []
+        self.ballots = 0
+        self.rounds = []
+        self.eliminated = []
+        self.winner = None
+        self.snapshot = (None, [])
+        self.stats = {'batches': 0, 'patched_rounds': 0, 'recounts': 0, 'recounted_rounds': 0}
+
+    @property
+    def num_candidates(self):
+        return len(self.candidates)
+
+    def append_rankings(self, rankings):
+        """Append ballots given as lists of candidate names."""
+        return self.append(ballot_matrix(rankings, self.candidates))
+
+    def append(self, ranks, weights=None):
+        """Add a batch of rank rows (with optional per-row counts) and return the new snapshot.
+
+        The snapshot is a fresh (winner, round_details) pair, the same shape
+        tabulate returns; later appends never change it.
+        """
+        ranks = np.asarray(ranks)
+        if ranks.dtype != self.dtype:
+            raise ValueError(f"batch ranks must be {np.dtype(self.dtype).name} for {self.num_candidates} candidates")
+        ranks, weights = compress_ballots(ranks, weights)
+        self.batches.append((ranks, weights))
+        self.ballots += int(weights.sum())
+        self.stats['batches'] += 1
+        if self.rounds:
+            self._patch(ranks, weights)
+        else:
+            self._recount(0)
+        self.snapshot = (self.winner_name, self.round_details)
+        return self.snapshot
+
+    @property
+    def winner_name(self):
+        return None if self.winner is None else self.candidates[self.winner]
+
+    @property
+    def round_details(self):
+        """Per-round vote counts as RoundResult dicts, like tabulate returns."""
+        details = []
+        for number, counts in enumerate(self.rounds):
+            gone = set(self.eliminated[:number])
+            dropped = [self.candidates[c] for c in self.eliminated[number:number + 1]]
+            details.append(RoundResult({name: int(counts[c]) for c, name in enumerate(self.candidates) if c not in gone},
+                                       dropped))
+        return details
+
+    def _patch(self, ranks, weights):
+        # Add the batch into each stored round until a decision changes
+        counter = COUNTERS[self.method](ranks, self.num_candidates, weights)
+        for number in range(len(self.rounds)):
+            counts = self.rounds[number] + counter.counts()
+            self.rounds[number] = counts
+            self.stats['patched_rounds'] += 1
+            active = [c for c in range(self.num_candidates) if c not in self.eliminated[:number]]
+            winner, lowest = round_decision(counts, active)
+            if number < len(self.eliminated):
+                if winner is None and lowest == self.eliminated[number]:
+                    counter.eliminate([lowest])
+                    continue
+            elif winner == self.winner:
+                return
+            self._recount(number)
+            return
+
+    def _recount(self, start):
+        # Count every ballot again from round start, keeping the eliminations before it
+        ranks, weights = self._merged()
+        eliminated = self.eliminated[:start]
+        checkpoints = []
+        counter = COUNTERS[self.method](ranks, self.num_candidates, weights)
+        if eliminated:
+            counter.eliminate(eliminated)
+        winner, _ = run_rounds(counter, self.candidates, eliminated, checkpoints)
+        self.rounds = self.rounds[:start] + checkpoints
+        self.eliminated = eliminated
+        self.winner = None if winner is None else self.candidates.index(winner)
+        self.stats['recounts'] += 1
+        self.stats['recounted_rounds'] += len(checkpoints)
+
+    def _merged(self):
+        # Every batch as one compressed rank matrix, which then replaces them
+        if len(self.batches) > 1:
+            width = max(ranks.shape[1] for ranks, _ in self.batches)
+            padded = [np.pad(ranks, ((0, 0), (0, width - ranks.shape[1])), constant_values=blank_value(self.dtype))
+                      for ranks, _ in self.batches]
+            self.batches = [compress_ballots(np.concatenate(padded),
+                                             np.concatenate([weights for _, weights in self.batches]))]
+        return self.batches[0]
+
+
+if __name__ == '__main__':
+    from electorate import MODELS, generate
+
+    parser = argparse.ArgumentParser(description='Replay a simulated election night batch by batch.')
+    parser.add_argument('--voters', type=int, default=5_000_000)
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--candidates', nargs='+', default=['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank'])
+    parser.add_argument('--model', choices=sorted(MODELS), default='mallows')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    ranks = generate(len(args.candidates), args.voters, args.model, args.seed)
+    live = LiveTabulation(args.candidates)
+    for number, batch in enumerate(np.array_split(ranks, args.batches), start=1):
+        started = time.perf_counter()
+        winner, round_details = live.append(batch)
+        print(f"Batch {number}: {live.ballots:,} ballots, {winner} leads after {len(round_details)} rounds "
+              f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+    print(live.stats)
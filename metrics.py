@@ -0,0 +1,163 @@
+"""Opt-in timing and allocation metrics for counts and the game loop.
+
+Nothing is recorded until enable() is called. While disabled, each
+instrumented call costs one global lookup, and run_rounds checks once per
+count. While enabled, a Recorder collects:
+
+    spans    calls and total wall time of each instrumented function
+    rounds   per-round wall time, count and elimination time, ballots moved
+             off eliminated candidates, how many of those transferred or
+             exhausted, and (with trace_allocations) peak bytes allocated
+    frames   a histogram of run_game frame times
+
+Recordings export to JSON (everything) or CSV (the per-round table):
+
+    metrics.enable(trace_allocations=True)
+    irv.simulate_voting_rounds(1_000_000, candidates)
+    metrics.export('rounds.csv')
+
+Setting IRV_METRICS=path in the environment enables recording when the game
+starts and exports to path when it exits.
+"""
+
+import atexit
+import csv
+import functools
+import json
+import os
+import time
+import tracemalloc
+
+
+# Upper bounds of the frame-time histogram buckets, in milliseconds
+FRAME_BUCKETS_MS = (1, 2, 4, 8, 16, 33, 50, 100, 250, float('inf'))
+ROUND_FIELDS = ('election', 'round', 'seconds', 'count_seconds', 'eliminate_seconds', 'eliminated',
+                'moved', 'transferred', 'exhausted', 'exhausted_total', 'allocated_bytes')
+
+# The active Recorder, or None while metrics are disabled
+recorder = None
+
+
+class Recorder:
+    """Everything recorded since metrics were enabled."""
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.started = time.time()
+        self.spans = {}
+        self.rounds = []
+        self.elections = 0
+        self.frames = [0] * len(FRAME_BUCKETS_MS)
+        self.frame_seconds = 0.0
+
+    def add_span(self, name, seconds):
+        calls, total = self.spans.get(name, (0, 0.0))
+        self.spans[name] = (calls + 1, total + seconds)
+
+    def start_election(self):
+        self.elections += 1
+        return self.elections
+
+    def add_round(self, **fields):
+        self.rounds.append(fields)
+
+    def add_frame(self, seconds):
+        milliseconds = seconds * 1000
+        for bucket, bound in enumerate(FRAME_BUCKETS_MS):
+            if milliseconds <= bound:
+                self.frames[bucket] += 1
+                break
+        self.frame_seconds += seconds
+
+    def as_dict(self):
+        frames = sum(self.frames)
+        return {
+            'started': self.started,
+            'trace_allocations': self.trace_allocations,
+            'spans': {name: {'calls': calls, 'seconds': total, 'mean_seconds': total / calls}
+                      for name, (calls, total) in sorted(self.spans.items())},
+            'elections': self.elections,
+            'rounds': self.rounds,
+            'frames': {
+                'count': frames,
+                'mean_ms': self.frame_seconds * 1000 / frames if frames else None,
+                'histogram_ms': {('inf' if bound == float('inf') else bound): count
+                                 for bound, count in zip(FRAME_BUCKETS_MS, self.frames)},
+            },
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.as_dict(), file, indent=1)
+
+    def write_csv(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=ROUND_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rounds)
+
+
+def enable(trace_allocations=False):
+    """Start a fresh recording, optionally tracing allocations with tracemalloc."""
+    global recorder
+    if trace_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    recorder = Recorder(trace_allocations)
+    return recorder
+
+
+def disable():
+    """Stop recording, returning what was recorded."""
+    global recorder
+    finished, recorder = recorder, None
+    if finished is not None and finished.trace_allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return finished
+
+
+def export(path, finished=None):
+    """Write a recording (the active one by default) as JSON, or CSV if path ends in .csv."""
+    finished = finished or recorder
+    if finished is None:
+        raise RuntimeError("metrics are not enabled")
+    if path.lower().endswith('.csv'):
+        finished.write_csv(path)
+    else:
+        finished.write_json(path)
+
+
+def enable_from_environment():
+    """Enable recording if IRV_METRICS names an output file, exporting there at exit."""
+    path = os.environ.get('IRV_METRICS')
+    if path and recorder is None:
+        enable(os.environ.get('IRV_METRICS_ALLOCATIONS') == '1')
+        atexit.register(lambda: recorder is not None and export(path))
+
+
+def timed(function):
+    """Record calls to function as a span while metrics are enabled."""
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if recorder is None:
+            return function(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            # The recording may have been swapped or stopped during the call
+            if recorder is not None:
+                recorder.add_span(name, time.perf_counter() - started)
+    return wrapper
+
+
+def allocation_mark():
+    """Reset the tracemalloc peak and return the current traced size."""
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def allocated_since(mark):
+    """Peak bytes allocated above mark since allocation_mark() returned it."""
+    return max(tracemalloc.get_traced_memory()[1] - mark, 0)
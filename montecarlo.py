@@ -0,0 +1,135 @@
+"""Headless Monte Carlo runs of many independent simulated elections.
+
+Each trial draws its own random electorate and runs a full IRV count. Trial i
+of a run always uses the seed sequence (seed, i), so a run can be reproduced
+whatever the worker count or block size. Trials are handed to a process pool
+in blocks, and run_batch yields the running aggregate as each block finishes,
+so a caller can stop a long run early and keep what it has.
+"""
+
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from electorate import MODELS, random_electorate
+from tabulation import TIE_BREAKS, tabulate
+
+
+DEFAULT_BLOCK_SIZE = 500
+
+
+class Aggregate:
+    """Outcome distributions over a set of trials."""
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.trials = 0
+        self.wins = Counter()
+        self.round_counts = Counter()
+        self.elimination_orders = Counter()
+
+    def add(self, winner, round_details):
+        self.trials += 1
+        self.wins[winner] += 1
+        self.round_counts[len(round_details)] += 1
+        self.elimination_orders[elimination_order(round_details)] += 1
+
+    def merge(self, other):
+        self.trials += other.trials
+        self.wins.update(other.wins)
+        self.round_counts.update(other.round_counts)
+        self.elimination_orders.update(other.elimination_orders)
+
+    def win_frequencies(self):
+        return {candidate: wins / self.trials for candidate, wins in self.wins.most_common()}
+
+    def as_dict(self, top_orders=10):
+        return {
+            'seed': self.seed,
+            'trials': self.trials,
+            'win_frequencies': self.win_frequencies(),
+            'round_counts': dict(sorted(self.round_counts.items())),
+            'elimination_orders': [[list(order), count] for order, count in self.elimination_orders.most_common(top_orders)],
+        }
+
+
+def elimination_order(round_details):
+    """Candidates in the order they dropped out between rounds."""
+    order = []
+    for before, after in zip(round_details, round_details[1:]):
+        order.extend(candidate for candidate in before if candidate not in after)
+    return tuple(order)
+
+
+def run_trial(seed, trial, num_voters, candidates, model='impartial', batch=False, tie_break='first'):
+    """Run trial number trial of the run seeded with seed."""
+    sequence = np.random.SeedSequence(seed, spawn_key=(trial,))
+    ranks, weights = random_electorate(len(candidates), num_voters, sequence, model)
+    # Drawing lots uses its own stream so it does not shift the electorate
+    lots = np.random.SeedSequence(seed, spawn_key=(trial, 1))
+    return tabulate(ranks, candidates, weights, batch=batch, tie_break=tie_break, seed=lots)
+
+
+def _run_block(seed, first, last, num_voters, candidates, model, batch, tie_break):
+    aggregate = Aggregate(seed)
+    for trial in range(first, last):
+        aggregate.add(*run_trial(seed, trial, num_voters, candidates, model, batch, tie_break))
+    return aggregate
+
+
+def run_batch(num_trials, num_voters, candidates, seed=None, processes=None, block_size=DEFAULT_BLOCK_SIZE,
+              model='impartial', batch=False, tie_break='first'):
+    """Run num_trials elections, yielding the running Aggregate after each block."""
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    total = Aggregate(seed)
+    blocks = [(first, min(first + block_size, num_trials)) for first in range(0, num_trials, block_size)]
+    processes = processes or os.cpu_count() or 1
+
+    executor = ProcessPoolExecutor(max_workers=processes)
+    try:
+        # Keep only a couple of blocks per worker queued so stopping early is cheap
+        queued = iter(blocks)
+        pending = set()
+        while True:
+            for first, last in queued:
+                pending.add(executor.submit(_run_block, seed, first, last, num_voters, candidates, model,
+                                             batch, tie_break))
+                if len(pending) >= processes * 2:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                total.merge(future.result())
+                yield total
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run many simulated IRV elections without the game window.')
+    parser.add_argument('--trials', type=int, default=10_000)
+    parser.add_argument('--voters', type=int, default=10_000)
+    parser.add_argument('--candidates', nargs='+', default=['Alice', 'Bob', 'Charlie', 'Diana'])
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument('--model', choices=sorted(MODELS), default='impartial')
+    parser.add_argument('--batch', action='store_true', help='eliminate every defeated candidate in one round')
+    parser.add_argument('--tie-break', choices=TIE_BREAKS, default='first')
+    args = parser.parse_args()
+
+    aggregate = None
+    try:
+        for aggregate in run_batch(args.trials, args.voters, args.candidates, args.seed, args.processes,
+                                   args.block_size, args.model, args.batch, args.tie_break):
+            print(f"{aggregate.trials}/{args.trials} trials", flush=True)
+    except KeyboardInterrupt:
+        print("Stopped early")
+    if aggregate is not None:
+        print(json.dumps(aggregate.as_dict(), indent=2))
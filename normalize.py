@@ -0,0 +1,170 @@
+"""Ballot validation and normalization ahead of tabulation.
+
+Cast ballots are not the clean rankings the counters expect. A rank can be
+overvoted (more than one candidate marked), skipped, repeat a candidate ranked
+higher up, or name a write-in. Normalization applies one jurisdiction's
+Rules to whole rank matrices at once, with no per-ballot Python loop, and
+returns compact ballots: only countable candidates, packed to the front of
+each row, with identical rankings merged.
+
+    overvote      'exhaust' ends the ballot at an overvoted rank; 'skip' moves
+                  on to the next rank
+    max_skipped   a run of more than this many consecutive ranks with nothing
+                  countable ends the ballot; None lets ballots skip freely
+    duplicates    'skip' ignores a candidate ranked again; 'exhaust' ends the
+                  ballot there
+    write_ins     'exclude' treats write-in candidates as a skipped rank;
+                  'count' keeps them as ordinary candidates
+
+The count of ballots each rule changed is tallied under RULE_COUNTS:
+
+    ballots         ballots normalized
+    overvote        reached an overvoted rank
+    duplicate       reached a repeated candidate
+    write_in        reached an excluded write-in
+    skipped         had a gap closed up before a later countable rank
+    skip_exhausted  ended by max_skipped
+    exhausted       lost countable ranks to any exhausting rule
+    empty           have no countable rank left
+"""
+
+import numpy as np
+
+from tabulation import blank_value, compress_ballots, overvote_value, rank_dtype
+
+
+# Rows normalized at once, to bound the temporary arrays
+NORMALIZE_CHUNK = 1 << 20
+RULE_COUNTS = ('ballots', 'overvote', 'duplicate', 'write_in', 'skipped', 'skip_exhausted', 'exhausted', 'empty')
+
+
+class Rules:
+    """How one jurisdiction treats irregular marks."""
+
+    def __init__(self, overvote='exhaust', max_skipped=None, duplicates='skip', write_ins='exclude'):
+        if overvote not in ('exhaust', 'skip') or duplicates not in ('exhaust', 'skip'):
+            raise ValueError("overvote and duplicates must be 'exhaust' or 'skip'")
+        if write_ins not in ('exclude', 'count'):
+            raise ValueError("write_ins must be 'exclude' or 'count'")
+        self.overvote = overvote
+        self.max_skipped = max_skipped
+        self.duplicates = duplicates
+        self.write_ins = write_ins
+
+
+JURISDICTIONS = {
+    'lenient': Rules(overvote='skip', write_ins='count'),
+    'standard': Rules(),
+    # Two skipped ranks in a row end the ballot
+    'strict': Rules(max_skipped=1),
+}
+
+
+def empty_tally():
+    """Rule counts with nothing counted yet."""
+    return dict.fromkeys(RULE_COUNTS, 0)
+
+
+def normalize_chunk(ranks, num_candidates, weights=None, rules='standard', write_ins=(), tally=None):
+    """Apply rules to one rank matrix, returning it compacted in the same dtype.
+
+    Cells below num_candidates are candidates, write_ins lists the ids among
+    them that are write-ins, and every other value is a blank or an overvote.
+    The ballots each rule changed are added to tally, weighted by weights.
+    """
+    rules = JURISDICTIONS[rules] if isinstance(rules, str) else rules
+    blank = blank_value(ranks.dtype)
+    num_ballots, width = ranks.shape
+    columns = np.arange(width)
+    if not width:
+        if tally is not None:
+            total = num_ballots if weights is None else int(np.sum(weights))
+            tally['ballots'] += total
+            tally['empty'] += total
+        return ranks
+
+    marked = ranks < num_candidates
+    excluded = np.zeros_like(marked)
+    if len(write_ins) and rules.write_ins == 'exclude':
+        excluded = np.isin(ranks, np.asarray(write_ins, dtype=ranks.dtype)) & marked
+        marked &= ~excluded
+    overvoted = ranks == overvote_value(ranks.dtype)
+    # A candidate already ranked in an earlier column
+    repeated = np.zeros_like(marked)
+    for column in range(1, width):
+        repeated[:, column] = (ranks[:, :column] == ranks[:, column, None]).any(axis=1)
+    repeated &= marked
+    countable = marked & ~repeated
+
+    ending = np.zeros_like(marked)
+    if rules.overvote == 'exhaust':
+        ending |= overvoted
+    if rules.duplicates == 'exhaust':
+        ending |= repeated
+    skip_ending = np.zeros_like(marked)
+    if rules.max_skipped is not None:
+        # Length of the run of uncountable ranks ending at each column
+        last_countable = np.maximum.accumulate(np.where(countable, columns, -1), axis=1)
+        skip_ending = ~countable & (columns - last_countable > rules.max_skipped)
+        ending |= skip_ending
+    cut = np.where(ending.any(axis=1), ending.argmax(axis=1), width)
+    before_cut = columns < cut[:, None]
+    reached = columns <= cut[:, None]
+    kept = countable & before_cut
+
+    # Stable-sort each row's kept cells to the front and blank the rest
+    lengths = kept.sum(axis=1)
+    order = np.argsort(~kept, axis=1, kind='stable')
+    cleaned = np.take_along_axis(ranks, order, axis=1)
+    cleaned[columns >= lengths[:, None]] = blank
+    cleaned = cleaned[:, :lengths.max(initial=0)]
+
+    if tally is not None:
+        weights = np.ones(num_ballots, dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+        exhausted = (countable & ~before_cut).any(axis=1)
+        # A gap was closed if some kept cell moved left of its column
+        gap_closed = (kept & (columns >= np.cumsum(kept, axis=1))).any(axis=1)
+        changed = {
+            'ballots': np.ones(num_ballots, dtype=bool),
+            'overvote': (overvoted & reached).any(axis=1),
+            'duplicate': (repeated & reached).any(axis=1),
+            'write_in': (excluded & reached).any(axis=1),
+            'skipped': gap_closed,
+            'skip_exhausted': exhausted & (skip_ending & (columns == cut[:, None])).any(axis=1),
+            'exhausted': exhausted,
+            'empty': lengths == 0,
+        }
+        for rule, ballots in changed.items():
+            tally[rule] += int(weights @ ballots)
+    return cleaned
+
+
+def normalize_ballots(ranks, num_candidates, weights=None, rules='standard', write_ins=(),
+                      chunk_size=NORMALIZE_CHUNK):
+    """Normalize a rank matrix into (distinct rankings, ballot counts, rule counts).
+
+    The distinct rankings use the smallest rank dtype for num_candidates.
+    """
+    tally = empty_tally()
+    parts, counts = [], []
+    for start in range(0, len(ranks), chunk_size):
+        chunk_weights = None if weights is None else weights[start:start + chunk_size]
+        cleaned = normalize_chunk(ranks[start:start + chunk_size], num_candidates, chunk_weights, rules, write_ins,
+                                  tally)
+        distinct, chunk_counts = compress_ballots(cleaned, chunk_weights)
+        parts.append(distinct)
+        counts.append(chunk_counts)
+    dtype = rank_dtype(num_candidates)
+    if not parts:
+        return np.zeros((0, 0), dtype=dtype), np.zeros(0, dtype=np.int64), tally
+    width = max(part.shape[1] for part in parts)
+    merged = np.full((sum(len(part) for part in parts), width), blank_value(ranks.dtype), dtype=ranks.dtype)
+    start = 0
+    for part in parts:
+        merged[start:start + len(part), :part.shape[1]] = part
+        start += len(part)
+    distinct, counts = compress_ballots(merged, np.concatenate(counts)) if len(parts) > 1 else (parts[0], counts[0])
+    # Only candidates and blanks are left, so narrowing just moves the blank
+    narrow = distinct.astype(dtype)
+    narrow[distinct == blank_value(ranks.dtype)] = blank_value(dtype)
+    return narrow, counts, tally
@@ -0,0 +1,113 @@
+"""Head-to-head (Condorcet) results from the same rank matrices IRV counts.
+
+wins[a, b] is the number of voters ranking a above b. A ranked candidate is
+above every unranked one, two unranked candidates are level, and a
+candidate ranked twice counts at its highest rank. The matrix is built in
+one pass over the ballots, a chunk of rows at a time: each chunk's rank rows
+are turned into the position of every candidate on the ballot, and each row
+of wins is one weighted sum of position comparisons.
+
+From the matrix come the margins (wins minus losses for every pair), the
+Condorcet winner and loser if there are any, and the Smith set, the smallest
+group of candidates that each beat everyone outside it. A Smith set
+containing a cycle of strict head-to-head wins is a Condorcet cycle.
+
+    result = pairwise(ranks, candidates, counts)
+    result.condorcet_winner, result.smith_set, result.has_cycle
+"""
+
+import itertools
+
+import numpy as np
+
+
+# Ballot rows compared at once, to bound the temporary arrays
+PAIRWISE_CHUNK = 1 << 18
+
+
+def ranking_positions(ranks, num_candidates):
+    """(rows, num_candidates) rank position of each candidate on each ballot.
+
+    Unranked candidates get the ballot width, below every ranked one.
+    """
+    num_ballots, width = ranks.shape
+    positions = np.full((num_ballots, num_candidates + 1), width, dtype=np.int32)
+    # Blanks and overvotes land in the extra column, which is dropped
+    cells = np.minimum(ranks, num_candidates)
+    rows = np.arange(num_ballots)
+    # Fill right to left so a repeated candidate keeps its highest rank
+    for column in range(width - 1, -1, -1):
+        positions[rows, cells[:, column]] = column
+    return positions[:, :num_candidates]
+
+
+def pairwise_matrix(ranks, num_candidates, weights=None, chunk_size=PAIRWISE_CHUNK):
+    """(num_candidates, num_candidates) matrix of voters ranking the row candidate above the column one."""
+    wins = np.zeros((num_candidates, num_candidates), dtype=np.int64)
+    for start in range(0, len(ranks), chunk_size):
+        positions = ranking_positions(ranks[start:start + chunk_size], num_candidates)
+        if weights is None:
+            chunk_weights = np.ones(len(positions))
+        else:
+            chunk_weights = np.asarray(weights[start:start + chunk_size], dtype=np.float64)
+        for candidate in range(num_candidates):
+            above = positions[:, candidate, None] < positions
+            # Float sums of whole numbers are exact below 2 ** 53 voters
+            wins[candidate] += (chunk_weights @ above).astype(np.int64)
+    return wins
+
+
+class PairwiseResult:
+    """Head-to-head wins between every pair of candidates and what follows from them."""
+
+    def __init__(self, candidates, wins):
+        self.candidates = list(candidates)
+        self.wins = wins
+        self.margins = wins - wins.T
+        num_candidates = len(self.candidates)
+        others = ~np.eye(num_candidates, dtype=bool)
+        beats = (self.margins > 0) | ~others
+        beaten = (self.margins < 0) | ~others
+        self.condorcet_winner = next((self.candidates[c] for c in range(num_candidates) if beats[c].all()), None)
+        self.condorcet_loser = next((self.candidates[c] for c in range(num_candidates) if beaten[c].all()), None)
+        # Everyone a candidate reaches through chains of wins or ties
+        reaches = _closure(self.margins >= 0)
+        smith = [c for c in range(num_candidates) if reaches[c].all()]
+        self.smith_set = [self.candidates[c] for c in smith]
+        # A strict win chain leading back to where it started
+        strict = _closure(self.margins > 0)
+        self.has_cycle = bool(np.diagonal(strict)[smith].any())
+
+    def margin_table(self):
+        """(a, b, voters preferring a, voters preferring b, margin) for every pair, largest margin first."""
+        rows = []
+        for a, b in itertools.combinations(range(len(self.candidates)), 2):
+            if self.margins[a, b] < 0:
+                a, b = b, a
+            rows.append((self.candidates[a], self.candidates[b], int(self.wins[a, b]), int(self.wins[b, a]),
+                         int(self.margins[a, b])))
+        return sorted(rows, key=lambda row: row[4], reverse=True)
+
+    def as_dict(self):
+        return {
+            'candidates': self.candidates,
+            'wins': self.wins.tolist(),
+            'condorcet_winner': self.condorcet_winner,
+            'condorcet_loser': self.condorcet_loser,
+            'smith_set': self.smith_set,
+            'has_cycle': self.has_cycle,
+            'margins': self.margin_table(),
+        }
+
+
+def _closure(relation):
+    # Transitive closure of a boolean relation matrix
+    reach = relation.copy()
+    for middle in range(len(reach)):
+        reach |= reach[:, middle, None] & reach[middle]
+    return reach
+
+
+def pairwise(ranks, candidates, weights=None):
+    """Head-to-head results of a rank matrix (with optional per-row counts) as a PairwiseResult."""
+    return PairwiseResult(candidates, pairwise_matrix(ranks, len(candidates), weights))
@@ -0,0 +1,156 @@
+"""Content-addressed cache of tabulation results.
+
+Results are stored under a SHA-256 of everything that decides them: the rank
+matrix bytes, dtype and shape, the per-row weights, the candidate list and
+the counting options. Changing any ballot changes the key, so stale entries
+are never returned; they just age out. COUNT_VERSION is part of every key and
+is bumped whenever the counting rules change, which retires old disk entries.
+
+Entries live in a bounded in-memory LRU and, if a directory is configured,
+also as one JSON file per key on disk. Disk hits are promoted into memory.
+Values must be JSON-serialisable.
+
+    IRV_RESULT_CACHE_DIR=path   give the default cache a disk tier
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+COUNT_VERSION = 2
+DEFAULT_MAX_ENTRIES = 256
+
+
+def seed_key(seed):
+    """JSON form of a seed: as given, or a SeedSequence's entropy and spawn key."""
+    if isinstance(seed, np.random.SeedSequence):
+        return [seed.entropy, list(seed.spawn_key)]
+    return seed
+
+
+def ballot_key(kind, ranks, candidates, weights=None, **options):
+    """Hex digest identifying a count of these ballots with these options."""
+    digest = hashlib.sha256()
+    header = {'version': COUNT_VERSION, 'kind': kind, 'candidates': list(candidates),
+              'dtype': np.dtype(ranks.dtype).str, 'shape': list(ranks.shape),
+              'weighted': weights is not None, 'options': options}
+    digest.update(json.dumps(header, sort_keys=True).encode('utf-8'))
+    digest.update(np.ascontiguousarray(ranks).data)
+    if weights is not None:
+        digest.update(np.ascontiguousarray(weights, dtype='<i8').data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """An LRU of results with an optional directory of JSON files behind it."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'hash_seconds': 0.0}
+
+    def key(self, kind, ranks, candidates, weights=None, **options):
+        started = time.perf_counter()
+        key = ballot_key(kind, ranks, candidates, weights, **options)
+        self.stats['hash_seconds'] += time.perf_counter() - started
+        return key
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        """Stored value for key, or None."""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+        if self.directory is not None:
+            try:
+                with open(self._path(key)) as file:
+                    value = json.load(file)
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                self.stats['disk_hits'] += 1
+                self._remember(key, value)
+                return value
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        self.stats['stores'] += 1
+        self._remember(key, value)
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write beside the target and rename so readers never see half a file
+            partial = f'{path}.{os.getpid()}.tmp'
+            with open(partial, 'w') as file:
+                json.dump(value, file)
+            os.replace(partial, path)
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def clear(self, disk=False):
+        """Drop every in-memory entry, and the disk tier's files too if disk is set."""
+        self.entries.clear()
+        if disk and self.directory is not None:
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith('.json'):
+                        os.remove(os.path.join(root, name))
+
+    def info(self):
+        """Counters plus the current size, for reporting."""
+        lookups = self.stats['hits'] + self.stats['disk_hits'] + self.stats['misses']
+        return dict(self.stats, entries=len(self.entries), max_entries=self.max_entries, directory=self.directory,
+                    hit_rate=(self.stats['hits'] + self.stats['disk_hits']) / lookups if lookups else None)
+
+
+default_cache = ResultCache(directory=os.environ.get('IRV_RESULT_CACHE_DIR'))
+
+
+def configure(max_entries=DEFAULT_MAX_ENTRIES, directory=None):
+    """Replace the default cache, e.g. to size it or give it a disk tier."""
+    global default_cache
+    default_cache = ResultCache(max_entries, directory)
+    return default_cache
+
+
+def tabulate(ranks, candidates, weights=None, method='piles', processes=1, batch=False, tie_break='first',
+             seed=None, on_round=None, cache=None):
+    """tabulation.tabulate, answered from the cache when these ballots were counted before.
+
+    On a hit, on_round is called with every stored round in turn.
+    """
+    from tabulation import RoundResult, tabulate as count
+
+    cache = cache or default_cache
+    key = cache.key('tabulate', ranks, candidates, weights, batch=batch, tie_break=tie_break,
+                    seed=seed_key(seed) if tie_break == 'lot' else None)
+    stored = cache.get(key)
+    if stored is None:
+        winner, round_details = count(ranks, candidates, weights, method, processes, batch, tie_break, seed,
+                                      on_round)
+        cache.put(key, {'winner': winner, 'round_details': [dict(round_votes) for round_votes in round_details],
+                        'eliminated': [round_votes.eliminated for round_votes in round_details]})
+        return winner, round_details
+    # Callers get their own dicts, so editing a result cannot corrupt the cache
+    round_details = [RoundResult(round_votes, eliminated)
+                     for round_votes, eliminated in zip(stored['round_details'], stored['eliminated'])]
+    if on_round is not None:
+        for round_votes in round_details:
+            on_round(round_votes)
+    return stored['winner'], round_details
@@ -0,0 +1,390 @@
+"""Local HTTP/JSON tabulation service, without the game window.
+
+    python service.py --port 8765 --workers 4 --queue 16 --root /data/elections
+    python service.py --unix /tmp/irv.sock
+
+Endpoints:
+
+    POST /tabulate   count an election described by the JSON body
+    GET  /stats      queue depth, running jobs and totals
+    GET  /health     liveness check
+
+The /tabulate body names its ballots in one of three ways:
+
+    {"candidates": [...], "ballots": [["Alice", "Bob"], ...], "weights": [...]}
+    {"path": "county.irvb"}          a ballot file, or a CSV/JSONL CVR, under --root
+    {"simulate": {"voters": 100000, "candidates": [...], "model": "mallows", "seed": 1}}
+
+and may add "batch", "tie_break" and "seed" counting options. A CVR path can
+also name normalization "rules" and its "write_ins" candidates. Counts run in a
+bounded process pool. Each round is streamed back as one line of NDJSON as
+soon as the worker decides it, followed by a final line holding the winner;
+?stream=0 returns a single JSON document instead.
+
+Backpressure: at most --workers counts run at once and at most --queue more
+wait for a worker; beyond that requests get 503 with Retry-After. Rounds
+travel through a bounded queue, so a client that reads slowly holds its
+worker back instead of piling rounds up in memory.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_QUEUE = 16
+MAX_BODY_BYTES = 256 * 1024 * 1024
+# Rounds a worker may get ahead of the client reading them
+ROUND_BUFFER = 64
+RETRY_AFTER_SECONDS = 1
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """A request the service refuses, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def load_election(spec, root='.'):
+    """Build (ranks, candidates, weights) from a /tabulate request body."""
+    import numpy as np
+
+    from tabulation import ballot_matrix, compress_ballots
+
+    if 'path' in spec:
+        path = os.path.realpath(os.path.join(root, spec['path']))
+        if os.path.commonpath([path, os.path.realpath(root)]) != os.path.realpath(root):
+            raise RequestError(400, f"{spec['path']} is outside the ballot root")
+        if not os.path.exists(path):
+            raise RequestError(404, f"no ballot file {spec['path']}")
+        if path.endswith('.irvb'):
+            from ballotfile import open_ballot_file
+            ballots = open_ballot_file(path)
+            return ballots.ranks, ballots.candidates, ballots.weights
+        from ingest import load_ballots
+        from normalize import JURISDICTIONS
+        rules = spec.get('rules')
+        if rules is not None and rules not in JURISDICTIONS:
+            raise RequestError(400, f"unknown rules {rules!r}")
+        ranks, counts, names, _ = load_ballots(path, spec.get('candidates', ()), rules=rules,
+                                               write_ins=spec.get('write_ins', ()))
+        return ranks, names, counts
+
+    if 'simulate' in spec:
+        from electorate import MODELS, random_electorate
+        simulate = spec['simulate']
+        candidates = list(simulate['candidates'])
+        model = simulate.get('model', 'impartial')
+        if model not in MODELS:
+            raise RequestError(400, f"unknown model {model!r}")
+        ranks, weights = random_electorate(len(candidates), int(simulate['voters']), simulate.get('seed'), model)
+        return ranks, candidates, weights
+
+    if 'ballots' in spec:
+        candidates = list(spec['candidates'])
+        try:
+            ranks = ballot_matrix(spec['ballots'], candidates)
+        except KeyError as error:
+            raise RequestError(400, f"ballot names unknown candidate {error.args[0]!r}")
+        weights = spec.get('weights')
+        if weights is not None:
+            if len(weights) != len(ranks):
+                raise RequestError(400, "weights must have one entry per ballot")
+            weights = np.asarray(weights, dtype=np.int64)
+        ranks, weights = compress_ballots(ranks, weights)
+        return ranks, candidates, weights
+
+    raise RequestError(400, "body needs one of 'ballots', 'path' or 'simulate'")
+
+
+def run_job(spec, root, rounds):
+    """Count one election in a pool worker, putting each round on the rounds queue.
+
+    The queue receives ('round', {...}) items, then ('done', summary) or
+    ('error', status, message).
+    """
+    import result_cache
+
+    try:
+        started = time.perf_counter()
+        ranks, candidates, weights = load_election(spec, root)
+
+        def send_round(round_votes):
+            rounds.put(('round', {'votes': dict(round_votes), 'eliminated': round_votes.eliminated}))
+
+        winner, round_details = result_cache.tabulate(
+            ranks, candidates, weights, batch=bool(spec.get('batch', False)),
+            tie_break=spec.get('tie_break', 'first'), seed=spec.get('seed'), on_round=send_round)
+        rounds.put(('done', {'winner': winner, 'rounds': len(round_details), 'candidates': list(candidates),
+                             'ballots': int(weights.sum()) if weights is not None else len(ranks),
+                             'seconds': time.perf_counter() - started}))
+    except RequestError as error:
+        rounds.put(('error', error.status, str(error)))
+    except (KeyError, TypeError, ValueError) as error:
+        rounds.put(('error', 400, f"bad request: {error!r}"))
+    except Exception as error:
+        rounds.put(('error', 500, f"{type(error).__name__}: {error}"))
+
+
+def worker_context():
+    """Start method for pool workers that does not fork from the server.
+
+    A forked worker would inherit the sockets of every connection open at the
+    time and keep them open as long as it lives, so those clients never see
+    the connection close. As with any start method but fork, a script that
+    runs serve must do so under `if __name__ == '__main__'`.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class TabulationService:
+    """Accepts requests, queues them for the pool and streams the rounds back."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue=DEFAULT_QUEUE, root='.'):
+        self.workers = workers
+        self.queue_limit = queue
+        self.root = root
+        self.pool = None
+        self.manager = None
+        self.slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.totals = {'requests': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'rounds_streamed': 0}
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+        self.manager = multiprocessing.Manager()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.manager is not None:
+            self.manager.shutdown()
+
+    def stats(self):
+        return dict(self.totals, workers=self.workers, queue_limit=self.queue_limit,
+                    running=self.running, waiting=self.waiting)
+
+    async def handle(self, reader, writer):
+        """Serve one request on a connection, then close it."""
+        try:
+            method, target, body = await read_request(reader)
+            url = urlsplit(target)
+            if url.path == '/health':
+                await send_json(writer, 200, {'status': 'ok'})
+            elif url.path == '/stats':
+                await send_json(writer, 200, self.stats())
+            elif url.path == '/tabulate':
+                if method != 'POST':
+                    raise RequestError(405, "use POST")
+                stream = parse_qs(url.query).get('stream', ['1'])[0] != '0'
+                await self.tabulate(writer, json.loads(body or b'{}'), stream)
+            else:
+                raise RequestError(404, f"no endpoint {url.path}")
+        except RequestError as error:
+            await send_json(writer, error.status, {'error': str(error)},
+                            {'Retry-After': str(RETRY_AFTER_SECONDS)} if error.status == 503 else None)
+        except ValueError as error:
+            await send_json(writer, 400, {'error': f"bad request: {error}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def tabulate(self, writer, spec, stream):
+        self.totals['requests'] += 1
+        if self.waiting + self.running >= self.workers + self.queue_limit:
+            self.totals['rejected'] += 1
+            raise RequestError(503, "tabulation queue is full")
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            await self._count(writer, spec, stream)
+        finally:
+            self.running -= 1
+            self.slots.release()
+
+    def _job_finished(self, pool, rounds, job):
+        # A worker that dies (killed, out of memory) never reports on the queue,
+        # so report for it and let the reader answer 500 and free the slot
+        if job.cancelled() or job.exception() is None:
+            return
+        error = job.exception()
+        if isinstance(error, BrokenProcessPool) and self.pool is pool:
+            # Every job left in a broken pool fails; later requests get a new one
+            pool.shutdown(wait=False)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+        asyncio.get_running_loop().run_in_executor(
+            None, rounds.put, ('error', 500, f"tabulation worker failed: {type(error).__name__}: {error}"))
+
+    async def _count(self, writer, spec, stream):
+        loop = asyncio.get_running_loop()
+        rounds = self.manager.Queue(ROUND_BUFFER)
+        job = loop.run_in_executor(self.pool, run_job, spec, self.root, rounds)
+        job.add_done_callback(functools.partial(self._job_finished, self.pool, rounds))
+        item = None
+        try:
+            started = False
+            collected = []
+            while True:
+                item = await loop.run_in_executor(None, rounds.get)
+                if item[0] == 'error':
+                    self.totals['failed'] += 1
+                    if not started:
+                        raise RequestError(item[1], item[2])
+                    await send_chunk(writer, {'error': item[2], 'status': item[1]})
+                    break
+                if item[0] == 'round':
+                    line = dict(item[1], round=len(collected) + 1)
+                    collected.append(line)
+                    if stream:
+                        if not started:
+                            await start_stream(writer)
+                            started = True
+                        await send_chunk(writer, line)
+                        self.totals['rounds_streamed'] += 1
+                    continue
+                self.totals['completed'] += 1
+                if not stream:
+                    await send_json(writer, 200, dict(item[1], round_details=collected))
+                    break
+                if not started:
+                    await start_stream(writer)
+                    started = True
+                await send_chunk(writer, item[1])
+                break
+            if started:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+        finally:
+            # If the client went away mid-count, keep reading so the worker is
+            # not left blocked on a full queue, then wait for it to finish
+            while item is None or item[0] == 'round':
+                item = await loop.run_in_executor(None, rounds.get)
+            # Its failure, if any, has been reported through the queue
+            await asyncio.wait([job])
+
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request into (method, target, body)."""
+    request_line = await reader.readline()
+    if not request_line:
+        raise ConnectionError("client closed the connection")
+    try:
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"body is larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, body
+
+
+async def send_json(writer, status, payload, headers=None):
+    body = json.dumps(payload).encode('utf-8')
+    head = [f'HTTP/1.1 {status} {REASONS[status]}', 'Content-Type: application/json',
+            f'Content-Length: {len(body)}', 'Connection: close']
+    head += [f'{name}: {value}' for name, value in (headers or {}).items()]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+
+async def start_stream(writer):
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n'
+                 b'Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n')
+    await writer.drain()
+
+
+async def send_chunk(writer, payload):
+    # One NDJSON line per chunk; drain() waits while the client is behind
+    line = json.dumps(payload).encode('utf-8') + b'\n'
+    writer.write(b'%x\r\n%s\r\n' % (len(line), line))
+    await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8765, unix=None, workers=DEFAULT_WORKERS, queue=DEFAULT_QUEUE, root='.',
+                ready=None):
+    """Run the service until cancelled. ready, if given, is set once it is listening."""
+    service = TabulationService(workers, queue, root)
+    service.start()
+    try:
+        if unix:
+            server = await asyncio.start_unix_server(service.handle, path=unix)
+        else:
+            server = await asyncio.start_server(service.handle, host, port)
+        async with server:
+            if ready is not None:
+                ready.set()
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+async def stream_tabulation(payload, host='127.0.0.1', port=8765, unix=None):
+    """Client helper: post payload to /tabulate and yield each NDJSON line as it arrives."""
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(b'POST /tabulate HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                 b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+    await writer.drain()
+    try:
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding') != 'chunked':
+            yield {'status': status, **json.loads(await reader.readexactly(int(headers['content-length'])))}
+            return
+        while (size := int(await reader.readline(), 16)):
+            yield json.loads(await reader.readexactly(size))
+            await reader.readexactly(2)
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve IRV tabulations over local HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--queue', type=int, default=DEFAULT_QUEUE, help='requests that may wait for a worker')
+    parser.add_argument('--root', default='.', help='directory ballot file paths are resolved in')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.queue, args.root))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,88 @@
+"""Tabulate one election across several processes.
+
+The ballots are split into contiguous shards, one per worker process. Each
+worker builds its own counter over its shard and keeps it for the whole count.
+Per round the coordinator only sends the ids being eliminated and gets back a
+count vector per shard, so no ballots cross a process boundary once the
+workers have started.
+"""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+from tabulation import COUNTERS
+
+
+def _serve(conn, ranks, num_candidates, weights, method):
+    # Worker loop: report counts, then apply each elimination it is sent
+    try:
+        counter = COUNTERS[method](ranks, num_candidates, weights)
+        conn.send(counter.counts())
+        while True:
+            candidate_ids = conn.recv()
+            if candidate_ids is None:
+                break
+            counter.eliminate(candidate_ids)
+            conn.send(counter.counts())
+    except Exception as error:
+        conn.send(error)
+    finally:
+        conn.close()
+
+
+class ShardedCounter:
+    """Counter whose ballots live in a pool of worker processes."""
+
+    def __init__(self, ranks, num_candidates, weights=None, processes=None, method='piles'):
+        processes = max(1, min(processes or os.cpu_count() or 1, len(ranks)))
+        bounds = np.linspace(0, len(ranks), processes + 1).astype(int)
+        self.workers = []
+        self.connections = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = multiprocessing.Pipe()
+            shard_weights = None if weights is None else weights[start:stop]
+            worker = multiprocessing.Process(
+                target=_serve, args=(child, ranks[start:stop], num_candidates, shard_weights, method), daemon=True)
+            worker.start()
+            child.close()
+            self.workers.append(worker)
+            self.connections.append(parent)
+        self._collect()
+
+    def _collect(self):
+        # Sum the per-shard count vectors into the election's counts
+        totals = None
+        for conn in self.connections:
+            counts = conn.recv()
+            if isinstance(counts, Exception):
+                self.close()
+                raise counts
+            totals = counts if totals is None else totals + counts
+        self.totals = totals
+
+    def counts(self):
+        return self.totals.copy()
+
+    def eliminate(self, candidate_ids):
+        candidate_ids = [int(c) for c in candidate_ids]
+        for conn in self.connections:
+            conn.send(candidate_ids)
+        self._collect()
+
+    def close(self):
+        for conn, worker in zip(self.connections, self.workers):
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            worker.join()
+        self.connections, self.workers = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
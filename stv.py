@@ -0,0 +1,161 @@
+"""Multi-winner single transferable vote (STV) over rank matrices.
+
+Counts follow the IRV round structure: each round the continuing candidates'
+votes are counted and one decision is made. Candidates reaching the Droop
+quota are elected. Elected surpluses are transferred one per round, largest
+first; when there is none to transfer the lowest continuing candidate is
+excluded. The count stops once every seat is filled or the continuing
+candidates only just fill the seats left.
+
+Surpluses move by the inclusive Gregory method: every ballot sitting on an
+elected candidate goes on to its next continuing choice, carrying its
+transfer value times surplus / total. Transfer values are fixed point with
+`decimals` places and are truncated after each transfer, so counts are exact
+and independent of how the ballots are ordered or grouped. A transfer value
+is kept per rank matrix row, and every ballot a row stands for carries it.
+Votes are int64 fixed point, so ballots times 10 ** decimals (and
+10 ** (2 * decimals)) must stay below 2 ** 63: over 9 billion ballots at 9
+decimals.
+
+    elected, round_details = stv.tabulate(ranks, candidates, seats=15, weights=counts)
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from electorate import MODELS, random_electorate
+from tabulation import TIE_BREAKS, PileCounter, RoundResult, break_tie
+
+
+DEFAULT_DECIMALS = 6
+
+
+class STVCounter(PileCounter):
+    """PileCounter whose ballots carry fractional transfer values.
+
+    The pile weights are each row's ballot count times its transfer value, so
+    the pile totals are the fixed-point votes and stay exact.
+    """
+
+    def __init__(self, ranks, num_candidates, weights=None, scale=10 ** DEFAULT_DECIMALS):
+        self.scale = scale
+        self.ballots = np.ones(len(ranks), dtype=np.int64) if weights is None else np.asarray(weights, np.int64)
+        # Fixed-point transfer value of each row, scale meaning a whole vote
+        self.transfer_values = np.full(len(ranks), scale, dtype=np.int64)
+        super().__init__(ranks, num_candidates, self.ballots * scale)
+
+    def elect(self, candidate_ids):
+        """Stop transfers landing on candidates, which keep the ballots they hold."""
+        self.active[candidate_ids] = False
+
+    def transfer_surplus(self, candidate, ratio):
+        """Move candidate's ballots on, scaling their transfer values by ratio / scale."""
+        self.active[candidate] = False
+        pile, self.piles[candidate] = self.piles[candidate], []
+        self.totals[candidate] = 0
+        if not pile:
+            return
+        rows = np.sort(np.concatenate(pile), kind='stable')
+        # Both factors are at most scale, so the product stays within int64
+        self.transfer_values[rows] = self.transfer_values[rows] * ratio // self.scale
+        self.weights[rows] = self.ballots[rows] * self.transfer_values[rows]
+        self._advance(rows)
+        self._deal(rows)
+
+
+def droop_quota(votes, seats):
+    """Smallest whole number of votes only seats candidates can reach."""
+    return votes // (seats + 1) + 1
+
+
+def tabulate(ranks, candidates, seats, weights=None, tie_break='first', seed=None, decimals=DEFAULT_DECIMALS,
+             on_round=None):
+    """Run an STV count, returning (elected names in order of election, round_details).
+
+    Each RoundResult maps the continuing and not yet transferred candidates
+    to their votes, and records who was elected, excluded (as eliminated) or
+    had their surplus transferred after it. tie_break and seed settle ties
+    for exclusion as in tabulation.run_rounds; on_round is called with each
+    round as it is decided.
+    """
+    if tie_break not in TIE_BREAKS:
+        raise ValueError(f"unknown tie_break {tie_break!r}, expected one of {TIE_BREAKS}")
+    if not 0 < seats <= len(candidates):
+        raise ValueError(f"seats must be between 1 and {len(candidates)}")
+    scale = 10 ** decimals
+    ballots = len(ranks) if weights is None else int(np.sum(weights))
+    if max(ballots, scale) * scale >= 2 ** 63:
+        raise ValueError(f"{ballots} ballots at {decimals} decimals do not fit int64 fixed-point votes")
+    counter = STVCounter(ranks, len(candidates), weights, scale)
+    first_counts = counter.counts()
+    quota = droop_quota(int(first_counts[:-1].sum()) // scale, seats) * scale
+    rng = np.random.default_rng(seed) if tie_break == 'lot' else None
+
+    continuing = list(range(len(candidates)))
+    elected = []
+    # Elected candidates whose surplus has not been transferred yet
+    pending = []
+    history = []
+    round_details = []
+    while len(elected) < seats:
+        counts = counter.counts()
+        round_votes = RoundResult({candidates[c]: int(counts[c]) / scale for c in continuing + pending})
+        round_votes.elected = []
+        round_votes.transferred = None
+        round_details.append(round_votes)
+
+        if len(continuing) <= seats - len(elected):
+            # Everyone still in the running is needed to fill the seats
+            reached = sorted(continuing, key=lambda c: -counts[c])
+        else:
+            reached = sorted((c for c in continuing if counts[c] >= quota), key=lambda c: -counts[c])
+        for c in reached:
+            continuing.remove(c)
+        elected += reached
+        pending += reached
+        counter.elect(reached)
+        round_votes.elected = [candidates[c] for c in reached]
+
+        if len(elected) >= seats:
+            elected = elected[:seats]
+        elif pending:
+            pending.sort(key=lambda c: -counts[c])
+            surplus_of = pending.pop(0)
+            surplus = int(counts[surplus_of]) - quota
+            counter.transfer_surplus(surplus_of, surplus * scale // int(counts[surplus_of]))
+            round_votes.transferred = candidates[surplus_of]
+        else:
+            fewest = min(counts[c] for c in continuing)
+            tied = [c for c in continuing if counts[c] == fewest]
+            excluded = break_tie(tied, history, tie_break, rng)
+            continuing.remove(excluded)
+            counter.eliminate([excluded])
+            round_votes.eliminated = [candidates[excluded]]
+        history.append(counts)
+        if on_round is not None:
+            on_round(round_votes)
+    return [candidates[c] for c in elected], round_details
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a simulated multi-seat STV count.')
+    parser.add_argument('--seats', type=int, default=15)
+    parser.add_argument('--candidates', type=int, default=60)
+    parser.add_argument('--voters', type=int, default=1_000_000)
+    parser.add_argument('--model', choices=sorted(MODELS), default='impartial')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tie-break', choices=TIE_BREAKS, default='first')
+    args = parser.parse_args()
+
+    names = [f"Candidate {i + 1}" for i in range(args.candidates)]
+    started = time.perf_counter()
+    # Drawing lots gets its own stream so it does not replay the electorate's
+    voters, lots = np.random.SeedSequence(args.seed).spawn(2)
+    ranks, counts = random_electorate(args.candidates, args.voters, voters, args.model)
+    drawn = time.perf_counter()
+    winners, rounds = tabulate(ranks, names, args.seats, counts, args.tie_break, lots)
+    finished = time.perf_counter()
+    print(f"Drew {args.voters:,} ballots ({len(ranks):,} distinct) in {drawn - started:.2f}s")
+    print(f"Elected {', '.join(winners)} after {len(rounds)} rounds in {finished - drawn:.2f}s")
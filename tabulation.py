@@ -0,0 +1,355 @@
+"""Array-based IRV tabulation engine.
+
+Ballots are stored as an integer matrix: one row per ballot, one column per
+rank, each cell holding a candidate index. Any value that is not a valid
+candidate index (we use the dtype's maximum) marks a blank rank, and the value
+just below it marks an overvoted rank; counts skip both. Each ballot keeps a
+pointer to the rank it currently counts for, so eliminating a candidate only
+advances the pointers of the ballots sitting on that candidate.
+"""
+
+import time
+
+import numpy as np
+
+import metrics
+
+
+# Rank-at-a-time steps tried before falling back to scanning whole rows
+STEP_PASSES = 2
+# Rows scanned at once by that fallback, to bound its temporary arrays
+SCAN_CHUNK = 1 << 20
+
+
+def rank_dtype(num_candidates):
+    """Smallest unsigned dtype that can hold every candidate index plus the blank and overvote marks."""
+    if num_candidates < np.iinfo(np.uint8).max:
+        return np.uint8
+    return np.uint16
+
+
+def blank_value(dtype):
+    """Cell value used for an unmarked rank."""
+    return np.iinfo(dtype).max
+
+
+def overvote_value(dtype):
+    """Cell value used for a rank marked with more than one candidate."""
+    return np.iinfo(dtype).max - 1
+
+
+def ballot_matrix(preferences, candidates):
+    """Convert a list of ranked candidate names into a rank matrix."""
+    index = {name: i for i, name in enumerate(candidates)}
+    dtype = rank_dtype(len(candidates))
+    width = max((len(pref) for pref in preferences), default=0)
+    ranks = np.full((len(preferences), width), blank_value(dtype), dtype=dtype)
+    for row, pref in enumerate(preferences):
+        ranks[row, :len(pref)] = [index[name] for name in pref]
+    return ranks
+
+
+def packs_into_key(ranks):
+    """Whether each rank row fits in one 64-bit integer, the fast path of compress_ballots."""
+    return ranks.shape[1] * ranks.dtype.itemsize * 8 <= 64
+
+
+def compress_ballots(ranks, weights=None):
+    """Collapse identical rankings into (distinct rank matrix, ballot counts)."""
+    if not len(ranks):
+        return ranks, np.zeros(0, dtype=np.int64)
+    bits = ranks.dtype.itemsize * 8
+    if packs_into_key(ranks):
+        # Short ballots pack into one integer key each, which sorts far faster
+        # than comparing rows
+        keys = np.zeros(len(ranks), dtype=np.uint64)
+        for column in ranks.T:
+            keys = (keys << np.uint64(bits)) | column
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        distinct = ranks[first]
+    else:
+        distinct, inverse = np.unique(ranks, axis=0, return_inverse=True)
+    counts = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(distinct))
+    return distinct, counts.astype(np.int64)
+
+
+class MatrixCounter:
+    """Holds the per-ballot pointer state for one election."""
+
+    def __init__(self, ranks, num_candidates, weights=None):
+        self.ranks = ranks
+        self.num_candidates = num_candidates
+        self.weights = weights
+        # Lookup table over every possible cell value; blanks are never active
+        self.active = np.zeros(np.iinfo(ranks.dtype).max + 1, dtype=bool)
+        self.active[:num_candidates] = True
+        self.pointer = np.zeros(len(ranks), dtype=np.intp)
+        # Candidate each ballot counts for; num_candidates means exhausted
+        self.choice = np.full(len(ranks), num_candidates, dtype=np.intp)
+        if ranks.shape[1]:
+            # Most ballots count for their first rank, so take that column whole
+            first = ranks[:, 0]
+            found = self.active.take(first)
+            self.choice[found] = first[found]
+            self._advance(np.flatnonzero(~found))
+
+    def _advance(self, rows):
+        # Move each ballot in rows to its next rank that names an active candidate
+        width = self.ranks.shape[1]
+        flat = self.ranks.reshape(-1)
+        pointer = self.pointer.take(rows) + 1
+        for _ in range(STEP_PASSES):
+            if not rows.size:
+                return
+            at_end = pointer >= width
+            if at_end.any():
+                self.pointer[rows[at_end]] = width
+                self.choice[rows[at_end]] = self.num_candidates
+                rows, pointer = rows[~at_end], pointer[~at_end]
+            cells = flat.take(rows * width + pointer)
+            found = self.active.take(cells)
+            settled = rows[found]
+            self.choice[settled] = cells[found]
+            self.pointer[settled] = pointer[found]
+            missing = ~found
+            rows, pointer = rows[missing], pointer[missing] + 1
+
+        # Ballots still unsettled skip over several dead ranks; scan the rest of
+        # their rows in one go instead of stepping a rank at a time
+        columns = np.arange(width)
+        for start in range(0, rows.size, SCAN_CHUNK):
+            chunk, after = rows[start:start + SCAN_CHUNK], pointer[start:start + SCAN_CHUNK]
+            usable = self.active.take(self.ranks[chunk])
+            usable &= columns >= after[:, None]
+            position = usable.argmax(axis=1)
+            exhausted = ~usable[np.arange(chunk.size), position]
+            position[exhausted] = width
+            self.pointer[chunk] = position
+            cells = self.ranks[chunk, np.minimum(position, width - 1)]
+            self.choice[chunk] = np.where(exhausted, self.num_candidates, cells)
+
+    def counts(self):
+        """Votes per candidate; the extra last entry is the exhausted total."""
+        totals = np.bincount(self.choice, weights=self.weights, minlength=self.num_candidates + 1)
+        return totals.astype(np.int64)
+
+    def eliminate(self, candidate_ids):
+        """Drop candidates and move their ballots to the next continuing choice."""
+        self.active[candidate_ids] = False
+        dropped = np.zeros(self.num_candidates + 1, dtype=bool)
+        dropped[candidate_ids] = True
+        rows = np.flatnonzero(dropped.take(self.choice))
+        self._advance(rows)
+
+
+class PileCounter(MatrixCounter):
+    """Keeps a pile of ballot indices per candidate.
+
+    Only the eliminated candidate's pile is touched when ballots change hands,
+    so the total work is proportional to the number of transfers and each
+    round's counts are read off the pile totals.
+    """
+
+    def __init__(self, ranks, num_candidates, weights=None):
+        super().__init__(ranks, num_candidates, weights)
+        self.piles = [[] for _ in range(num_candidates + 1)]
+        self.totals = np.zeros(num_candidates + 1, dtype=np.int64)
+        self._deal(np.arange(len(ranks)))
+
+    def _deal(self, rows):
+        # Sort ballots onto the pile of the candidate they now count for. The
+        # narrow stable sort is a radix sort and keeps each pile in row order.
+        choice = self.choice.take(rows)
+        order = np.argsort(choice.astype(rank_dtype(self.num_candidates)), kind='stable')
+        sizes = np.bincount(choice, minlength=self.num_candidates + 1)
+        dealt = rows.take(order)
+        if self.weights is None:
+            self.totals += sizes
+        else:
+            # Sum each pile's weights in int64 so large totals stay exact
+            filled = np.flatnonzero(sizes)
+            if filled.size:
+                starts = np.cumsum(sizes) - sizes
+                self.totals[filled] += np.add.reduceat(self.weights.take(dealt).astype(np.int64, copy=False),
+                                                       starts[filled])
+        for candidate, pile in enumerate(np.split(dealt, np.cumsum(sizes)[:-1])):
+            if pile.size:
+                self.piles[candidate].append(pile)
+
+    def counts(self):
+        return self.totals.copy()
+
+    def eliminate(self, candidate_ids):
+        self.active[candidate_ids] = False
+        moving = []
+        for candidate in candidate_ids:
+            moving.extend(self.piles[candidate])
+            self.piles[candidate] = []
+            self.totals[candidate] = 0
+        if moving:
+            # Piles are runs of ascending rows; merging them keeps the rank
+            # lookups in _advance walking forward through memory
+            rows = np.sort(np.concatenate(moving), kind='stable')
+            self._advance(rows)
+            self._deal(rows)
+
+
+# Counting strategies accepted by tabulate()
+COUNTERS = {
+    'matrix': MatrixCounter,
+    'piles': PileCounter,
+}
+
+
+# Ways of choosing who to eliminate when several candidates share the lowest count
+TIE_BREAKS = ('first', 'previous', 'lot')
+
+
+class RoundResult(dict):
+    """One round's {name: votes}, plus the names eliminated after it."""
+
+    def __init__(self, vote_counts, eliminated=()):
+        super().__init__(vote_counts)
+        self.eliminated = list(eliminated)
+
+
+def round_decision(counts, active):
+    """Return (winner, None) if an active candidate has a majority, else (None, candidate to eliminate)."""
+    total_votes = sum(int(counts[c]) for c in active)
+    for c in active:
+        if counts[c] > total_votes / 2:
+            return c, None
+    # Same rule as eliminate_candidate: the first candidate with the fewest votes
+    return None, min(active, key=lambda c: counts[c])
+
+
+def defeated_candidates(counts, active):
+    """Largest group of trailing candidates whose combined votes are below the next candidate's.
+
+    Eliminating them one at a time could never lift any of them past that
+    candidate, nor stop a majority winner, so dropping them together gives
+    the same winner in fewer rounds. Returns [] when there is no such group.
+    """
+    trailing = sorted(active, key=lambda c: counts[c])
+    group = []
+    combined = 0
+    for size, c in enumerate(trailing[:-1], start=1):
+        combined += int(counts[c])
+        if combined < counts[trailing[size]]:
+            group = trailing[:size]
+    return group
+
+
+def break_tie(tied, history, tie_break='first', rng=None):
+    """Pick which of the tied candidates to eliminate.
+
+    'first' takes the earliest in candidate order, 'previous' the one with the
+    fewest votes in the latest earlier round that separates them (history
+    holds earlier rounds' counts), and 'lot' draws one with rng.
+    """
+    tied = sorted(tied)
+    if tie_break == 'previous':
+        for counts in reversed(history):
+            fewest = min(counts[c] for c in tied)
+            tied = [c for c in tied if counts[c] == fewest]
+            if len(tied) == 1:
+                break
+    elif tie_break == 'lot':
+        return tied[rng.integers(len(tied))]
+    return tied[0]
+
+
+def run_rounds(counter, candidates, eliminated=None, checkpoints=None, batch=False, tie_break='first', seed=None,
+               on_round=None):
+    """Drive a counter round by round, returning (winner, round_details).
+
+    eliminated lists candidate ids the counter has already dropped, so a count
+    can resume part way; it is extended with each elimination. checkpoints,
+    if given, receives every round's raw count vector. With batch, each round
+    drops every defeated_candidates group at once. round_details holds a
+    RoundResult per round naming who was eliminated after it; on_round, if
+    given, is called with each one as soon as it is decided.
+    """
+    if tie_break not in TIE_BREAKS:
+        raise ValueError(f"unknown tie_break {tie_break!r}, expected one of {TIE_BREAKS}")
+    eliminated = [] if eliminated is None else eliminated
+    checkpoints = [] if checkpoints is None else checkpoints
+    active = [c for c in range(len(candidates)) if c not in eliminated]
+    round_details = []
+    rng = np.random.default_rng(seed) if tie_break == 'lot' else None
+    recorder = metrics.recorder
+    if recorder is not None:
+        election = recorder.start_election()
+
+    while active:
+        if recorder is not None:
+            started = time.perf_counter()
+            mark = metrics.allocation_mark() if recorder.trace_allocations else None
+        counts = counter.counts()
+        round_votes = RoundResult({candidates[c]: int(counts[c]) for c in active})
+        round_details.append(round_votes)
+
+        winner, lowest = round_decision(counts, active)
+        if winner is not None:
+            checkpoints.append(counts)
+            if on_round is not None:
+                on_round(round_votes)
+            if recorder is not None:
+                seconds = time.perf_counter() - started
+                recorder.add_round(
+                    election=election, round=len(checkpoints), seconds=seconds, count_seconds=seconds,
+                    eliminate_seconds=0.0, eliminated=None, moved=0, transferred=0, exhausted=0,
+                    exhausted_total=int(counts[-1]),
+                    allocated_bytes=None if mark is None else metrics.allocated_since(mark))
+            return candidates[winner], round_details
+
+        group = defeated_candidates(counts, active) if batch else []
+        if not group:
+            tied = [c for c in active if counts[c] == counts[lowest]]
+            if len(tied) > 1 and tie_break != 'first':
+                lowest = break_tie(tied, checkpoints, tie_break, rng)
+            group = [lowest]
+        checkpoints.append(counts)
+        for c in group:
+            active.remove(c)
+        eliminated.extend(group)
+        round_votes.eliminated = [candidates[c] for c in group]
+        if on_round is not None:
+            on_round(round_votes)
+        if recorder is None:
+            counter.eliminate(group)
+            continue
+
+        counted = time.perf_counter()
+        counter.eliminate(group)
+        finished = time.perf_counter()
+        # Exhausted ballots only change when an eliminated pile moves
+        moved = int(sum(counts[c] for c in group))
+        exhausted_total = int(counter.counts()[-1])
+        exhausted = exhausted_total - int(counts[-1])
+        recorder.add_round(
+            election=election, round=len(checkpoints), seconds=finished - started,
+            count_seconds=counted - started, eliminate_seconds=finished - counted,
+            eliminated=' '.join(round_votes.eliminated), moved=moved,
+            transferred=moved - exhausted, exhausted=exhausted, exhausted_total=exhausted_total,
+            allocated_bytes=None if mark is None else metrics.allocated_since(mark))
+
+    # Every candidate was eliminated without anyone reaching a majority
+    return None, round_details
+
+
+def tabulate(ranks, candidates, weights=None, method='piles', processes=1, batch=False, tie_break='first',
+             seed=None, on_round=None):
+    """Run an IRV count over a rank matrix.
+
+    With processes > 1 (or None for one per core) the ballots are sharded
+    across worker processes; the result is identical to the serial count.
+    batch, tie_break, seed and on_round are passed on to run_rounds.
+    """
+    if processes == 1:
+        counter = COUNTERS[method](ranks, len(candidates), weights)
+        return run_rounds(counter, candidates, batch=batch, tie_break=tie_break, seed=seed, on_round=on_round)
+
+    from sharded import ShardedCounter
+    with ShardedCounter(ranks, len(candidates), weights, processes, method) as counter:
+        return run_rounds(counter, candidates, batch=batch, tie_break=tie_break, seed=seed, on_round=on_round)
@@ -0,0 +1,164 @@
+"""Slow, obviously correct counts that the engine is checked against.
+
+Every round recounts every ballot from scratch in plain Python, so nothing is
+shared with the counters under test.
+"""
+
+import math
+from fractions import Fraction
+
+import numpy as np
+
+from tabulation import blank_value, overvote_value, rank_dtype
+
+
+def random_ballots(rng, num_candidates, num_ballots):
+    """Rank matrix with short ballots, skipped ranks, overvotes and repeated candidates."""
+    dtype = rank_dtype(num_candidates)
+    width = int(rng.integers(1, num_candidates + 2))
+    cells = rng.integers(0, num_candidates, (num_ballots, width)).astype(dtype)
+    marks = rng.random((num_ballots, width))
+    cells[marks < 0.15] = blank_value(dtype)
+    cells[(marks >= 0.15) & (marks < 0.2)] = overvote_value(dtype)
+    return cells
+
+
+def irv_count(ranks, num_candidates, weights=None):
+    """(winner id or None, [{candidate id: votes} per round], eliminated ids in order)."""
+    rows = ranks.tolist()
+    weights = [1] * len(rows) if weights is None else [int(weight) for weight in weights]
+    active = list(range(num_candidates))
+    rounds, eliminated = [], []
+    while active:
+        counts = dict.fromkeys(active, 0)
+        for row, weight in zip(rows, weights):
+            choice = next((cell for cell in row if cell in counts), None)
+            if choice is not None:
+                counts[choice] += weight
+        rounds.append(counts)
+        total = sum(counts.values())
+        winner = next((c for c in active if counts[c] * 2 > total), None)
+        if winner is not None:
+            return winner, rounds, eliminated
+        lowest = min(active, key=lambda c: counts[c])
+        active.remove(lowest)
+        eliminated.append(lowest)
+    return None, rounds, eliminated
+
+
+def named_irv_count(ranks, candidates, weights=None):
+    """irv_count in the (winner, round_details) shape tabulate returns, as plain dicts and names."""
+    winner, rounds, eliminated = irv_count(ranks, len(candidates), weights)
+    details = [({candidates[c]: votes for c, votes in counts.items()},
+                [candidates[c] for c in eliminated[number:number + 1]])
+               for number, counts in enumerate(rounds)]
+    return None if winner is None else candidates[winner], details
+
+def stv_count(ranks, num_candidates, seats, weights=None, decimals=6):
+    """(elected ids in order, [{candidate id: Fraction votes} per round]) by the rules in stv.
+
+    Transfer values are exact Fractions, truncated to decimals places after
+    each transfer as stv specifies.
+    """
+    scale = 10 ** decimals
+
+    def truncate(value):
+        return Fraction(math.floor(value * scale), scale)
+
+    ballots = []
+    for row, weight in zip(ranks.tolist(), [1] * len(ranks) if weights is None else weights):
+        ballots += [[cell for cell in row if cell < num_candidates]] * int(weight)
+    values = [Fraction(1)] * len(ballots)
+    # Candidate each ballot sits with, or None once exhausted
+    holder = [None] * len(ballots)
+    accepting = set(range(num_candidates))
+
+    def move_on(index):
+        holder[index] = next((c for c in ballots[index] if c in accepting), None)
+
+    for index in range(len(ballots)):
+        move_on(index)
+
+    def tally(candidates):
+        votes = dict.fromkeys(candidates, Fraction(0))
+        for index, candidate in enumerate(holder):
+            if candidate in votes:
+                votes[candidate] += values[index]
+        return votes
+
+    quota = int(sum(tally(range(num_candidates)).values())) // (seats + 1) + 1
+    continuing = list(range(num_candidates))
+    elected, pending, rounds = [], [], []
+    while len(elected) < seats:
+        votes = tally(continuing + pending)
+        rounds.append(votes)
+        if len(continuing) <= seats - len(elected):
+            reached = sorted(continuing, key=lambda c: -votes[c])
+        else:
+            reached = sorted((c for c in continuing if votes[c] >= quota), key=lambda c: -votes[c])
+        for c in reached:
+            continuing.remove(c)
+            accepting.discard(c)
+        elected += reached
+        pending += reached
+        if len(elected) >= seats:
+            break
+        if pending:
+            pending.sort(key=lambda c: -votes[c])
+            surplus_of = pending.pop(0)
+            ratio = truncate((votes[surplus_of] - quota) / votes[surplus_of])
+            for index, candidate in enumerate(holder):
+                if candidate == surplus_of:
+                    values[index] = truncate(values[index] * ratio)
+                    move_on(index)
+        else:
+            excluded = min(continuing, key=lambda c: votes[c])
+            continuing.remove(excluded)
+            accepting.discard(excluded)
+            for index, candidate in enumerate(holder):
+                if candidate == excluded:
+                    move_on(index)
+    return elected[:seats], rounds
+
+
+
+def normalize_row(row, num_candidates, rules, write_ins=()):
+    """(kept candidate ids, {rule: whether it changed the ballot}) walking one ballot rank by rank."""
+    overvote = overvote_value(np.asarray(row).dtype)
+    row = [int(cell) for cell in row]
+    excluded = set(write_ins) if rules.write_ins == 'exclude' else set()
+
+    def countable(column):
+        cell = row[column]
+        return cell < num_candidates and cell not in excluded and cell not in row[:column]
+
+    kept, flags = [], dict.fromkeys(('overvote', 'duplicate', 'write_in', 'skipped', 'skip_exhausted'), False)
+    run, cut, skip_cut = 0, len(row), False
+    for column, cell in enumerate(row):
+        ends = False
+        if cell == overvote:
+            flags['overvote'] = True
+            ends = rules.overvote == 'exhaust'
+        elif cell in excluded:
+            flags['write_in'] = True
+        elif cell < num_candidates and cell in row[:column]:
+            flags['duplicate'] = True
+            ends = rules.duplicates == 'exhaust'
+        if countable(column):
+            run = 0
+        else:
+            run += 1
+            # Every rule that ends the ballot at this rank is credited with it
+            skip_cut = rules.max_skipped is not None and run > rules.max_skipped
+            ends = ends or skip_cut
+        if ends:
+            cut = column
+            break
+        if countable(column):
+            if len(kept) < column:
+                flags['skipped'] = True
+            kept.append(cell)
+    flags['exhausted'] = any(countable(column) for column in range(cut, len(row)))
+    flags['skip_exhausted'] = flags['exhausted'] and skip_cut
+    flags['empty'] = not kept
+    return kept, flags
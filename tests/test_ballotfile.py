@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import result_cache
+from ballotfile import open_ballot_file, write_ballot_file
+from electorate import generate
+from tabulation import blank_value, compress_ballots, overvote_value, tabulate
+
+
+@pytest.fixture(autouse=True)
+def fresh_default_cache(monkeypatch):
+    monkeypatch.setattr(result_cache, 'default_cache', result_cache.ResultCache())
+
+
+def names(num_candidates):
+    return [f"c{i}" for i in range(num_candidates)]
+
+
+@pytest.mark.parametrize('num_candidates', [5, 300])
+def test_write_and_map_back(tmp_path, num_candidates):
+    ranks, counts = compress_ballots(generate(num_candidates, 2000, 'truncated', 1, base='impartial'))
+    path = str(tmp_path / 'election.irvb')
+    write_ballot_file(path, ranks, names(num_candidates), counts)
+    ballots = open_ballot_file(path)
+    assert isinstance(ballots.ranks, np.memmap) and isinstance(ballots.weights, np.memmap)
+    assert ballots.ranks.dtype == ranks.dtype
+    assert np.array_equal(ballots.ranks, ranks)
+    assert np.array_equal(ballots.weights, counts)
+    assert ballots.candidates == names(num_candidates)
+    assert len(ballots) == len(ranks)
+    assert ballots.tabulate() == tabulate(ranks, names(num_candidates), counts)
+    # Reopening maps the same bytes, so the count comes from the cache
+    assert open_ballot_file(path).tabulate() == tabulate(ranks, names(num_candidates), counts)
+    assert result_cache.default_cache.stats['hits'] == 1
+
+
+def test_unweighted_file_has_no_counts(tmp_path):
+    ranks = generate(4, 100, 'impartial', 2)
+    write_ballot_file(str(tmp_path / 'e.irvb'), ranks, names(4))
+    ballots = open_ballot_file(str(tmp_path / 'e.irvb'))
+    assert ballots.weights is None
+    assert np.array_equal(ballots.ranks, ranks)
+
+
+def test_wide_cells_are_narrowed_with_their_marks(tmp_path):
+    wide = np.array([[0, 2, 65535], [65534, 1, 65535]], dtype=np.uint16)
+    write_ballot_file(str(tmp_path / 'e.irvb'), wide, names(3))
+    ranks = open_ballot_file(str(tmp_path / 'e.irvb')).ranks
+    assert ranks.dtype == np.uint8
+    assert ranks.tolist() == [[0, 2, blank_value(np.uint8)], [overvote_value(np.uint8), 1, blank_value(np.uint8)]]
+
+
+def test_empty_election(tmp_path):
+    write_ballot_file(str(tmp_path / 'e.irvb'), np.zeros((0, 3), dtype=np.uint8), names(3),
+                      np.zeros(0, dtype=np.int64))
+    ballots = open_ballot_file(str(tmp_path / 'e.irvb'))
+    assert ballots.ranks.shape == (0, 3) and ballots.weights.size == 0
+
+
+def test_other_files_are_refused(tmp_path):
+    (tmp_path / 'e.irvb').write_bytes(b'not a ballot file at all, just some bytes')
+    with pytest.raises(ValueError):
+        open_ballot_file(str(tmp_path / 'e.irvb'))
@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pytest
+
+from bootstrap import batched_irv, resampled_irv, robustness
+from electorate import generate
+from reference import irv_count, random_ballots
+from tabulation import compress_ballots, tabulate
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_batched_bootstrap_matches_single_counts(seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(1, 8))
+    ranks, counts = compress_ballots(random_ballots(rng, num_candidates, 200))
+    weights = np.concatenate([counts[None], rng.multinomial(counts.sum(), counts / counts.sum(), size=20),
+                              rng.integers(0, 3, (5, len(counts)))])
+    winners, elimination_rounds = batched_irv(ranks, num_candidates, weights)
+    for row, resample in enumerate(weights):
+        winner, _, eliminated = irv_count(ranks, num_candidates, resample)
+        assert winners[row] == (-1 if winner is None else winner)
+        expected_rounds = np.zeros(num_candidates, dtype=np.int64)
+        expected_rounds[eliminated] = np.arange(1, len(eliminated) + 1)
+        assert elimination_rounds[row].tolist() == expected_rounds.tolist()
+
+
+
+def test_resamples_match_explicit_multinomial_resamples():
+    ranks, counts = compress_ballots(generate(5, 300, 'truncated', 1, base='impartial'))
+    rng = np.random.default_rng(1)
+    winners, elimination_rounds = batched_irv(ranks, 5, rng.multinomial(counts.sum(), counts / counts.sum(),
+                                                                        size=4000))
+    drawn_winners, drawn_rounds = resampled_irv(ranks, 5, counts, 4000, rng)
+    # Same distribution of winners and of who goes out first
+    assert np.abs(np.bincount(winners + 1, minlength=6) - np.bincount(drawn_winners + 1, minlength=6)).max() < 120
+    assert np.abs((elimination_rounds == 1).mean(axis=0) - (drawn_rounds == 1).mean(axis=0)).max() < 0.03
+
+
+def test_robustness_follows_the_seed():
+    ranks = generate(6, 5000, 'mallows', 3, phi=0.98)
+    names = [f"c{i}" for i in range(6)]
+    summary = robustness(ranks, names, resamples=200, seed=4)
+    assert summary.as_dict() == robustness(ranks, names, resamples=200, seed=4).as_dict()
+    assert summary.observed_winner == tabulate(ranks, names)[0]
+    assert sum(summary.win_probability.values()) + summary.no_winner == pytest.approx(1)
+
+
+def test_distinct_rankings_do_not_multiply_the_work():
+    # 200k nearly all distinct rankings: counting ranking by ranking per
+    # resample would take about a minute here
+    ranks, counts = compress_ballots(generate(10, 200_000, 'mallows', 5, phi=0.9))
+    assert len(ranks) > 150_000
+    started = time.perf_counter()
+    winners, _ = resampled_irv(ranks, 10, counts, 1000, np.random.default_rng(5))
+    assert time.perf_counter() - started < 10
+    assert (winners == batched_irv(ranks, 10, counts[None])[0][0]).mean() > 0.9
@@ -0,0 +1,96 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import irv
+from election import Election
+from reference import irv_count, named_irv_count, random_ballots
+from tabulation import blank_value, compress_ballots, tabulate
+
+
+def names(num_candidates):
+    return [f"c{i}" for i in range(num_candidates)]
+
+
+def plain(result):
+    winner, round_details = result
+    return winner, [(dict(votes), list(votes.eliminated)) for votes in round_details]
+
+
+def ranking_ids(ranking, candidates):
+    return [candidates.index(name) for name in ranking]
+
+
+def ballot_rows(ranks, rankings):
+    # ranks with each {row: list of candidate ids} replaced, blank-padded to fit
+    blank = blank_value(ranks.dtype)
+    width = max([ranks.shape[1]] + [len(ranking) for ranking in rankings.values()])
+    rows = np.full((len(ranks), width), blank, dtype=ranks.dtype)
+    rows[:, :ranks.shape[1]] = ranks
+    for index, ranking in rankings.items():
+        rows[index] = blank
+        rows[index, :len(ranking)] = ranking
+    return rows
+
+
+@pytest.mark.parametrize('method', ['matrix', 'piles'])
+@pytest.mark.parametrize('seed', range(30))
+def test_what_if_matches_full_recount(method, seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(1, 7))
+    candidates = names(num_candidates)
+    ranks = random_ballots(rng, num_candidates, int(rng.integers(1, 60)))
+    election = Election(ranks, candidates, method=method, cache=False)
+    assert plain(election.result()) == named_irv_count(ranks, candidates)
+    replaced = {}
+    for _ in range(4):
+        index = int(rng.integers(len(ranks)))
+        ranking = [candidates[c] for c in rng.permutation(num_candidates)[:rng.integers(num_candidates + 1)]]
+        election = election.with_ballot(index, ranking)
+        replaced[index] = ranking_ids(ranking, candidates)
+        assert plain(election.result()) == named_irv_count(ballot_rows(ranks, replaced), candidates)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_added_ballots_match_full_recount(seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(2, 7))
+    candidates = names(num_candidates)
+    ranks, counts = compress_ballots(random_ballots(rng, num_candidates, 80))
+    election = Election(ranks, candidates, counts, cache=False)
+    extra = random_ballots(rng, num_candidates, 3)
+    width = max(ranks.shape[1], extra.shape[1])
+    blank = blank_value(ranks.dtype)
+    everyone = np.concatenate([np.pad(ranks, ((0, 0), (0, width - ranks.shape[1])), constant_values=blank),
+                               np.pad(extra, ((0, 0), (0, width - extra.shape[1])), constant_values=blank)])
+    extra_counts = rng.integers(1, 5, len(extra))
+    expected = named_irv_count(everyone, candidates, np.concatenate([counts, extra_counts]))
+    assert plain(election.with_ballots(extra, extra_counts).result()) == expected
+
+
+def test_simulated_election_counts_its_own_ballots():
+    candidates = names(4)
+    election = irv.simulate_election(500, candidates, [['c2', 'c0'], []], seed=7)
+    ranks, weights = election.ballots()
+    assert int(weights.sum()) == 502
+    assert ranks[-2].tolist()[:2] == [2, 0] and ranks[-1].tolist()[0] == blank_value(ranks.dtype)
+    assert plain(election.result()) == plain(tabulate(ranks, candidates, weights))
+    assert plain(election.result()) == named_irv_count(ranks, candidates, weights)
+
+
+@pytest.mark.parametrize('seed', range(15))
+def test_ballot_outcomes_match_full_recounts(seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(1, 5))
+    candidates = names(num_candidates)
+    ranks = random_ballots(rng, num_candidates, int(rng.integers(1, 40)))
+    index = int(rng.integers(len(ranks)))
+    outcomes = Election(ranks, candidates, cache=False).ballot_outcomes(index)
+    rankings = [ranking for length in range(num_candidates + 1)
+                for ranking in itertools.permutations(candidates, length)]
+    assert sorted(outcomes) == sorted(rankings)
+    for ranking in rankings:
+        winner, _, _ = irv_count(ballot_rows(ranks, {index: ranking_ids(ranking, candidates)}),
+                                 num_candidates)
+        assert outcomes[ranking] == (None if winner is None else candidates[winner])
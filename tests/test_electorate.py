@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from electorate import MAX_ENUMERATED_CANDIDATES, MODELS, generate, impartial_culture_counts, random_electorate
+from tabulation import blank_value, rank_dtype
+
+
+def kendall_distance(ranks, reference):
+    # Pairs of candidates each ranking orders the other way round from reference
+    position = np.argsort(ranks, axis=1)[:, reference]
+    return sum((position[:, i] > position[:, j]) for i, j in itertools.combinations(range(len(reference)), 2))
+
+
+def first_choice_shares(ranks, num_candidates):
+    return np.bincount(ranks[:, 0], minlength=num_candidates) / len(ranks)
+
+
+@pytest.mark.parametrize('num_candidates', [1, 4, MAX_ENUMERATED_CANDIDATES + 3, 300])
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_shape_dtype_and_full_rankings(model, num_candidates):
+    ranks = generate(num_candidates, 500, model, 3)
+    assert ranks.shape == (500, num_candidates)
+    assert ranks.dtype == rank_dtype(num_candidates)
+    if model != 'truncated':
+        assert (np.sort(ranks, axis=1) == np.arange(num_candidates)).all()
+
+
+@pytest.mark.parametrize('num_candidates', [5, MAX_ENUMERATED_CANDIDATES + 3])
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_seed_reproducibility(model, num_candidates):
+    first = generate(num_candidates, 2000, model, 11)
+    assert np.array_equal(first, generate(num_candidates, 2000, model, 11))
+    assert not np.array_equal(first, generate(num_candidates, 2000, model, 12))
+    assert np.array_equal(first, generate(num_candidates, 2000, model, np.random.SeedSequence(11)))
+
+
+@pytest.mark.parametrize('min_length', [1, 3])
+def test_truncation_blanks_only_the_tail(min_length):
+    num_candidates = 6
+    ranks = generate(num_candidates, 5000, 'truncated', 4, base='mallows', min_length=min_length, phi=0.8)
+    blank = ranks == blank_value(ranks.dtype)
+    lengths = (~blank).sum(axis=1)
+    # Blanks form a suffix, and every length from min_length to full turns up
+    assert np.array_equal(blank, np.arange(num_candidates) >= lengths[:, None])
+    assert set(lengths.tolist()) == set(range(min_length, num_candidates + 1))
+    # What is left of each ballot is still a ranking without repeats
+    for row, length in zip(ranks[:50].tolist(), lengths[:50].tolist()):
+        assert len(set(row[:length])) == length
+
+
+@pytest.mark.parametrize('num_candidates', [4, MAX_ENUMERATED_CANDIDATES, MAX_ENUMERATED_CANDIDATES + 4])
+def test_impartial_first_choices_are_uniform(num_candidates):
+    ranks = generate(num_candidates, 40_000, 'impartial', 5)
+    assert np.allclose(first_choice_shares(ranks, num_candidates), 1 / num_candidates, atol=0.015)
+    assert np.allclose(np.bincount(ranks[:, -1], minlength=num_candidates) / len(ranks), 1 / num_candidates,
+                       atol=0.015)
+
+
+@pytest.mark.parametrize('num_candidates', [5, MAX_ENUMERATED_CANDIDATES + 3])
+def test_mallows_concentrates_on_the_reference(num_candidates):
+    reference = np.random.default_rng(0).permutation(num_candidates)
+    ranks = generate(num_candidates, 2000, 'mallows', 6, phi=1e-12, reference=reference)
+    assert (ranks == reference).all()
+    # Rankings drift further from the reference as phi grows
+    distances = [kendall_distance(generate(num_candidates, 4000, 'mallows', 6, phi=phi, reference=reference),
+                                  reference).mean() for phi in [0.2, 0.5, 0.8, 1.0]]
+    assert distances == sorted(distances)
+    # At phi = 1 every ranking is equally likely, so half the pairs are swapped
+    assert distances[-1] == pytest.approx(num_candidates * (num_candidates - 1) / 4, rel=0.03)
+
+
+def test_spatial_rankings_follow_the_line():
+    ranks = generate(3, 40_000, 'spatial', 8, candidate_positions=[-1.0, 0.0, 1.0])
+    orders, counts = np.unique(ranks, axis=0, return_counts=True)
+    # Only orders a voter somewhere on the line can hold, with the share of
+    # voters of the standard normal in each stretch between midpoints
+    assert [tuple(order) for order in orders.tolist()] == [(0, 1, 2), (1, 0, 2), (1, 2, 0), (2, 1, 0)]
+    assert np.allclose(counts / len(ranks), [0.3085, 0.1915, 0.1915, 0.3085], atol=0.01)
+
+
+def test_impartial_counts_cover_every_voter():
+    rankings, counts = impartial_culture_counts(4, 100_000, 9)
+    assert counts.sum() == 100_000 and (counts > 0).all()
+    assert len(np.unique(rankings, axis=0)) == len(rankings) == 24
+    rankings, counts = random_electorate(4, 100_000, 9)
+    assert counts.sum() == 100_000
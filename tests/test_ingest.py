@@ -0,0 +1,107 @@
+import csv
+import json
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import ingest
+from ingest import load_ballots
+from normalize import normalize_ballots
+from tabulation import overvote_value, tabulate
+
+
+NAMES = ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve']
+
+
+def random_cells(rng, num_ballots, width):
+    """Ballots as CVR cells: names, blank and overvote marks, with repeats."""
+    choices = NAMES + ['', 'undervote', 'overvote']
+    return [[choices[i] for i in rng.integers(0, len(choices), int(rng.integers(0, width + 1)))]
+            for _ in range(num_ballots)]
+
+
+def as_read(cells):
+    # A ballot as ingest should keep it: blanks as '', trailing blanks dropped
+    ranking = ['' if cell in ingest.BLANK_MARKS else cell for cell in cells]
+    while ranking and ranking[-1] == '':
+        ranking.pop()
+    return tuple(ranking)
+
+
+def as_loaded(ranks, counts, names):
+    """Counter of the ballots a load returned, in as_read form."""
+    ballots = Counter()
+    for row, count in zip(ranks.tolist(), counts.tolist()):
+        ranking = [names[cell] if cell < len(names) else
+                   'overvote' if cell == overvote_value(ranks.dtype) else '' for cell in row]
+        ballots[as_read(ranking)] += count
+    return ballots
+
+
+def write_csv(path, ballots, width):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['ballot_id'] + [f'rank{i + 1}' for i in range(width)])
+        for number, cells in enumerate(ballots):
+            writer.writerow([number] + cells + [''] * (width - len(cells)))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 10_000])
+def test_csv_round_trip(tmp_path, chunk_size):
+    ballots = random_cells(np.random.default_rng(chunk_size), 300, 4)
+    write_csv(tmp_path / 'cvr.csv', ballots, 4)
+    ranks, counts, names, stats = load_ballots(str(tmp_path / 'cvr.csv'), chunk_size=chunk_size)
+    assert stats.ballots == len(ballots) == counts.sum()
+    assert sorted(names) == sorted({cell for cells in ballots for cell in cells} - {'', 'undervote', 'overvote'})
+    assert ranks.dtype == np.uint8
+    assert as_loaded(ranks, counts, names) == Counter(as_read(cells) for cells in ballots)
+
+
+@pytest.mark.parametrize('chunk_size', [3, 50, 10_000])
+def test_jsonl_round_trip(tmp_path, chunk_size):
+    ballots = random_cells(np.random.default_rng(chunk_size), 200, 6)
+    with open(tmp_path / 'cvr.jsonl', 'w') as file:
+        for number, cells in enumerate(ballots):
+            # Both line shapes, with JSON nulls for blank ranks
+            cells = [None if cell == '' else cell for cell in cells]
+            file.write(json.dumps({'ranking': cells} if number % 2 else cells) + '\n')
+            if number % 50 == 0:
+                file.write('\n')
+    ranks, counts, names, _ = load_ballots(str(tmp_path / 'cvr.jsonl'), chunk_size=chunk_size)
+    assert as_loaded(ranks, counts, names) == Counter(as_read(cells) for cells in ballots)
+
+
+def test_merging_kept_chunks_keeps_every_ballot(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, 'MERGE_THRESHOLD', 10)
+    ballots = random_cells(np.random.default_rng(5), 500, 5)
+    write_csv(tmp_path / 'cvr.csv', ballots, 5)
+    ranks, counts, names, _ = load_ballots(str(tmp_path / 'cvr.csv'), chunk_size=16)
+    assert as_loaded(ranks, counts, names) == Counter(as_read(cells) for cells in ballots)
+    # Merging collapses equal rankings across chunks
+    assert len(ranks) == len(np.unique(ranks, axis=0))
+
+
+def test_given_candidates_keep_their_ids(tmp_path):
+    write_csv(tmp_path / 'cvr.csv', [['Eve', 'Bob'], ['Bob']], 2)
+    _, _, names, _ = load_ballots(str(tmp_path / 'cvr.csv'), candidates=['Zed', 'Bob'])
+    assert names == ['Zed', 'Bob', 'Eve']
+
+
+def test_rules_normalize_as_the_ballots_are_read(tmp_path):
+    ballots = random_cells(np.random.default_rng(9), 400, 5)
+    write_csv(tmp_path / 'cvr.csv', ballots, 5)
+    raw, raw_counts, names, _ = load_ballots(str(tmp_path / 'cvr.csv'), chunk_size=32)
+    ranks, counts, normalized_names, stats = load_ballots(str(tmp_path / 'cvr.csv'), chunk_size=32,
+                                                          rules='strict')
+    assert normalized_names == names
+    expected, expected_counts, tally = normalize_ballots(raw, len(names), raw_counts, 'strict')
+    assert as_loaded(ranks, counts, names) == as_loaded(expected, expected_counts, names)
+    assert stats.rule_counts == tally
+    assert tabulate(ranks, names, counts) == tabulate(expected, names, expected_counts)
+
+
+def test_empty_file(tmp_path):
+    (tmp_path / 'cvr.csv').write_text('rank1,rank2\n')
+    ranks, counts, names, stats = load_ballots(str(tmp_path / 'cvr.csv'))
+    assert ranks.shape == (0, 0) and counts.size == 0 and names == [] and stats.ballots == 0
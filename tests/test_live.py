@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from electorate import generate
+from live import LiveTabulation
+from reference import named_irv_count
+
+
+def names(num_candidates):
+    return [f"c{i}" for i in range(num_candidates)]
+
+
+def plain(result):
+    winner, round_details = result
+    return winner, [(dict(votes), list(votes.eliminated)) for votes in round_details]
+
+
+@pytest.mark.parametrize('method', ['matrix', 'piles'])
+@pytest.mark.parametrize('seed', range(10))
+def test_live_snapshots_match_full_recount(method, seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(2, 8))
+    candidates = names(num_candidates)
+    ranks = generate(num_candidates, 3000, 'truncated', seed, base='mallows', phi=0.97)
+    live = LiveTabulation(candidates, method)
+    cuts = np.sort(rng.integers(0, len(ranks), 8))
+    for end in list(cuts) + [len(ranks)]:
+        start = live.ballots
+        if end <= start:
+            continue
+        snapshot = live.append(ranks[start:end])
+        assert live.ballots == end
+        assert plain(snapshot) == named_irv_count(ranks[:end], candidates)
+
+
+def test_snapshots_are_not_changed_by_later_batches():
+    candidates = names(3)
+    live = LiveTabulation(candidates)
+    first = live.append_rankings([['c0'], ['c1'], ['c1', 'c0'], ['c2', 'c0']])
+    kept = plain(first)
+    live.append_rankings([['c2']] * 5)
+    assert plain(first) == kept
+    with pytest.raises(ValueError):
+        live.append(np.zeros((1, 3), dtype=np.int32))
@@ -0,0 +1,121 @@
+import csv
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import metrics
+import result_cache
+from electorate import generate
+from result_cache import ResultCache
+from tabulation import compress_ballots, tabulate
+
+
+def names(num_candidates):
+    return [f"c{i}" for i in range(num_candidates)]
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    # A cached count never reaches run_rounds, so it would record no rounds
+    monkeypatch.setattr(result_cache, 'default_cache', ResultCache())
+    monkeypatch.setattr(metrics, 'recorder', None)
+    yield
+    metrics.disable()
+
+
+def count(method='matrix', batch=False, seed=0):
+    ranks = generate(6, 5000, 'truncated', seed, base='mallows', phi=0.9)
+    ranks, weights = compress_ballots(ranks)
+    return len(ranks), weights, tabulate(ranks, names(6), weights, method=method, batch=batch)
+
+
+def test_nothing_is_recorded_until_enabled(tmp_path):
+    calls = []
+
+    @metrics.timed
+    def timed(value):
+        calls.append(value)
+        return value
+    assert timed(3) == 3 and calls == [3]
+    count()
+    assert metrics.recorder is None
+    with pytest.raises(RuntimeError):
+        metrics.export(str(tmp_path / 'rounds.csv'))
+    recorder = metrics.enable()
+    timed(4)
+    assert recorder.spans[timed.__qualname__][0] == 1
+    assert metrics.disable() is recorder and metrics.recorder is None
+    timed(5)
+    assert recorder.spans[timed.__qualname__][0] == 1
+
+
+@pytest.mark.parametrize('batch', [False, True])
+@pytest.mark.parametrize('method', ['matrix', 'piles'])
+def test_rounds_are_recorded(method, batch):
+    recorder = metrics.enable()
+    _, weights, (winner, round_details) = count(method, batch)
+    assert recorder.elections == 1
+    rows = recorder.rounds
+    assert [row['round'] for row in rows] == list(range(1, len(round_details) + 1))
+    ballots = int(weights.sum())
+    for row, votes, following in zip(rows, round_details, round_details[1:] + [None]):
+        assert row['election'] == 1
+        assert row['seconds'] >= row['count_seconds'] >= 0 and row['eliminate_seconds'] >= 0
+        assert row['allocated_bytes'] is None
+        if following is None:
+            # The round that found the winner moves nothing
+            assert winner is not None and row['eliminated'] is None
+            assert row['moved'] == row['transferred'] == row['exhausted'] == 0
+            assert row['exhausted_total'] == ballots - sum(votes.values())
+            continue
+        assert row['eliminated'] == ' '.join(votes.eliminated)
+        assert row['moved'] == sum(votes[name] for name in votes.eliminated)
+        assert row['transferred'] + row['exhausted'] == row['moved']
+        # Transfers land on the candidates still counting in the next round
+        gained = sum(following[name] - votes[name] for name in following)
+        assert row['transferred'] == gained
+        assert row['exhausted_total'] == ballots - sum(following.values())
+    assert any(row['exhausted'] for row in rows)
+
+
+def test_export_writes_the_recording(tmp_path):
+    metrics.enable()
+    count()
+    count(seed=1)
+    recorder = metrics.recorder
+    assert recorder.elections == 2 and {row['election'] for row in recorder.rounds} == {1, 2}
+
+    metrics.export(str(tmp_path / 'metrics.json'))
+    recorded = json.loads((tmp_path / 'metrics.json').read_text())
+    assert recorded['elections'] == 2
+    assert recorded['rounds'] == recorder.rounds
+
+    metrics.export(str(tmp_path / 'rounds.CSV'))
+    with open(tmp_path / 'rounds.CSV', newline='') as file:
+        reader = csv.DictReader(file)
+        assert tuple(reader.fieldnames) == metrics.ROUND_FIELDS
+        rows = list(reader)
+    expected = [{field: '' if row[field] is None else str(row[field]) for field in metrics.ROUND_FIELDS}
+                for row in recorder.rounds]
+    assert rows == expected
+
+    # A finished recording can still be exported once metrics are off
+    finished = metrics.disable()
+    metrics.export(str(tmp_path / 'finished.json'), finished)
+    assert json.loads((tmp_path / 'finished.json').read_text())['rounds'] == recorded['rounds']
+
+
+def test_allocations_and_frames():
+    was_tracing = tracemalloc.is_tracing()
+    recorder = metrics.enable(trace_allocations=True)
+    count()
+    assert all(row['allocated_bytes'] >= 0 for row in recorder.rounds)
+    for seconds in [0.0005, 0.003, 0.003, 2.0]:
+        recorder.add_frame(seconds)
+    frames = recorder.as_dict()['frames']
+    assert frames['count'] == 4
+    assert frames['histogram_ms'][1] == 1 and frames['histogram_ms'][4] == 2 and frames['histogram_ms']['inf'] == 1
+    metrics.disable()
+    assert tracemalloc.is_tracing() == was_tracing
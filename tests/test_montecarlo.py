@@ -0,0 +1,61 @@
+import pytest
+
+from montecarlo import Aggregate, _run_block, elimination_order, run_batch, run_trial
+
+CANDIDATES = ['a', 'b', 'c', 'd']
+
+
+def final(run):
+    aggregate = None
+    for aggregate in run:
+        pass
+    return aggregate
+
+
+def outcomes(aggregate):
+    return aggregate.trials, aggregate.wins, aggregate.round_counts, aggregate.elimination_orders
+
+
+@pytest.mark.parametrize('tie_break', ['first', 'lot'])
+def test_runs_do_not_depend_on_workers_or_blocks(tie_break):
+    expected = _run_block(42, 0, 23, 60, CANDIDATES, 'truncated', False, tie_break)
+    assert expected.trials == 23
+    for processes, block_size in [(1, 23), (1, 4), (2, 5), (3, 1)]:
+        aggregate = final(run_batch(23, 60, CANDIDATES, 42, processes, block_size, 'truncated', tie_break=tie_break))
+        assert outcomes(aggregate) == outcomes(expected)
+        assert aggregate.seed == 42
+
+
+def test_trials_replay_alone():
+    winner, round_details = run_trial(7, 3, 200, CANDIDATES)
+    again = run_trial(7, 3, 200, CANDIDATES)
+    assert winner == again[0]
+    assert [dict(votes) for votes in round_details] == [dict(votes) for votes in again[1]]
+
+
+def test_stopping_early_keeps_what_has_finished():
+    run = run_batch(1000, 50, CANDIDATES, 5, processes=1, block_size=10)
+    aggregate = next(run)
+    assert aggregate.trials == 10
+    run.close()
+    # One worker keeps two blocks queued, and either may be the first merged
+    assert outcomes(aggregate) in [outcomes(_run_block(5, first, first + 10, 50, CANDIDATES, 'impartial', False,
+                                                       'first')) for first in (0, 10)]
+
+
+def test_unseeded_runs_record_their_seed():
+    aggregate = final(run_batch(3, 20, CANDIDATES, processes=1))
+    rerun = final(run_batch(3, 20, CANDIDATES, aggregate.seed, processes=1))
+    assert outcomes(rerun) == outcomes(aggregate)
+
+
+def test_elimination_order_and_aggregate():
+    rounds = [{'a': 4, 'b': 3, 'c': 2, 'd': 1}, {'a': 4, 'b': 3, 'c': 3}, {'a': 5, 'b': 5}]
+    assert elimination_order(rounds) == ('d', 'c')
+    aggregate = Aggregate()
+    aggregate.add('a', rounds)
+    aggregate.add('b', rounds[:2])
+    aggregate.add('a', rounds)
+    assert aggregate.win_frequencies() == {'a': 2 / 3, 'b': 1 / 3}
+    assert aggregate.as_dict()['round_counts'] == {2: 1, 3: 2}
+    assert aggregate.as_dict()['elimination_orders'] == [[['d', 'c'], 2], [['d'], 1]]
@@ -0,0 +1,66 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from normalize import JURISDICTIONS, RULE_COUNTS, Rules, empty_tally, normalize_ballots, normalize_chunk
+from reference import normalize_row
+from tabulation import blank_value, overvote_value
+
+
+RULES = [Rules(overvote, max_skipped, duplicates, write_ins)
+         for overvote, max_skipped, duplicates, write_ins in itertools.product(
+             ['exhaust', 'skip'], [None, 0, 1, 2], ['skip', 'exhaust'], ['exclude', 'count'])]
+
+
+def messy_ballots(rng, num_candidates, num_ballots, width):
+    """Rank matrix with overvotes, skipped ranks and repeated candidates, weighted 1 to 3."""
+    ranks = rng.integers(0, num_candidates, (num_ballots, width)).astype(np.uint8)
+    marks = rng.random((num_ballots, width))
+    ranks[marks < 0.2] = blank_value(np.uint8)
+    ranks[(marks >= 0.2) & (marks < 0.3)] = overvote_value(np.uint8)
+    return ranks, rng.integers(1, 4, num_ballots)
+
+
+@pytest.mark.parametrize('rules', RULES, ids=lambda rules: '-'.join(map(str, vars(rules).values())))
+def test_rules_match_a_ballot_by_ballot_walk(rules):
+    rng = np.random.default_rng(len(vars(rules)))
+    num_candidates = 5
+    ranks, weights = messy_ballots(rng, num_candidates, 400, 6)
+    write_ins = [3]
+    expected, tally = Counter(), empty_tally()
+    for row, weight in zip(ranks, weights.tolist()):
+        kept, flags = normalize_row(row, num_candidates, rules, write_ins)
+        expected[tuple(kept)] += weight
+        tally['ballots'] += weight
+        for rule, changed in flags.items():
+            tally[rule] += weight * changed
+
+    distinct, counts, counted = normalize_ballots(ranks, num_candidates, weights, rules, write_ins, chunk_size=64)
+    blank = blank_value(distinct.dtype)
+    assert Counter({tuple(cell for cell in row if cell != blank): count
+                    for row, count in zip(distinct.tolist(), counts.tolist())}) == expected
+    assert counted == tally
+    # Kept cells are packed to the front
+    assert not ((distinct[:, :-1] == blank) & (distinct[:, 1:] != blank)).any()
+
+
+def test_single_chunk_keeps_the_dtype_and_rows():
+    ranks = np.array([[0, 0, 1], [65534, 2, 65535], [65535, 65535, 1]], dtype=np.uint16)
+    cleaned = normalize_chunk(ranks, 3, rules='lenient')
+    assert cleaned.dtype == np.uint16
+    assert cleaned.tolist() == [[0, 1], [2, 65535], [1, 65535]]
+    tally = empty_tally()
+    assert normalize_chunk(ranks, 3, rules='standard', tally=tally).tolist() == [[0, 1], [65535, 65535],
+                                                                                 [1, 65535]]
+    assert tally == dict(empty_tally(), ballots=3, overvote=1, duplicate=1, skipped=2, exhausted=1, empty=1)
+
+
+def test_jurisdictions_and_rule_names():
+    assert set(empty_tally()) == set(RULE_COUNTS)
+    assert JURISDICTIONS['strict'].max_skipped == 1
+    with pytest.raises(ValueError):
+        Rules(overvote='count')
+    with pytest.raises(ValueError):
+        Rules(write_ins='ignore')
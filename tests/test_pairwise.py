@@ -0,0 +1,93 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pairwise import pairwise, pairwise_matrix
+from reference import random_ballots
+from tabulation import ballot_matrix, compress_ballots
+
+
+def brute_wins(ranks, num_candidates, weights=None):
+    """Voters ranking a above b, ballot by ballot and pair by pair."""
+    wins = np.zeros((num_candidates, num_candidates), dtype=np.int64)
+    weights = np.ones(len(ranks), dtype=np.int64) if weights is None else weights
+    for row, weight in zip(ranks.tolist(), weights.tolist()):
+        position = {}
+        for column, cell in enumerate(row):
+            if cell < num_candidates:
+                position.setdefault(cell, column)
+        for a, b in itertools.permutations(range(num_candidates), 2):
+            if position.get(a, len(row)) < position.get(b, len(row)):
+                wins[a, b] += weight
+    return wins
+
+
+def brute_smith_set(margins):
+    # Smallest group whose members all beat everyone outside it
+    candidates = range(len(margins))
+    for size in range(1, len(margins) + 1):
+        for group in itertools.combinations(candidates, size):
+            if all(margins[a, b] > 0 for a in group for b in candidates if b not in group):
+                return list(group)
+
+
+def brute_has_cycle(margins, group):
+    return any(all(margins[a, b] > 0 for a, b in zip(order, order[1:] + order[:1]))
+               for size in range(3, len(group) + 1) for order in itertools.permutations(group, size))
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_matrix_and_results_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(1, 6))
+    ranks = random_ballots(rng, num_candidates, int(rng.integers(1, 60)))
+    names = [f"c{i}" for i in range(num_candidates)]
+    wins = brute_wins(ranks, num_candidates)
+    assert np.array_equal(pairwise_matrix(ranks, num_candidates, chunk_size=7), wins)
+
+    result = pairwise(ranks, names)
+    margins = wins - wins.T
+    beats_all = [c for c in range(num_candidates) if all(margins[c, o] > 0 for o in range(num_candidates) if o != c)]
+    loses_all = [c for c in range(num_candidates) if all(margins[c, o] < 0 for o in range(num_candidates) if o != c)]
+    assert result.condorcet_winner == (names[beats_all[0]] if beats_all else None)
+    assert result.condorcet_loser == (names[loses_all[0]] if loses_all else None)
+    smith = brute_smith_set(margins)
+    assert result.smith_set == [names[c] for c in smith]
+    assert result.has_cycle == brute_has_cycle(margins, smith)
+
+
+def test_weighted_rows_count_like_repeated_ballots():
+    rng = np.random.default_rng(7)
+    ranks = random_ballots(rng, 5, 500)
+    distinct, counts = compress_ballots(ranks)
+    assert np.array_equal(pairwise_matrix(distinct, 5, counts, chunk_size=16), brute_wins(ranks, 5))
+
+
+def test_condorcet_winner_and_loser():
+    names = ['a', 'b', 'c']
+    ranks = ballot_matrix([['a', 'b', 'c']] * 3 + [['b', 'a', 'c']] * 2 + [['c', 'a']], names)
+    result = pairwise(ranks, names)
+    assert result.condorcet_winner == 'a' and result.condorcet_loser == 'c'
+    assert result.smith_set == ['a'] and not result.has_cycle
+    assert result.margin_table()[0] == ('a', 'c', 5, 1, 4)
+
+
+def test_cycle():
+    names = ['rock', 'paper', 'scissors', 'lizard']
+    ranks = ballot_matrix([['rock', 'scissors', 'paper'], ['paper', 'rock', 'scissors'],
+                           ['scissors', 'paper', 'rock']], names)
+    result = pairwise(ranks, names)
+    assert result.condorcet_winner is None
+    assert result.condorcet_loser == 'lizard'
+    assert result.smith_set == ['rock', 'paper', 'scissors']
+    assert result.has_cycle
+
+
+def test_tie_without_cycle():
+    names = ['a', 'b', 'c']
+    ranks = ballot_matrix([['a', 'b', 'c'], ['b', 'a', 'c']], names)
+    result = pairwise(ranks, names)
+    assert result.condorcet_winner is None
+    assert result.smith_set == ['a', 'b']
+    assert not result.has_cycle
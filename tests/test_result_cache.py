@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+import result_cache
+from result_cache import ResultCache, ballot_key
+
+
+RANKS = np.array([[0, 1, 2], [1, 0, 255], [2, 255, 255], [0, 2, 1]], dtype=np.uint8)
+CANDIDATES = ['a', 'b', 'c']
+
+
+@pytest.fixture(autouse=True)
+def fresh_default_cache(monkeypatch):
+    # Keep counts from other tests, and any IRV_RESULT_CACHE_DIR, out of these
+    monkeypatch.setattr(result_cache, 'default_cache', ResultCache())
+
+
+def test_key_is_stable_for_the_same_count():
+    assert ballot_key('tabulate', RANKS, CANDIDATES) == ballot_key('tabulate', RANKS.copy(), list(CANDIDATES))
+
+
+def test_key_changes_with_anything_that_decides_the_result(monkeypatch):
+    key = ballot_key('tabulate', RANKS, CANDIDATES, np.ones(4), batch=False)
+    changed_ballot = RANKS.copy()
+    changed_ballot[3, 1] = 1
+    assert ballot_key('tabulate', changed_ballot, CANDIDATES, np.ones(4), batch=False) != key
+    assert ballot_key('tabulate', RANKS, CANDIDATES, np.array([1, 1, 1, 2]), batch=False) != key
+    assert ballot_key('tabulate', RANKS, CANDIDATES, None, batch=False) != key
+    assert ballot_key('tabulate', RANKS.astype(np.uint16), CANDIDATES, np.ones(4), batch=False) != key
+    assert ballot_key('tabulate', RANKS.reshape(2, 6), CANDIDATES, np.ones(4), batch=False) != key
+    assert ballot_key('tabulate', RANKS, ['a', 'c', 'b'], np.ones(4), batch=False) != key
+    assert ballot_key('tabulate', RANKS, CANDIDATES, np.ones(4), batch=True) != key
+    assert ballot_key('election', RANKS, CANDIDATES, np.ones(4), batch=False) != key
+    monkeypatch.setattr(result_cache, 'COUNT_VERSION', result_cache.COUNT_VERSION + 1)
+    assert ballot_key('tabulate', RANKS, CANDIDATES, np.ones(4), batch=False) != key
+
+
+def test_lot_seed_is_part_of_the_key_only_when_drawing_lots():
+    for tie_break, seed in [('first', 1), ('first', 2), ('lot', 1), ('lot', 2),
+                            ('lot', np.random.SeedSequence(1).spawn(2)[1])]:
+        result_cache.tabulate(RANKS, CANDIDATES, tie_break=tie_break, seed=seed)
+    assert len(result_cache.default_cache.entries) == 4
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.get('b') is None
+    assert cache.stats['evictions'] == 1
+
+
+def test_disk_entries_survive_a_reload_and_are_promoted(tmp_path):
+    cache = result_cache.configure(directory=str(tmp_path))
+    key = cache.key('tabulate', RANKS, CANDIDATES)
+    cache.put(key, {'winner': 'a'})
+    written = [name for _, _, files in os.walk(tmp_path) for name in files]
+    assert written == [key + '.json']
+
+    reloaded = result_cache.configure(directory=str(tmp_path))
+    assert result_cache.default_cache is reloaded
+    assert reloaded.get(key) == {'winner': 'a'}
+    assert reloaded.stats['disk_hits'] == 1
+    assert key in reloaded.entries
+    assert reloaded.get(key) == {'winner': 'a'}
+    assert reloaded.stats['hits'] == 1
+
+    reloaded.clear(disk=True)
+    assert result_cache.configure(directory=str(tmp_path)).get(key) is None
+
+
+def test_tabulate_replays_rounds_on_a_hit():
+    counted, seen = [], []
+    first = result_cache.tabulate(RANKS, CANDIDATES, on_round=counted.append)
+    second = result_cache.tabulate(RANKS, CANDIDATES, on_round=seen.append)
+    assert result_cache.default_cache.stats['hits'] == 1
+    assert second[0] == first[0]
+    assert second[1] == first[1]
+    assert [votes.eliminated for votes in second[1]] == [votes.eliminated for votes in first[1]]
+    assert seen == counted
+    # Editing a returned result leaves the cached one alone
+    second[1][0]['a'] = -1
+    assert result_cache.tabulate(RANKS, CANDIDATES)[1] == first[1]
@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+import service
+from ballotfile import write_ballot_file
+from tabulation import ballot_matrix, tabulate
+
+
+CANDIDATES = ['Alice', 'Bob', 'Charlie']
+BALLOTS = [['Alice', 'Bob'], ['Bob', 'Charlie'], ['Charlie', 'Bob'], ['Bob'], ['Alice'], ['Charlie', 'Alice']]
+ELECTION = {'candidates': CANDIDATES, 'ballots': BALLOTS}
+count = service.run_job
+
+
+def run_job_or_die(spec, root, rounds):
+    # Stands in for service.run_job: can hold a worker or kill it
+    if spec.get('hold'):
+        time.sleep(spec['hold'])
+    if spec.get('die') == 'early':
+        os._exit(9)
+    if spec.get('die') == 'late':
+        rounds.put(('round', {'votes': {}, 'eliminated': []}))
+        os._exit(9)
+    return count(spec, root, rounds)
+
+
+def serving(tmp_path, talk, **options):
+    """Run talk(socket path) against a service on a Unix socket under tmp_path."""
+    path = str(tmp_path / 'irv.sock')
+
+    async def main():
+        ready = asyncio.Event()
+        server = asyncio.create_task(service.serve(unix=path, root=str(tmp_path), ready=ready, **options))
+        await ready.wait()
+        try:
+            return await asyncio.wait_for(talk(path), 60)
+        finally:
+            server.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await server
+
+    return asyncio.run(main())
+
+
+async def lines(path, payload):
+    return [line async for line in service.stream_tabulation(payload, unix=path)]
+
+
+async def request(path, method, target, payload=None):
+    """(status, headers, body bytes) of one plain HTTP request."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+    writer.write(f'{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                 + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = {name.lower(): value.strip() for name, _, value in (line.partition(':') for line in header_lines)}
+    return int(status_line.split()[1]), headers, body
+
+
+def expected_rounds():
+    winner, round_details = tabulate(ballot_matrix(BALLOTS, CANDIDATES), CANDIDATES)
+    return winner, [{'votes': dict(votes), 'eliminated': votes.eliminated, 'round': number}
+                    for number, votes in enumerate(round_details, start=1)]
+
+
+def test_rounds_stream_as_ndjson(tmp_path):
+    async def talk(path):
+        return await request(path, 'POST', '/tabulate', ELECTION), await lines(path, ELECTION)
+
+    (status, headers, _), streamed = serving(tmp_path, talk, workers=1)
+    assert status == 200
+    assert headers['content-type'] == 'application/x-ndjson'
+    assert headers['transfer-encoding'] == 'chunked'
+    winner, rounds = expected_rounds()
+    assert streamed[:-1] == rounds
+    assert streamed[-1]['winner'] == winner
+    assert streamed[-1]['rounds'] == len(rounds)
+    assert streamed[-1]['ballots'] == len(BALLOTS)
+
+
+def test_unstreamed_result_is_one_document(tmp_path):
+    async def talk(path):
+        return await request(path, 'POST', '/tabulate?stream=0', ELECTION)
+
+    status, headers, body = serving(tmp_path, talk, workers=1)
+    assert status == 200
+    assert headers['content-type'] == 'application/json'
+    result = json.loads(body)
+    winner, rounds = expected_rounds()
+    assert result['winner'] == winner
+    assert result['round_details'] == rounds
+
+
+def test_ballot_file_under_the_root(tmp_path):
+    write_ballot_file(str(tmp_path / 'county.irvb'), ballot_matrix(BALLOTS, CANDIDATES), CANDIDATES)
+
+    async def talk(path):
+        return await lines(path, {'path': 'county.irvb'})
+
+    assert serving(tmp_path, talk, workers=1)[-1]['winner'] == expected_rounds()[0]
+
+
+@pytest.mark.parametrize('payload', [
+    {'path': '../elsewhere.irvb'},
+    {'path': '/etc/passwd'},
+    {'candidates': CANDIDATES, 'ballots': [['Alice', 'Dave']]},
+    dict(ELECTION, tie_break='coin'),
+    dict(ELECTION, weights=[1, 2]),
+    {'voters': 10},
+])
+def test_bad_requests_get_400(tmp_path, payload):
+    async def talk(path):
+        return await lines(path, payload)
+
+    [answer] = serving(tmp_path, talk, workers=1)
+    assert answer['status'] == 400
+
+
+def test_requests_past_the_queue_get_503(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, 'run_job', run_job_or_die)
+
+    async def talk(path):
+        held = asyncio.create_task(lines(path, dict(ELECTION, hold=1)))
+        while json.loads((await request(path, 'GET', '/stats'))[2])['running'] < 1:
+            await asyncio.sleep(0.05)
+        refused = await request(path, 'POST', '/tabulate', ELECTION)
+        return refused, await held
+
+    (status, headers, _), held = serving(tmp_path, talk, workers=1, queue=0)
+    assert status == 503
+    assert headers['retry-after'] == str(service.RETRY_AFTER_SECONDS)
+    assert held[-1]['winner'] == expected_rounds()[0]
+
+
+def test_dead_worker_gets_500_and_frees_its_slot(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, 'run_job', run_job_or_die)
+
+    async def talk(path):
+        answers = []
+        for payload in [dict(ELECTION, die='early'), ELECTION, dict(ELECTION, die='late'), ELECTION]:
+            answers.append(await lines(path, payload))
+        # A handler frees its slot just after the client has its answer
+        while (stats := json.loads((await request(path, 'GET', '/stats'))[2]))['running']:
+            await asyncio.sleep(0.05)
+        return answers, stats
+
+    (early, after_early, late, after_late), stats = serving(tmp_path, talk, workers=1, queue=4)
+    assert early == [{'status': 500, 'error': early[0]['error']}]
+    assert 'worker failed' in early[0]['error']
+    # Rounds already sent stay sent; the stream ends with the failure
+    assert late[-1]['status'] == 500 and len(late) == 2
+    winner = expected_rounds()[0]
+    assert after_early[-1]['winner'] == winner
+    assert after_late[-1]['winner'] == winner
+    assert stats['running'] == 0 and stats['waiting'] == 0
+    assert stats['failed'] == 2 and stats['completed'] == 2
+
+
+def test_health_and_unknown_endpoints(tmp_path):
+    async def talk(path):
+        return await request(path, 'GET', '/health'), await request(path, 'GET', '/nowhere')
+
+    (status, _, body), (missing, _, _) = serving(tmp_path, talk, workers=1)
+    assert status == 200 and json.loads(body) == {'status': 'ok'}
+    assert missing == 404
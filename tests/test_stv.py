@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import stv
+from electorate import generate
+from reference import random_ballots, stv_count
+from tabulation import compress_ballots
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_count_matches_fraction_reference(seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(2, 9))
+    seats = int(rng.integers(1, num_candidates + 1))
+    decimals = int(rng.integers(0, 7))
+    if seed % 2:
+        ranks, weights = compress_ballots(generate(num_candidates, 400, 'truncated', seed, base='mallows', phi=0.8))
+    else:
+        ranks, weights = random_ballots(rng, num_candidates, int(rng.integers(1, 200))), None
+    candidates = [f"c{i}" for i in range(num_candidates)]
+    elected, round_details = stv.tabulate(ranks, candidates, seats, weights, decimals=decimals)
+    expected_elected, expected_rounds = stv_count(ranks, num_candidates, seats, weights, decimals)
+    assert elected == [candidates[c] for c in expected_elected]
+    assert [dict(votes) for votes in round_details] == [
+        {candidates[c]: float(value) for c, value in votes.items()} for votes in expected_rounds]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_grouping_does_not_change_the_count(seed):
+    ranks = generate(7, 3000, 'truncated', seed, base='mallows', phi=0.85)
+    candidates = [f"c{i}" for i in range(7)]
+    distinct, counts = compress_ballots(ranks)
+    raw = stv.tabulate(ranks, candidates, 3)
+    grouped = stv.tabulate(distinct, candidates, 3, counts)
+    assert raw[0] == grouped[0]
+    assert [dict(votes) for votes in raw[1]] == [dict(votes) for votes in grouped[1]]
+
+
+def test_rejects_counts_that_overflow_fixed_point():
+    ranks = np.array([[0, 1]], dtype=np.uint8)
+    with pytest.raises(ValueError):
+        stv.tabulate(ranks, ['a', 'b'], 1, np.array([10 ** 10]), decimals=9)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from electorate import generate, random_electorate
+from reference import irv_count, named_irv_count, random_ballots
+from tabulation import PileCounter, break_tie, compress_ballots, tabulate
+
+
+def names(num_candidates):
+    return [f"c{i}" for i in range(num_candidates)]
+
+
+def plain(result):
+    # tabulate's (winner, RoundResults) as the reference's plain dicts and lists
+    winner, round_details = result
+    return winner, [(dict(votes), list(votes.eliminated)) for votes in round_details]
+
+
+@pytest.mark.parametrize('method', ['matrix', 'piles'])
+@pytest.mark.parametrize('seed', range(40))
+def test_counters_match_reference(method, seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(1, 9))
+    ranks = random_ballots(rng, num_candidates, int(rng.integers(1, 300)))
+    candidates = names(num_candidates)
+    assert plain(tabulate(ranks, candidates, method=method)) == named_irv_count(ranks, candidates)
+
+
+@pytest.mark.parametrize('method', ['matrix', 'piles'])
+@pytest.mark.parametrize('seed', range(10))
+def test_compressed_ballots_count_the_same(method, seed):
+    num_candidates = 3 + seed % 5
+    ranks = generate(num_candidates, 2000, 'truncated', seed, base='mallows', phi=0.9)
+    candidates = names(num_candidates)
+    distinct, counts = compress_ballots(ranks)
+    expected = named_irv_count(ranks, candidates)
+    assert named_irv_count(distinct, candidates, counts) == expected
+    assert plain(tabulate(distinct, candidates, counts, method=method)) == expected
+
+
+def test_electorates_compress_only_when_it_can_pay_off():
+    ranks, counts = random_electorate(3, 1000, 1)
+    assert len(ranks) <= 6 and counts.sum() == 1000
+    # 20 uint8 ranks do not pack into one key and 20! is far above the voters
+    ranks, counts = random_electorate(20, 1000, 1)
+    assert ranks.shape == (1000, 20) and counts is None
+
+
+@pytest.mark.parametrize('method', ['matrix', 'piles'])
+def test_sharded_count_matches_reference(method):
+    for seed in range(3):
+        rng = np.random.default_rng(seed)
+        num_candidates = int(rng.integers(3, 8))
+        ranks = random_ballots(rng, num_candidates, 1500)
+        distinct, counts = compress_ballots(ranks)
+        candidates = names(num_candidates)
+        expected = named_irv_count(ranks, candidates)
+        assert plain(tabulate(ranks, candidates, method=method, processes=2)) == expected
+        assert plain(tabulate(distinct, candidates, counts, method=method, processes=2)) == expected
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_batch_elimination_keeps_the_winner(seed):
+    rng = np.random.default_rng(seed)
+    num_candidates = int(rng.integers(2, 9))
+    ranks = random_ballots(rng, num_candidates, int(rng.integers(1, 300)))
+    winner, _, _ = irv_count(ranks, num_candidates)
+    expected = None if winner is None else names(num_candidates)[winner]
+    assert tabulate(ranks, names(num_candidates), batch=True)[0] == expected
+
+
+def test_tie_breaks():
+    history = [np.array([4, 3, 2]), np.array([5, 6, 6])]
+    assert break_tie([2, 1], history) == 1
+    # The latest round separating them decides: they tie in the last one
+    assert break_tie([2, 1], history, 'previous') == 2
+    drawn = {break_tie([0, 1, 2], history, 'lot', np.random.default_rng(seed)) for seed in range(50)}
+    assert drawn == {0, 1, 2}
+
+
+def test_drawn_lots_follow_the_seed():
+    # Every ballot is blank, so each round is a tie among all the candidates
+    ranks = np.full((4, 1), 255, dtype=np.uint8)
+    candidates = names(6)
+    orders = [[votes.eliminated for votes in tabulate(ranks, candidates, tie_break='lot', seed=seed)[1]]
+              for seed in range(10)]
+    assert orders[3] == [votes.eliminated for votes in tabulate(ranks, candidates, tie_break='lot', seed=3)[1]]
+    assert len({str(order) for order in orders}) > 1
+
+
+def test_pile_totals_exact_past_float_precision():
+    # Two rows whose total is not representable as a float64
+    ranks = np.array([[0], [0], [1]], dtype=np.uint8)
+    weights = np.array([2 ** 53, 1, 3], dtype=np.int64)
+    counts = PileCounter(ranks, 2, weights).counts()
+    assert counts[0] == 2 ** 53 + 1
+    assert counts[1] == 3